@@ -1,11 +1,54 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
+from app.database import RoutingSession
 
-app = Flask(__name__)
-app.config.from_object("config")
-db = SQLAlchemy(app)
-login = LoginManager(app)
-login.login_view = "login"  # type: ignore
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+login = LoginManager()
+login.login_view = "main.login"  # type: ignore
 
-from app import routes, models  # noqa: E402, F401
+
+def create_app(config=None):
+    """Builds the application from config.py.
+
+    `config` overrides settings: a dict of values, or an object or import
+    path for `Config.from_object`. Heavy subsystems (NumPy analytics, the USDA
+    HTTP client, the recommendation catalog) are imported on first use, not
+    here.
+    """
+    app = Flask(__name__)
+    app.config.from_object("config")
+    if isinstance(config, dict):
+        app.config.update(config)
+    elif config is not None:
+        app.config.from_object(config)
+
+    from app.database import apply_sqlite_pragmas, prepare_engine_options
+
+    prepare_engine_options(app.config)
+    db.init_app(app)
+    login.init_app(app)
+    with app.app_context():
+        for engine in db.engines.values():
+            apply_sqlite_pragmas(engine, app.config)
+
+    # models, rollups, profile_metrics and user_cache register the mapper
+    # events (user_cache also the login user loader)
+    from app import models, rollups, profile_metrics, user_cache  # noqa: F401
+    from app.commands import bp as commands_bp
+    from app.instrumentation import bp as instrumentation_bp
+    from app.routes import bp as main_bp
+
+    app.register_blueprint(main_bp)
+    app.register_blueprint(instrumentation_bp)
+    app.register_blueprint(commands_bp)
+    return app
+
+
+def __getattr__(name):
+    # `from app import app` builds a default application on first use, for
+    # scripts and benchmarks; importing models or helpers does not
+    if name == "app":
+        application = globals()["app"] = create_app()
+        return application
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
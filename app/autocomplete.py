@@ -0,0 +1,166 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from app.food_index import get_food_index
+from app.usda import UpstreamUnavailable, get_usda_client
+from app.utils import search_usda_food
+
+
+class LatestRequests:
+    """Tracks the newest autocomplete request per browser session.
+
+    A request that is no longer the newest for its session is superseded and
+    should stop work as soon as possible. Requests get tickets numbered by
+    the server; the browser's own counter only orders keystrokes within one
+    page load. This is per process: with several workers, only requests
+    landing on the same worker supersede each other.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._latest = {}  # sid -> (ticket, page, client seq)
+
+    def _ticket(self, sid):
+        return self._latest.get(sid, (0, None, None))[0]
+
+    def claim(self, sid, seq=None, page=None):
+        """Registers a request and returns its ticket.
+
+        A `seq` lower than one already seen from the same `page` arrived out
+        of order and gets a ticket that is stale from the start. A different
+        page (the browser reloaded, restarting its counter) is always newest.
+        """
+        with self._cond:
+            ticket, last_page, last_seq = self._latest.get(sid, (0, None, None))
+            if (
+                seq is not None
+                and last_seq is not None
+                and page == last_page
+                and seq < last_seq
+            ):
+                return ticket - 1
+            self._latest[sid] = (ticket + 1, page, seq)
+            self._cond.notify_all()
+            return ticket + 1
+
+    def notify(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def wait(self, sid, ticket, timeout, until=None):
+        """Blocks up to timeout, or until `until()` is true; returns whether
+        the request is still the newest one for its session."""
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self._ticket(sid) != ticket or (until is not None and until()),
+                timeout,
+            )
+            return self._ticket(sid) == ticket
+
+    def forget(self, sid, ticket):
+        with self._cond:
+            if self._ticket(sid) == ticket:
+                del self._latest[sid]
+
+
+class LookupPool:
+    """Thread pool for USDA lookups with a cap on queued + running work."""
+
+    def __init__(self, workers, max_pending):
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="autocomplete"
+        )
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def submit(self, fn, *args):
+        """Returns a future, or None when too many lookups are already pending."""
+        if not self._slots.acquire(blocking=False):
+            return None
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+
+def get_autocomplete_state():
+    """Returns the app's (registry, lookup pool), creating them on first use."""
+    state = current_app.extensions.get("autocomplete")
+    if state is None:
+        pool = LookupPool(
+            current_app.config["AUTOCOMPLETE_LOOKUP_THREADS"],
+            current_app.config["AUTOCOMPLETE_MAX_PENDING"],
+        )
+        state = current_app.extensions["autocomplete"] = (LatestRequests(), pool)
+    return state
+
+
+def _search_upstream(app, query, limit):
+    with app.app_context():
+        return search_usda_food(query, max_results=limit)
+
+
+def _event(name, data):
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+
+def _suggestions(foods, source):
+    return {"source": source, "items": [{"label": f["name"], "value": f} for f in foods]}
+
+
+def stream_suggestions(sid, seq, query, limit=10, source="local"):
+    """Yields server-sent events for one keystroke's worth of suggestions.
+
+    The request first waits out the debounce window; if a newer keystroke
+    arrives meanwhile it ends without doing any lookup. Local index hits are
+    sent straight away. Misses go to the USDA lookup pool, and a superseded
+    request stops waiting on it immediately, freeing the worker. The lookup
+    itself still finishes in the pool and warms the search cache.
+    """
+    app = current_app._get_current_object()  # type: ignore
+    registry, pool = get_autocomplete_state()
+    debounce = app.config["AUTOCOMPLETE_DEBOUNCE_MS"] / 1000
+
+    try:
+        if len(query) < app.config["AUTOCOMPLETE_MIN_PREFIX"]:
+            yield _event("suggestions", _suggestions([], "none"))
+            yield _event("done", {"seq": seq})
+            return
+
+        if debounce and not registry.wait(sid, seq, debounce):
+            yield _event("cancelled", {"seq": seq})
+            return
+
+        local = get_food_index().search(query, limit=limit) if source == "local" else []
+        if local:
+            yield _event("suggestions", _suggestions(local, "local"))
+            yield _event("done", {"seq": seq})
+            return
+
+        future = pool.submit(_search_upstream, app, query, limit)
+        if future is None:
+            yield _event("unavailable", {"error": "Food search is busy, try again"})
+            return
+        future.add_done_callback(lambda _: registry.notify())
+        budget = get_usda_client().max_duration
+        if not registry.wait(sid, seq, budget, until=future.done):
+            yield _event("cancelled", {"seq": seq})
+            return
+
+        try:
+            results = future.result(timeout=0)
+        except UpstreamUnavailable:
+            yield _event("unavailable", {"error": "Food search is temporarily unavailable"})
+            return
+        except TimeoutError:
+            yield _event("unavailable", {"error": "Food search timed out"})
+            return
+        except Exception:
+            # Mid-stream, an exception would just cut the response off
+            app.logger.exception("Autocomplete lookup for %r failed", query)
+            yield _event("error", {"error": "Food search failed"})
+            return
+
+        yield _event("suggestions", _suggestions(results, "usda"))
+        yield _event("done", {"seq": seq})
+    finally:
+        registry.forget(sid, seq)
@@ -0,0 +1,181 @@
+import csv
+import json
+import time
+from datetime import datetime, timezone
+from werkzeug.datastructures import MultiDict
+from app import db  # type: ignore
+from app.charts import invalidate_weight_chart
+from app.forms import MealForm, WeightForm, WorkoutForm
+from app.models import Meal, User, WeightLog, Workout
+from app.page_cache import invalidate_user_pages
+from app.rollups import bulk_insert
+
+# kind -> (model, form validating a row, the form fields copied to the model,
+# whether rows carry a date)
+KINDS = {
+    "workouts": (Workout, WorkoutForm, ("type", "duration", "calories_burned"), True),
+    "meals": (Meal, MealForm, ("name", "calories", "protein", "carbs", "fats"), False),
+    "weights": (WeightLog, WeightForm, ("weight",), True),
+}
+FORMATS = ("csv", "jsonl")
+
+
+class InvalidImport(ValueError):
+    """The import as a whole cannot run (unknown kind or format)."""
+
+
+def guess_format(filename):
+    """csv or jsonl from a file name's extension, or None."""
+    extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    if extension == "csv":
+        return "csv"
+    if extension in ("jsonl", "ndjson"):
+        return "jsonl"
+    return None
+
+
+def read_rows(stream, fmt):
+    """Yields (line number, row dict, error) from a CSV or JSON Lines text
+    stream, one line at a time. `error` is set when a line cannot be parsed."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row, None
+    elif fmt == "jsonl":
+        for line_number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield line_number, None, "Not valid JSON."
+                continue
+            if isinstance(row, dict):
+                yield line_number, row, None
+            else:
+                yield line_number, None, "Expected a JSON object."
+    else:
+        raise InvalidImport(f"Unknown format {fmt!r}; expected one of {FORMATS}")
+
+
+def _parse_date(value):
+    date = datetime.fromisoformat(value)
+    if date.tzinfo is not None:
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
+    return date
+
+
+class ImportReport:
+    """Counts, throughput and the first `max_errors` per-row errors."""
+
+    def __init__(self, kind, max_errors=100, clock=time.perf_counter):
+        self.kind = kind
+        self.max_errors = max_errors
+        self._clock = clock
+        self._started = clock()
+        self.inserted = 0
+        self.rejected = 0
+        self.errors = []  # (line, {field: [messages]})
+        self.seconds = 0.0
+
+    def reject(self, line, errors):
+        self.rejected += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((line, errors))
+
+    def finish(self):
+        self.seconds = self._clock() - self._started
+        return self
+
+    @property
+    def rows_per_second(self):
+        rows = self.inserted + self.rejected
+        return rows / self.seconds if self.seconds else 0.0
+
+    def to_dict(self):
+        return {
+            "kind": self.kind,
+            "inserted": self.inserted,
+            "rejected": self.rejected,
+            "errors": [{"line": line, "errors": e} for line, e in self.errors],
+            "seconds": round(self.seconds, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+        }
+
+
+def import_rows(user_id, kind, rows, chunk_size=1000, max_errors=100):
+    """Validates and inserts rows from read_rows for one user.
+
+    Rows are checked with the same form the matching log_* page uses and
+    inserted `chunk_size` at a time, one executemany and one commit per chunk,
+    so memory use does not grow with the file. Rejected rows are reported,
+    not fatal. Returns an ImportReport.
+    """
+    if kind not in KINDS:
+        raise InvalidImport(f"Unknown kind {kind!r}; expected one of {tuple(KINDS)}")
+    model, form_class, fields, dated = KINDS[kind]
+    # One form reused for every row; formdata=None keeps it off the request
+    form = form_class(formdata=None, meta={"csrf": False})
+    report = ImportReport(kind, max_errors)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    chunk = []
+    for line, row, error in rows:
+        if error is not None:
+            report.reject(line, {"row": [error]})
+            continue
+
+        form.process(
+            MultiDict(
+                {k: str(v) for k, v in row.items() if k in fields and v is not None}
+            )
+        )
+        errors = {} if form.validate() else dict(form.errors)
+        values = {field: form[field].data for field in fields}
+
+        if dated:
+            date = row.get("date")
+            try:
+                values["date"] = _parse_date(str(date)) if date else now
+            except ValueError:
+                errors["date"] = ["Not a valid ISO 8601 date."]
+
+        if errors:
+            report.reject(line, errors)
+            continue
+
+        values["user_id"] = user_id
+        chunk.append(values)
+        if len(chunk) >= chunk_size:
+            report.inserted += _insert_chunk(model, chunk)
+            chunk = []
+    report.inserted += _insert_chunk(model, chunk)
+
+    if report.inserted:
+        _after_import(user_id, kind)
+    return report.finish()
+
+
+def _insert_chunk(model, chunk):
+    if not chunk:
+        return 0
+    bulk_insert(model, chunk)
+    db.session.commit()
+    return len(chunk)
+
+
+def _after_import(user_id, kind):
+    if kind == "weights":
+        # As after delete_weight: the profile follows the latest log
+        latest = (
+            WeightLog.query.filter_by(user_id=user_id)
+            .order_by(WeightLog.date.desc())
+            .first()
+        )
+        user = db.session.get(User, user_id)
+        user.weight = latest.weight
+        db.session.commit()
+        invalidate_weight_chart(user_id)
+        invalidate_user_pages(user_id, "weights", "profile")
+    else:
+        invalidate_user_pages(user_id, kind)
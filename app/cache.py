@@ -0,0 +1,214 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LRUCache:
+    """In-process LRU cache with a max size and a per-entry TTL."""
+
+    def __init__(self, maxsize=1024, ttl=3600, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+
+            expires, value = entry
+            if expires <= self._clock():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires = self._clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class SQLiteCache:
+    """JSON values in a SQLite file, shared by every worker process on the box.
+
+    Entries survive restarts; expired rows are skipped on read and purged
+    opportunistically on write.
+    """
+
+    def __init__(self, path, ttl=86400, clock=time.time, purge_every=500):
+        self.path = path
+        self.ttl = ttl
+        self._clock = clock
+        self._purge_every = purge_every
+        self._writes = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+        conn.commit()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, default=None):
+        row = (
+            self._connect()
+            .execute("SELECT value, expires FROM cache WHERE key = ?", (key,))
+            .fetchone()
+        )
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return default
+            if row[1] <= self._clock():
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        expires = self._clock() + (self.ttl if ttl is None else ttl)
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+            (key, json.dumps(value), expires),
+        )
+        with self._lock:
+            self._writes += 1
+            purge = self._writes % self._purge_every == 0
+        if purge:
+            self.purge_expired()
+
+    def delete(self, key):
+        self._connect().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def purge_expired(self):
+        cur = self._connect().execute(
+            "DELETE FROM cache WHERE expires <= ?", (self._clock(),)
+        )
+        return cur.rowcount
+
+    def clear(self):
+        self._connect().execute("DELETE FROM cache")
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "expirations": self.expirations,
+            }
+
+
+class TieredCache:
+    """Memory tier in front of an optional shared disk tier.
+
+    Disk hits are promoted into memory so the next lookup stays in-process.
+    """
+
+    def __init__(self, memory, disk=None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key, default=None):
+        value = self.memory.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key, _MISSING)
+            if value is not _MISSING:
+                self.memory.set(key, value)
+                return value
+        return default
+
+    def set(self, key, value, ttl=None):
+        self.memory.set(key, value, ttl)
+        if self.disk is not None:
+            self.disk.set(key, value, ttl)
+
+    def delete(self, key):
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self):
+        memory = self.memory.stats()
+        disk = self.disk.stats() if self.disk is not None else {}
+        misses = disk.get("misses", memory["misses"])
+        hits = memory["hits"] + disk.get("hits", 0)
+        return {
+            "hits": hits,
+            "misses": misses,
+            "evictions": memory["evictions"],
+            "memory": memory,
+            "disk": disk,
+        }
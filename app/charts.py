@@ -0,0 +1,97 @@
+from flask import current_app
+from sqlalchemy import func, select
+from app import db  # type: ignore
+from app.cache import LRUCache
+from app.models import WeightLog
+
+
+def lttb(x, y, threshold):
+    """Indexes of the points Largest-Triangle-Three-Buckets keeps.
+
+    The first and last points are always kept; every bucket in between keeps
+    the point forming the largest triangle with the previous pick and the next
+    bucket's average, which preserves peaks and dips a plain stride would drop.
+    """
+    import numpy as np
+
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (threshold - 2)
+    edges = (np.arange(threshold - 1) * every).astype(np.int64) + 1
+    edges[-1] = n - 1
+    picks = np.empty(threshold, dtype=np.int64)
+    picks[0], picks[-1] = 0, n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x = x[end : edges[i + 2]].mean()
+            next_y = y[end : edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        area = np.abs(
+            (x[a] - next_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (next_y - y[a])
+        )
+        a = start + int(area.argmax())
+        picks[i + 1] = a
+    return picks
+
+
+def get_chart_cache():
+    """Returns the app's weight chart cache, building it on first use."""
+    cache = current_app.extensions.get("chart_cache")
+    if cache is None:
+        cache = current_app.extensions["chart_cache"] = LRUCache(
+            maxsize=current_app.config["WEIGHT_CHART_CACHE_SIZE"],
+            ttl=current_app.config["WEIGHT_CHART_CACHE_TTL"],
+        )
+    return cache
+
+
+def _weight_log_stamp(user_id):
+    """(latest log id, log count): changes whenever a log is added or removed,
+    including by another worker."""
+    return tuple(
+        db.session.execute(
+            select(func.max(WeightLog.id), func.count()).where(
+                WeightLog.user_id == user_id
+            )
+        ).one()
+    )
+
+
+def build_weight_chart(user_id, points):
+    """Chart.js-ready series for a user's weight history, at most `points` long."""
+    from app.trends import ewma, fetch_weight_columns, from_days, summarize_trends
+
+    users, days, weights = fetch_weight_columns([user_id])
+    smoothed = ewma(days, weights)
+    keep = lttb(days, weights, points)
+    return {
+        "labels": [from_days(d).strftime("%b %d, %Y") for d in days[keep]],
+        "weights": [round(float(w), 1) for w in weights[keep]],
+        "trend": [round(float(w), 1) for w in smoothed[keep]],
+        "total_points": len(days),
+        "summary": summarize_trends(users, days, weights).get(user_id),
+    }
+
+
+def weight_chart(user_id, points):
+    """build_weight_chart, cached per user until their logs change."""
+    cache = get_chart_cache()
+    stamp = _weight_log_stamp(user_id)
+    cached = cache.get(user_id)
+    if cached is not None and cached[0] == (stamp, points):
+        return cached[1]
+
+    chart = build_weight_chart(user_id, points)
+    cache.set(user_id, ((stamp, points), chart))
+    return chart
+
+
+def invalidate_weight_chart(user_id):
+    get_chart_cache().delete(user_id)
@@ -0,0 +1,214 @@
+import time
+import click
+from flask import Blueprint, current_app
+from app import db  # type: ignore
+from app.bulk_import import FORMATS, KINDS, guess_format, import_rows, read_rows
+from app.data_export import FORMATS as EXPORT_FORMATS
+from app.data_export import KINDS as EXPORT_KINDS
+from app.data_export import export_all
+from app.food_index import import_foods
+from app.migrations import add_missing_columns, upgrade_schema
+from app.models import User
+from app.recommendation_batch import generate_recommendations_parallel
+from app.rollups import check_rollups, rebuild_rollups
+
+# cli_group=None registers the commands at the top level: `flask upgrade-db`
+bp = Blueprint("commands", __name__, cli_group=None)
+
+
+@bp.cli.command("import-foods")
+@click.argument("path", type=click.Path(exists=True))
+def import_foods_command(path):
+    """Load a FoodData Central bulk download (JSON file or CSV directory)."""
+    start = time.perf_counter()
+    count = import_foods(path)
+    click.echo(f"Imported {count} foods in {time.perf_counter() - start:.1f}s.")
+
+
+@bp.cli.command("upgrade-db")
+def upgrade_db_command():
+    """Create missing tables, columns and indexes in an existing database."""
+    added = add_missing_columns()
+    created = upgrade_schema()
+    if added:
+        click.echo("Added columns: " + ", ".join(added))
+    if created:
+        click.echo("Created indexes: " + ", ".join(created))
+    if not added and not created:
+        click.echo("Database schema is up to date.")
+
+
+@bp.cli.command("rebuild-rollups")
+def rebuild_rollups_command():
+    """Recompute every user's rollup totals from the raw meal and workout rows."""
+    count = rebuild_rollups()
+    click.echo(f"Rebuilt rollups for {count} users.")
+
+
+@bp.cli.command("check-rollups")
+def check_rollups_command():
+    """Report users whose rollup totals disagree with the raw rows."""
+    mismatches = check_rollups()
+    for user_id, column, stored, expected in mismatches:
+        click.echo(f"user {user_id}: {column} is {stored}, expected {expected}")
+    if mismatches:
+        raise SystemExit(1)
+    click.echo("Rollups are consistent.")
+
+
+@bp.cli.command("generate-recommendations")
+@click.option("--batch-size", default=500, show_default=True)
+@click.option(
+    "--workers", default=1, show_default=True, help="Processes, one user-id shard each."
+)
+@click.option(
+    "--stale-after",
+    type=int,
+    default=None,
+    help="Seconds; defaults to RECOMMENDATION_STALE_AFTER.",
+)
+def generate_recommendations_command(batch_size, workers, stale_after):
+    """Generate fresh recommendations for every user whose latest one is stale."""
+    if stale_after is None:
+        stale_after = current_app.config["RECOMMENDATION_STALE_AFTER"]
+    start = time.perf_counter()
+    count = generate_recommendations_parallel(stale_after, batch_size, workers)
+    click.echo(
+        f"Generated {count} recommendations in {time.perf_counter() - start:.1f}s."
+    )
+
+
+@bp.cli.command("import-history")
+@click.argument("kind", type=click.Choice(list(KINDS)))
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--user", "username", required=True, help="Username to import for.")
+@click.option(
+    "--format", "fmt", type=click.Choice(FORMATS), help="Defaults to the extension."
+)
+@click.option("--chunk-size", type=int, default=None, help="Rows per transaction.")
+def import_history_command(kind, path, username, fmt, chunk_size):
+    """Import a user's workouts, meals or weight logs from CSV or JSON Lines."""
+    user = db.session.execute(
+        db.select(User).filter_by(username=username)
+    ).scalar_one_or_none()
+    if user is None:
+        raise click.BadParameter(f"no user named {username!r}", param_hint="--user")
+    fmt = fmt or guess_format(path)
+    if fmt is None:
+        raise click.BadParameter("cannot tell from the extension", param_hint="--format")
+
+    with open(path, encoding="utf-8-sig", newline="") as stream:
+        report = import_rows(
+            user.id,
+            kind,
+            read_rows(stream, fmt),
+            chunk_size=chunk_size or current_app.config["IMPORT_CHUNK_SIZE"],
+            max_errors=current_app.config["IMPORT_MAX_ERRORS"],
+        )
+
+    for line, errors in report.errors:
+        for field, messages in errors.items():
+            click.echo(f"line {line}: {field}: {' '.join(messages)}", err=True)
+    click.echo(
+        f"Imported {report.inserted} {kind}, rejected {report.rejected}, in "
+        f"{report.seconds:.1f}s ({report.rows_per_second:.0f} rows/s)."
+    )
+
+
+@bp.cli.command("export-all")
+@click.argument("directory", type=click.Path(file_okay=False))
+@click.option(
+    "--format",
+    "fmt",
+    type=click.Choice(list(EXPORT_FORMATS)),
+    default="jsonl",
+    show_default=True,
+)
+@click.option(
+    "--kind",
+    "kinds",
+    type=click.Choice(list(EXPORT_KINDS)),
+    multiple=True,
+    help="Repeat for several; defaults to all.",
+)
+@click.option(
+    "--workers", default=1, show_default=True, help="Processes, one user-id shard each."
+)
+def export_all_command(directory, fmt, kinds, workers):
+    """Export every user's history into one file per shard."""
+    start = time.perf_counter()
+    paths = export_all(
+        directory,
+        fmt,
+        kinds or tuple(EXPORT_KINDS),
+        workers,
+        current_app.config["EXPORT_BATCH_SIZE"],
+    )
+    for path in paths:
+        click.echo(path)
+    click.echo(f"Exported {len(paths)} shards in {time.perf_counter() - start:.1f}s.")
+
+
+@bp.cli.command("generate-data")
+@click.option("--users", default=100, show_default=True)
+@click.option("--days", default=90, show_default=True, help="Days of history per user.")
+@click.option("--meals-per-day", default=3.0, show_default=True)
+@click.option("--workouts-per-day", default=0.7, show_default=True)
+@click.option("--weigh-ins-per-week", default=3.0, show_default=True)
+@click.option("--recommendations-per-week", default=7.0, show_default=True)
+@click.option(
+    "--followed", default=0.4, show_default=True, help="Share marked followed."
+)
+@click.option("--skipped", default=0.2, show_default=True, help="Share marked skipped.")
+@click.option("--seed", default=0, show_default=True)
+@click.option(
+    "--end",
+    type=click.DateTime(["%Y-%m-%d"]),
+    default=None,
+    help="Last day of history (UTC); defaults to today. Fix it to reproduce a run.",
+)
+@click.option("--reset", is_flag=True, help="Drop and recreate every table first.")
+def generate_data_command(
+    users,
+    days,
+    meals_per_day,
+    workouts_per_day,
+    weigh_ins_per_week,
+    recommendations_per_week,
+    followed,
+    skipped,
+    seed,
+    end,
+    reset,
+):
+    """Fill the database with synthetic users and history for load testing.
+
+    Every user's password is "password".
+    """
+    # NumPy is only needed here, so other commands start without it
+    from app.synthetic import generate_data
+
+    if followed + skipped > 1:
+        raise click.BadParameter("--followed plus --skipped must be at most 1")
+    if reset:
+        db.drop_all()
+        db.create_all()
+    start = time.perf_counter()
+    counts = generate_data(
+        users=users,
+        days=days,
+        meals_per_day=meals_per_day,
+        workouts_per_day=workouts_per_day,
+        weigh_ins_per_week=weigh_ins_per_week,
+        recommendations_per_week=recommendations_per_week,
+        followed_ratio=followed,
+        skipped_ratio=skipped,
+        seed=seed,
+        end=end,
+    )
+    elapsed = time.perf_counter() - start
+    total = sum(counts.values())
+    click.echo(", ".join(f"{count} {name}" for name, count in counts.items()))
+    click.echo(
+        f"Inserted {total} rows in {elapsed:.1f}s ({total / elapsed:.0f} rows/s)."
+    )
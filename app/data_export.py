@@ -0,0 +1,122 @@
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from sqlalchemy import select
+from app import db  # type: ignore
+from app.models import Meal, Recommendation, WeightLog, Workout
+from app.sharding import map_shards
+
+# kind -> (model, exported columns in order, sort column). Column names match
+# the bulk import format, so an exported CSV can be imported again.
+KINDS = {
+    "workouts": (
+        Workout,
+        ("id", "date", "type", "duration", "calories_burned"),
+        "date",
+    ),
+    "meals": (Meal, ("id", "name", "calories", "protein", "carbs", "fats"), "id"),
+    "weights": (WeightLog, ("id", "date", "weight"), "date"),
+    "recommendations": (
+        Recommendation,
+        ("id", "timestamp", "meal_rec", "workout_rec", "trend_note", "followed"),
+        "timestamp",
+    ),
+}
+# csv: one kind per file. columnar: every kind in one wide CSV with a `kind`
+# column and the union of all columns. jsonl: one object per row.
+FORMATS = {"csv": "text/csv", "columnar": "text/csv", "jsonl": "application/x-ndjson"}
+FLUSH_BYTES = 64 * 1024
+
+
+class InvalidExport(ValueError):
+    """The requested format and kinds cannot be exported."""
+
+
+def _value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def iter_kind(kind, user_id=None, shard=0, shards=1, batch_size=500):
+    """Yields one kind's rows as dicts, oldest first, fetching `batch_size`
+    at a time. Without a `user_id`, exports the users in shard
+    (user_id % shards == shard), with a user_id column."""
+    model, columns, sort = KINDS[kind]
+    order = [getattr(model, sort), model.id]
+    if user_id is not None:
+        names = columns
+        where = model.user_id == user_id
+    else:
+        names = ("user_id", *columns)
+        where = model.user_id % shards == shard
+        order.insert(0, model.user_id)
+    statement = (
+        select(*(getattr(model, name) for name in names)).where(where).order_by(*order)
+    )
+
+    # yield_per streams the result instead of buffering it all
+    result = db.session.execute(statement.execution_options(yield_per=batch_size))
+    for row in result:
+        yield {name: _value(value) for name, value in zip(names, row)}
+
+
+def export_chunks(fmt, kinds, user_id=None, shard=0, shards=1, batch_size=500):
+    """Yields the export as text chunks of roughly FLUSH_BYTES each."""
+    _check(fmt, kinds)
+    return _chunks(fmt, kinds, user_id, shard, shards, batch_size)
+
+
+def _check(fmt, kinds):
+    if fmt not in FORMATS:
+        raise InvalidExport(f"Unknown format {fmt!r}; expected one of {tuple(FORMATS)}")
+    unknown = [kind for kind in kinds if kind not in KINDS]
+    if unknown or not kinds:
+        raise InvalidExport(f"Unknown kinds {unknown}; expected some of {tuple(KINDS)}")
+    if fmt == "csv" and len(kinds) != 1:
+        raise InvalidExport("csv exports one kind at a time; use columnar for several")
+
+
+def _chunks(fmt, kinds, user_id, shard, shards, batch_size):
+    buffer = io.StringIO()
+    writer = None
+    if fmt != "jsonl":
+        header = [] if fmt == "csv" else ["kind"]
+        if user_id is None:
+            header.append("user_id")
+        for kind in kinds:
+            header += [c for c in KINDS[kind][1] if c not in header]
+        writer = csv.DictWriter(buffer, header, extrasaction="ignore")
+        writer.writeheader()
+
+    for kind in kinds:
+        for row in iter_kind(kind, user_id, shard, shards, batch_size):
+            if fmt == "jsonl":
+                buffer.write(json.dumps({"kind": kind, **row}) + "\n")
+            else:
+                row["kind"] = kind
+                writer.writerow(row)
+            if buffer.tell() >= FLUSH_BYTES:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _export_shard(directory, fmt, kinds, batch_size, shard, shards):
+    extension = "jsonl" if fmt == "jsonl" else "csv"
+    path = os.path.join(directory, f"export-{shard:03d}-of-{shards:03d}.{extension}")
+    with open(path, "w", encoding="utf-8", newline="") as out:
+        for chunk in export_chunks(
+            fmt, kinds, shard=shard, shards=shards, batch_size=batch_size
+        ):
+            out.write(chunk)
+    return path
+
+
+def export_all(directory, fmt="jsonl", kinds=tuple(KINDS), workers=1, batch_size=500):
+    """Writes every user's history into `workers` files, one user-id shard
+    (id % workers) each, in parallel. Returns the file paths."""
+    _check(fmt, kinds)
+    os.makedirs(directory, exist_ok=True)
+    return map_shards(_export_shard, workers, directory, fmt, kinds, batch_size)
@@ -0,0 +1,132 @@
+from flask import current_app, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+
+SQLITE_PROFILES = ("wal", "default")
+# Options only QueuePool accepts; in-memory SQLite gets a StaticPool
+QUEUE_POOL_OPTIONS = ("pool_size", "max_overflow", "pool_timeout")
+# Requests whose reads may go to the read engine
+READ_METHODS = ("GET", "HEAD")
+
+
+def is_memory_sqlite(uri):
+    url = make_url(uri)
+    return url.drivername.startswith("sqlite") and url.database in (
+        None,
+        "",
+        ":memory:",
+    )
+
+
+def prepare_engine_options(config):
+    """Drops queue pool options the configured database cannot take. Call
+    before db.init_app."""
+    uri = config.get("SQLALCHEMY_DATABASE_URI")
+    if uri and is_memory_sqlite(uri):
+        config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+            key: value
+            for key, value in config.get("SQLALCHEMY_ENGINE_OPTIONS", {}).items()
+            if key not in QUEUE_POOL_OPTIONS
+        }
+
+
+def sqlite_pragmas(config):
+    """The (pragma, value) pairs the configured profile sets, in order."""
+    profile = config["SQLITE_PROFILE"]
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown SQLITE_PROFILE: {profile!r}")
+    if profile == "default":
+        return []
+    return [
+        ("journal_mode", "WAL"),
+        ("synchronous", config["SQLITE_SYNCHRONOUS"]),
+        ("cache_size", int(config["SQLITE_CACHE_SIZE"])),
+        ("mmap_size", int(config["SQLITE_MMAP_SIZE"])),
+        ("busy_timeout", int(config["SQLITE_BUSY_TIMEOUT"])),
+    ]
+
+
+def apply_sqlite_pragmas(engine, config):
+    """Sets the profile's pragmas on each new connection of a SQLite engine."""
+    if engine.dialect.name != "sqlite":
+        return
+    pragmas = sqlite_pragmas(config)
+    if is_memory_sqlite(engine.url) or engine.url.query.get("mode") == "ro":
+        # No journal file to switch to WAL, or no right to; the primary
+        # connection sets it for the file
+        pragmas = [(name, value) for name, value in pragmas if name != "journal_mode"]
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f"PRAGMA {name} = {value}")
+        finally:
+            cursor.close()
+
+
+def read_url(config, primary_url):
+    """Where GET requests read from: DATABASE_READ_URL, else the primary
+    SQLite file opened read-only, else None (read from the primary)."""
+    if not config["READ_ROUTING"]:
+        return None
+    if config.get("DATABASE_READ_URL"):
+        return make_url(config["DATABASE_READ_URL"])
+    if primary_url.drivername.startswith("sqlite") and not is_memory_sqlite(
+        primary_url
+    ):
+        return primary_url.set(
+            database=f"file:{primary_url.database}",
+            query={"mode": "ro", "uri": "true"},
+        )
+    return None
+
+
+def get_read_engine():
+    """Returns the app's read-only engine, building it on first use, or None
+    when reads go to the primary."""
+    extensions = current_app.extensions
+    if "read_engine" not in extensions:
+        from app import db  # type: ignore
+
+        config = current_app.config
+        url = read_url(config, db.engine.url)
+        engine = None
+        if url is not None:
+            options = dict(config.get("SQLALCHEMY_ENGINE_OPTIONS", {}))
+            if is_memory_sqlite(url):
+                options = {
+                    k: v for k, v in options.items() if k not in QUEUE_POOL_OPTIONS
+                }
+            engine = create_engine(url, **options)
+            apply_sqlite_pragmas(engine, config)
+        extensions["read_engine"] = engine
+    return extensions["read_engine"]
+
+
+class RoutingSession(Session):
+    """Sends the reads of GET and HEAD requests to the read engine.
+
+    Everything else uses the primary: writes, flushes, work outside a
+    request, and every statement after the first write of a request, so a
+    handler that writes (the dashboard saving a recommendation) reads its
+    own rows back.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._reads_from_replica(clause):
+            engine = get_read_engine()
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _reads_from_replica(self, clause):
+        if self._flushing or getattr(clause, "is_dml", False):
+            self.info["wrote"] = True
+        if self.info.get("wrote"):
+            return False
+        return has_request_context() and request.method in READ_METHODS
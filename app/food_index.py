@@ -0,0 +1,311 @@
+import csv
+import heapq
+import json
+import os
+import time
+from bisect import bisect_left
+from flask import current_app
+from sqlalchemy import func, insert
+from app import db  # type: ignore
+from app.models import Food
+
+# FoodData Central nutrient numbers for the macros we track. Foundation foods
+# often report energy only as the Atwater factors (958/957), so fall back to them.
+MACRO_NUMBERS = {"203": "protein", "204": "fat", "205": "carbs"}
+ENERGY_NUMBERS = ("208", "958", "957")
+
+# The search API reports nutrients by name rather than number
+MACRO_NAMES = {
+    "Energy": "calories",
+    "Protein": "protein",
+    "Carbohydrate, by difference": "carbs",
+    "Total lipid (fat)": "fat",
+}
+
+
+def normalize_name(name):
+    return " ".join(name.lower().replace(",", " ").split())
+
+
+def macros_from_search_item(item):
+    """Pulls the four macros out of a /foods/search result without a full dict."""
+    macros = {
+        "name": item["description"],
+        "calories": 0,
+        "protein": 0,
+        "carbs": 0,
+        "fat": 0,
+    }
+    for nutrient in item.get("foodNutrients", []):
+        field = MACRO_NAMES.get(nutrient.get("nutrientName"))
+        if field is None:
+            continue
+        if field == "calories" and str(nutrient.get("unitName", "")).lower() == "kj":
+            continue
+        macros[field] = nutrient.get("value", 0)
+    return macros
+
+
+def _macros_from_numbers(amounts):
+    """Maps {nutrient_number: amount} onto our macro fields."""
+    macros = {field: amounts.get(number, 0) for number, field in MACRO_NUMBERS.items()}
+    macros["calories"] = next((amounts[n] for n in ENERGY_NUMBERS if n in amounts), 0)
+    return macros
+
+
+def _iter_json_array(f, chunk_size=1 << 20):
+    """Yields the objects of the first JSON array in a file, one at a time.
+
+    Bulk downloads are a single huge array (wrapped in an object such as
+    {"BrandedFoods": [...]}), several GB for branded foods, so decode one
+    element at a time instead of loading the whole document.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    eof = False
+
+    while "[" not in buffer:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            return
+        buffer += chunk
+    pos = buffer.index("[") + 1
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == "]":
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+        yield item
+        pos = end
+        if pos > chunk_size:
+            buffer = buffer[pos:]
+            pos = 0
+
+
+def _read_fdc_json(path):
+    with open(path, encoding="utf-8") as f:
+        for item in _iter_json_array(f):
+            amounts = {}
+            for entry in item.get("foodNutrients", []):
+                nutrient = entry.get("nutrient", {})
+                number = nutrient.get("number")
+                if number and "amount" in entry:
+                    amounts[str(number)] = entry["amount"]
+            yield {
+                "id": item["fdcId"],
+                "name": item["description"],
+                **_macros_from_numbers(amounts),
+            }
+
+
+def _read_fdc_csv(directory):
+    with open(
+        os.path.join(directory, "nutrient.csv"), newline="", encoding="utf-8"
+    ) as f:
+        wanted = {
+            row["id"]: row["nutrient_nbr"]
+            for row in csv.DictReader(f)
+            if row["nutrient_nbr"] in MACRO_NUMBERS
+            or row["nutrient_nbr"] in ENERGY_NUMBERS
+        }
+
+    # food_nutrient.csv is by far the largest file; only keep the macro rows
+    amounts = {}
+    with open(
+        os.path.join(directory, "food_nutrient.csv"), newline="", encoding="utf-8"
+    ) as f:
+        for row in csv.DictReader(f):
+            number = wanted.get(row["nutrient_id"])
+            if number and row["amount"]:
+                amounts.setdefault(row["fdc_id"], {})[number] = float(row["amount"])
+
+    with open(os.path.join(directory, "food.csv"), newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield {
+                "id": int(row["fdc_id"]),
+                "name": row["description"],
+                **_macros_from_numbers(amounts.get(row["fdc_id"], {})),
+            }
+
+
+def read_fdc_download(path):
+    """Yields food rows from an FDC bulk download (JSON file or CSV directory)."""
+    if os.path.isdir(path):
+        return _read_fdc_csv(path)
+    return _read_fdc_json(path)
+
+
+def import_foods(path, batch_size=5000):
+    """Replaces the local food table with the contents of an FDC download."""
+    Food.__table__.create(db.engine, checkfirst=True)
+    db.session.query(Food).delete()
+
+    count = 0
+    batch = []
+    for row in read_fdc_download(path):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            db.session.execute(insert(Food), batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(Food), batch)
+        count += len(batch)
+
+    db.session.commit()
+    current_app.extensions.pop("food_index", None)
+    return count
+
+
+class FoodIndex:
+    """In-memory prefix + trigram index over the local food table.
+
+    Foods are kept shortest-name first, so a food's position is also its rank.
+    Each word of a name gets a posting list of positions; a query matches when
+    every one of its words is a prefix of some word in the name. Queries with
+    no prefix hits fall back to trigram overlap to tolerate typos.
+    """
+
+    def __init__(self, foods):
+        foods = [
+            {
+                "name": name,
+                "calories": calories,
+                "protein": protein,
+                "carbs": carbs,
+                "fat": fat,
+            }
+            for name, calories, protein, carbs, fat in foods
+        ]
+        keyed = sorted(
+            ((normalize_name(f["name"]), n, f) for n, f in enumerate(foods)),
+            key=lambda k: (len(k[0]), k[1]),
+        )
+        self.foods = [f for _, _, f in keyed]
+        self.names = [name for name, _, _ in keyed]
+        self.words = [tuple(name.split()) for name in self.names]
+        self.by_name = {}
+        self.postings = {}
+        self.trigrams = {}
+        for i, name in enumerate(self.names):
+            self.by_name.setdefault(name, i)
+            for word in set(self.words[i]):
+                self.postings.setdefault(word, []).append(i)
+            for gram in _trigrams(name):
+                self.trigrams.setdefault(gram, []).append(i)
+        self.vocabulary = sorted(self.postings)
+
+    def __len__(self):
+        return len(self.foods)
+
+    def get(self, name):
+        i = self.by_name.get(normalize_name(name))
+        return None if i is None else self.foods[i]
+
+    def _prefix_stream(self, prefix):
+        """Yields positions of foods with a word starting with prefix, best first."""
+        lists = []
+        pos = bisect_left(self.vocabulary, prefix)
+        while pos < len(self.vocabulary) and self.vocabulary[pos].startswith(prefix):
+            lists.append(self.postings[self.vocabulary[pos]])
+            pos += 1
+
+        last = None
+        for i in heapq.merge(*lists):
+            if i != last:
+                yield i
+                last = i
+
+    def search(self, query, limit=10):
+        words = normalize_name(query).split()
+        if not words:
+            return []
+
+        full = " ".join(words)
+        driver = max(words, key=len)
+        others = [w for w in words if w is not driver]
+
+        # Walk candidates in rank order and stop as soon as we have enough
+        matches = []
+        prefixed = 0
+        for i in self._prefix_stream(driver):
+            if others and not all(
+                any(t.startswith(w) for t in self.words[i]) for w in others
+            ):
+                continue
+            matches.append(i)
+            prefixed += self.names[i].startswith(full)
+            if prefixed >= limit or len(matches) >= limit * 5:
+                break
+
+        if matches:
+            matches.sort(key=lambda i: (not self.names[i].startswith(full), i))
+        else:
+            matches = self._fuzzy(full)
+
+        return [self.foods[i] for i in matches[:limit]]
+
+    def _fuzzy(self, query, threshold=0.3):
+        grams = _trigrams(query)
+        counts = {}
+        for gram in grams:
+            for i in self.trigrams.get(gram, ()):
+                counts[i] = counts.get(i, 0) + 1
+        scored = [
+            (count / len(grams), i)
+            for i, count in counts.items()
+            if count / len(grams) >= threshold
+        ]
+        scored.sort(key=lambda s: (-s[0], s[1]))
+        return [i for _, i in scored]
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def _food_table_stamp():
+    """Cheap fingerprint of the food table, or None when it does not exist."""
+    if not db.inspect(db.engine).has_table(Food.__tablename__):
+        return None
+    return tuple(db.session.query(func.count(Food.id), func.max(Food.id)).one())
+
+
+def get_food_index():
+    """Returns the app's local food index, loading it from the database.
+
+    Every FOOD_INDEX_REFRESH seconds the table is re-checked, so workers pick
+    up a `flask import-foods` run without a restart. A missing table (a
+    database created before the index existed) is treated as an empty index.
+    """
+    cached = current_app.extensions.get("food_index")
+    now = time.monotonic()
+    if cached is not None and now - cached[2] < current_app.config.get(
+        "FOOD_INDEX_REFRESH", 60
+    ):
+        return cached[0]
+
+    stamp = _food_table_stamp()
+    if cached is not None and cached[1] == stamp:
+        index = cached[0]
+    elif stamp is None:
+        index = FoodIndex([])
+    else:
+        rows = db.session.query(
+            Food.name, Food.calories, Food.protein, Food.carbs, Food.fat
+        ).order_by(Food.id)
+        index = FoodIndex(rows)
+    current_app.extensions["food_index"] = (index, stamp, now)
+    return index
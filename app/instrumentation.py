@@ -0,0 +1,280 @@
+import hmac
+import threading
+import time
+from contextlib import contextmanager
+from flask import Blueprint, Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+bp = Blueprint("instrumentation", __name__)
+
+
+class RequestStats:
+    """What one request spent in the database, in external APIs and on
+    expensive local work."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.external = {}  # service -> (calls, seconds)
+        self.work = {}  # task -> (calls, seconds)
+        self.statements = []  # (seconds, statement)
+
+
+class Metrics:
+    """Per-endpoint totals since the process started, in Prometheus format.
+
+    Counters are per worker process; Prometheus sums them across targets.
+    """
+
+    def __init__(self, slow_limit=10):
+        self.slow_limit = slow_limit
+        self._lock = threading.Lock()
+        self.endpoints = {}  # endpoint -> [requests, queries, db, request seconds]
+        self.external = {}  # (endpoint, service) -> [calls, seconds]
+        self.work = {}  # (endpoint, task) -> [calls, seconds]
+        self._slowest = {}  # (endpoint, statement) -> worst seconds
+
+    def observe(self, endpoint, stats, duration):
+        with self._lock:
+            totals = self.endpoints.setdefault(endpoint, [0, 0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += stats.queries
+            totals[2] += stats.db_time
+            totals[3] += duration
+
+            for service, (calls, seconds) in stats.external.items():
+                external = self.external.setdefault((endpoint, service), [0, 0.0])
+                external[0] += calls
+                external[1] += seconds
+
+            for task, (calls, seconds) in stats.work.items():
+                work = self.work.setdefault((endpoint, task), [0, 0.0])
+                work[0] += calls
+                work[1] += seconds
+
+            for seconds, statement in stats.statements:
+                key = (endpoint, statement)
+                if seconds > self._slowest.get(key, 0.0):
+                    self._slowest[key] = seconds
+                    if len(self._slowest) > self.slow_limit:
+                        del self._slowest[min(self._slowest, key=self._slowest.get)]
+
+    def slowest(self):
+        """Returns (seconds, endpoint, statement) tuples, slowest first."""
+        with self._lock:
+            return sorted(
+                ((s, e, stmt) for (e, stmt), s in self._slowest.items()), reverse=True
+            )
+
+    def render(self, caches=None):
+        """Returns the metrics as Prometheus text exposition format."""
+        with self._lock:
+            endpoints = {k: list(v) for k, v in self.endpoints.items()}
+            external = {k: list(v) for k, v in self.external.items()}
+            work = {k: list(v) for k, v in self.work.items()}
+
+        slowest = self.slowest()
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+                lines.append(f"{name}{{{label_text}}} {value:g}")
+
+        by_endpoint = sorted(endpoints.items())
+        family(
+            "app_requests_total",
+            "counter",
+            "Requests handled.",
+            [((("endpoint", e),), t[0]) for e, t in by_endpoint],
+        )
+        family(
+            "app_sql_queries_total",
+            "counter",
+            "SQL statements executed while handling requests.",
+            [((("endpoint", e),), t[1]) for e, t in by_endpoint],
+        )
+        family(
+            "app_sql_seconds_total",
+            "counter",
+            "Time spent executing SQL statements.",
+            [((("endpoint", e),), t[2]) for e, t in by_endpoint],
+        )
+        family(
+            "app_request_seconds_total",
+            "counter",
+            "Time spent handling requests.",
+            [((("endpoint", e),), t[3]) for e, t in by_endpoint],
+        )
+        by_service = sorted(external.items())
+        family(
+            "app_external_calls_total",
+            "counter",
+            "Calls to external APIs.",
+            [((("endpoint", e), ("service", s)), v[0]) for (e, s), v in by_service],
+        )
+        family(
+            "app_external_seconds_total",
+            "counter",
+            "Time spent waiting on external APIs.",
+            [((("endpoint", e), ("service", s)), v[1]) for (e, s), v in by_service],
+        )
+        by_task = sorted(work.items())
+        family(
+            "app_work_calls_total",
+            "counter",
+            "Expensive local work done for requests, such as password hashing.",
+            [((("endpoint", e), ("task", t)), v[0]) for (e, t), v in by_task],
+        )
+        family(
+            "app_work_seconds_total",
+            "counter",
+            "Time spent on expensive local work.",
+            [((("endpoint", e), ("task", t)), v[1]) for (e, t), v in by_task],
+        )
+        family(
+            "app_sql_slowest_statement_seconds",
+            "gauge",
+            "The slowest SQL statements seen by this process.",
+            [
+                ((("endpoint", e), ("statement", s)), seconds)
+                for seconds, e, s in slowest
+            ],
+        )
+
+        caches = sorted((caches or {}).items())
+        for key in ("hits", "misses", "evictions", "expirations"):
+            samples = [
+                ((("cache", name),), stats[key]) for name, stats in caches if key in stats
+            ]
+            if samples:
+                family(f"app_cache_{key}_total", "counter", f"Cache {key}.", samples)
+
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def get_metrics():
+    """Returns the app's Metrics registry, building it on first use."""
+    metrics = current_app.extensions.get("metrics")
+    if metrics is None:
+        metrics = current_app.extensions["metrics"] = Metrics(
+            slow_limit=current_app.config["METRICS_SLOW_STATEMENTS"]
+        )
+    return metrics
+
+
+def _request_stats():
+    if has_request_context():
+        return g.get("request_stats")
+    return None
+
+
+@contextmanager
+def _track(kind, name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = _request_stats()
+        if stats is not None:
+            totals = getattr(stats, kind)
+            calls, seconds = totals.get(name, (0, 0.0))
+            totals[name] = (calls + 1, seconds + time.perf_counter() - start)
+
+
+def track_external(service):
+    """Times a call to an external API against the current request."""
+    return _track("external", service)
+
+
+def track_work(task):
+    """Times expensive local work (CPU-bound, not I/O) against the current
+    request; reported apart from external API time."""
+    return _track("work", task)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _request_stats() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _request_stats()
+    starts = conn.info.get("query_start")
+    if stats is None or not starts:
+        return
+
+    elapsed = time.perf_counter() - starts.pop()
+    stats.queries += 1
+    stats.db_time += elapsed
+    stats.statements.append((elapsed, " ".join(statement.split())[:300]))
+
+
+@bp.before_app_request
+def _start_request_stats():
+    if current_app.config["METRICS_ENABLED"]:
+        g.request_stats = RequestStats()
+
+
+@bp.after_app_request
+def _record_request_stats(response):
+    stats = g.pop("request_stats", None)
+    if stats is None:
+        return response
+
+    # Work done later by a streamed response body is not included
+    duration = time.perf_counter() - stats.started
+    # Labelled by view name without the blueprint, as before routes moved
+    # into one, so existing dashboards keep their series
+    endpoint = (request.endpoint or "unknown").rpartition(".")[2]
+    get_metrics().observe(endpoint, stats, duration)
+
+    if current_app.config["METRICS_DEBUG_HEADER"]:
+        timings = [f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries"']
+        timed = [*stats.external.items(), *stats.work.items()]
+        for name, (calls, seconds) in timed:
+            timings.append(f'{name};dur={seconds * 1000:.1f};desc="{calls} calls"')
+        timings.append(f"total;dur={duration * 1000:.1f}")
+        response.headers["Server-Timing"] = ", ".join(timings)
+        response.headers["X-Query-Count"] = str(stats.queries)
+    return response
+
+
+@bp.route("/metrics")
+def metrics():
+    token = current_app.config["METRICS_TOKEN"]
+    if not current_app.config["METRICS_ENABLED"] or not token:
+        return Response("metrics are disabled\n", status=404, mimetype="text/plain")
+    # Statement text and endpoint names are not for anonymous visitors
+    supplied = request.headers.get("Authorization", "").removeprefix("Bearer ")
+    if not hmac.compare_digest(supplied.encode(), token.encode()):
+        return Response(
+            "unauthorized\n",
+            status=401,
+            mimetype="text/plain",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    caches = {}
+    for name, key in (("usda", "usda_cache"), ("weight_chart", "chart_cache")):
+        cache = current_app.extensions.get(key)
+        if cache is not None:
+            caches[name] = cache.stats()
+    page_cache = current_app.extensions.get("page_cache")
+    if page_cache is not None:
+        for section, stats in page_cache.stats().items():
+            caches[f"page_{section}"] = stats
+    return Response(
+        get_metrics().render(caches),
+        mimetype="text/plain; version=0.0.4; charset=utf-8",
+    )
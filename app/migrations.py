@@ -0,0 +1,51 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+from app import db  # type: ignore
+
+
+def add_missing_columns(engine=None):
+    """Adds columns declared on the models to existing tables that lack them.
+
+    New columns must be nullable or have a server default, as SQLite requires
+    for ALTER TABLE ADD COLUMN. Returns the "table.column" names it added.
+    """
+    engine = engine or db.engine
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+
+    added = []
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if table.name not in tables:
+                continue
+            existing = {col["name"] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                spec = CreateColumn(column).compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {spec}"))
+                added.append(f"{table.name}.{column.name}")
+    return added
+
+
+def upgrade_schema(engine=None):
+    """Brings an existing database up to the current models.
+
+    Creates missing tables, adds missing columns (see add_missing_columns)
+    and creates any indexes declared on the models that the database does not
+    have yet. Existing data is left alone, so this is safe to run on every
+    deploy. Returns the names of the indexes it created.
+    """
+    engine = engine or db.engine
+    db.metadata.create_all(engine)
+    add_missing_columns(engine)
+
+    created = []
+    inspector = inspect(engine)
+    for table in db.metadata.sorted_tables:
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(engine)
+                created.append(index.name)
+    return created
@@ -1,9 +1,9 @@
 from typing import ClassVar
 from datetime import datetime, timezone
 from flask_sqlalchemy.query import Query
-from app import db, login  # type: ignore
+from app import db  # type: ignore
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.passwords import hash_password, needs_rehash, verify_password
 
 
 class User(UserMixin, db.Model):
@@ -22,21 +22,26 @@ class User(UserMixin, db.Model):
     height = db.Column(db.Float)
     fitness_goal = db.Column(db.String(120))
     password_hash = db.Column(db.String(128))
+    # Bumped whenever a field derived metrics depend on changes (see
+    # app/profile_metrics.py)
+    profile_version = db.Column(
+        db.Integer, nullable=False, default=1, server_default="1"
+    )
 
+    # Both hash in the app's hashing pool and may raise HashingBusy
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
 
-
-@login.user_loader
-def load_user(id):
-    return User.query.get(int(id))
+    def password_needs_rehash(self):
+        return needs_rehash(self.password_hash)
 
 
 class Workout(db.Model):
     __tablename__ = "workouts"
+    __table_args__ = (db.Index("ix_workouts_user_date", "user_id", "date"),)
     query: ClassVar[Query]
 
     def __init__(self, **kwargs):
@@ -52,6 +57,7 @@ class Workout(db.Model):
 
 class Meal(db.Model):
     __tablename__ = "meals"
+    __table_args__ = (db.Index("ix_meals_user_id", "user_id", "id"),)
     query: ClassVar[Query]
 
     def __init__(self, **kwargs):
@@ -68,6 +74,19 @@ class Meal(db.Model):
 
 class Recommendation(db.Model):
     __tablename__ = "ai_recommendations"
+    __table_args__ = (
+        db.Index("ix_ai_recommendations_user_timestamp", "user_id", "timestamp"),
+        # Covering indexes for the feedback GROUP BY queries
+        db.Index(
+            "ix_ai_recommendations_user_followed_meal", "user_id", "followed", "meal_rec"
+        ),
+        db.Index(
+            "ix_ai_recommendations_user_followed_workout",
+            "user_id",
+            "followed",
+            "workout_rec",
+        ),
+    )
     query: ClassVar[Query]
 
     def __init__(self, **kwargs):
@@ -84,6 +103,7 @@ class Recommendation(db.Model):
 
 class WeightLog(db.Model):
     __tablename__ = "weight_logs"
+    __table_args__ = (db.Index("ix_weight_logs_user_date", "user_id", "date"),)
     query: ClassVar[Query]
 
     def __init__(self, **kwargs):
@@ -93,3 +113,39 @@ class WeightLog(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     weight = db.Column(db.Float, nullable=False)
     date = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+
+class Food(db.Model):
+    __tablename__ = "foods"
+    query: ClassVar[Query]
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+    id = db.Column(db.Integer, primary_key=True)  # FoodData Central fdc_id
+    name = db.Column(db.String(255), nullable=False)
+    calories = db.Column(db.Float)  # per 100 g
+    protein = db.Column(db.Float)
+    carbs = db.Column(db.Float)
+    fat = db.Column(db.Float)
+
+
+class UserRollup(db.Model):
+    """Running per-user totals, kept in step with meals and workouts by the
+    listeners in app/rollups.py."""
+
+    __tablename__ = "user_rollups"
+    query: ClassVar[Query]
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    meal_count = db.Column(db.Integer, nullable=False, default=0)
+    calories = db.Column(db.Float, nullable=False, default=0)
+    protein = db.Column(db.Float, nullable=False, default=0)
+    carbs = db.Column(db.Float, nullable=False, default=0)
+    fats = db.Column(db.Float, nullable=False, default=0)
+    workout_count = db.Column(db.Integer, nullable=False, default=0)
+    workout_minutes = db.Column(db.Integer, nullable=False, default=0)
+    workout_calories = db.Column(db.Integer, nullable=False, default=0)
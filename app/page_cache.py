@@ -0,0 +1,100 @@
+import threading
+from flask import current_app
+from markupsafe import Markup
+from app.cache import LRUCache, SQLiteCache
+
+# Which kinds of user data each cached page section is rendered from. A write
+# to one kind drops every section that depends on it.
+SECTIONS = {
+    "dashboard_recommendation": {"recommendations"},
+    "dashboard_recent": {"meals", "workouts"},
+    "progress_stats": {"meals", "workouts", "weights", "profile"},
+    "progress_weights": {"weights", "profile"},
+}
+
+
+class PageCache:
+    """Rendered HTML fragments of per-user pages, keyed by section and user.
+
+    `backend` is anything with the app/cache.py get/set/delete interface, or
+    None to render every time. Hits and misses are counted per section.
+    """
+
+    def __init__(self, backend, ttl=600):
+        self.backend = backend
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._counts = {section: [0, 0] for section in SECTIONS}
+
+    @staticmethod
+    def key(section, user_id):
+        return f"page:{section}:{user_id}"
+
+    def fragment(self, section, user_id, render, ttl=None):
+        """Returns the cached fragment, or calls `render()` and caches its result.
+
+        `ttl` may be a callable, called after rendering and only on a miss.
+        A ttl of zero or less renders without caching.
+        """
+        if self.backend is None:
+            return Markup(render())
+
+        key = self.key(section, user_id)
+        html = self.backend.get(key)
+        with self._lock:
+            self._counts[section][html is None] += 1
+        if html is None:
+            html = render()
+            if callable(ttl):
+                ttl = ttl()
+            ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+            if ttl > 0:
+                self.backend.set(key, html, ttl)
+        return Markup(html)
+
+    def invalidate(self, user_id, *kinds):
+        """Drops the user's sections rendered from any of `kinds`."""
+        if self.backend is None:
+            return
+        for section, depends_on in SECTIONS.items():
+            if depends_on.intersection(kinds):
+                self.backend.delete(self.key(section, user_id))
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                section: {"hits": hits, "misses": misses}
+                for section, (hits, misses) in self._counts.items()
+            }
+
+
+def get_page_cache():
+    """Returns the app's PageCache, building its backend on first use."""
+    cache = current_app.extensions.get("page_cache")
+    if cache is None:
+        config = current_app.config
+        backend = config["PAGE_CACHE_BACKEND"]
+        if backend == "memory":
+            store = LRUCache(
+                maxsize=config["PAGE_CACHE_SIZE"], ttl=config["PAGE_CACHE_TTL"]
+            )
+        elif backend == "sqlite":
+            store = SQLiteCache(
+                config["PAGE_CACHE_PATH"], ttl=config["PAGE_CACHE_TTL"]
+            )
+        elif backend == "none":
+            store = None
+        else:
+            raise ValueError(f"Unknown PAGE_CACHE_BACKEND: {backend!r}")
+        cache = current_app.extensions["page_cache"] = PageCache(
+            store, ttl=config["PAGE_CACHE_TTL"]
+        )
+    return cache
+
+
+def invalidate_user_pages(user_id, *kinds):
+    get_page_cache().invalidate(user_id, *kinds)
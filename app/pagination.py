@@ -0,0 +1,66 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+from app import db  # type: ignore
+
+
+class InvalidCursor(ValueError):
+    """A page cursor could not be decoded."""
+
+
+def encode_cursor(key, id):
+    """Packs the (sort key, id) of the last row on a page into an opaque token."""
+    raw = json.dumps([key.isoformat() if key is not None else None, id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key, id = json.loads(raw)
+        return (datetime.fromisoformat(key) if key is not None else None), int(id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(cursor) from e
+
+
+def seek_page(statement, sort_column, id_column, cursor=None, limit=20):
+    """Returns one newest-first page of a query and the cursor for the next.
+
+    Rows are ordered by (sort_column DESC, id DESC) and each page starts right
+    after the previous page's last row, so the cost of a page does not grow
+    with how far back it is. NULL sort keys come last, as SQLite orders them.
+    """
+    if cursor:
+        key, last_id = decode_cursor(cursor)
+        if key is None:
+            statement = statement.where(sort_column.is_(None), id_column < last_id)
+        else:
+            statement = statement.where(
+                or_(
+                    sort_column < key,
+                    and_(sort_column == key, id_column < last_id),
+                    sort_column.is_(None),
+                )
+            )
+
+    statement = statement.order_by(sort_column.desc(), id_column.desc()).limit(
+        limit + 1
+    )
+    rows = db.session.execute(statement).scalars().all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(
+            getattr(last, sort_column.key), getattr(last, id_column.key)
+        )
+    return rows, next_cursor
+
+
+def iter_rows(statement, batch_size=500):
+    """Yields a query's rows while fetching them from the database in batches,
+    so a streamed response's memory stays flat for any history length."""
+    result = db.session.execute(statement.execution_options(yield_per=batch_size))
+    yield from result.scalars()
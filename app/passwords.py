@@ -0,0 +1,160 @@
+import math
+import threading
+import time
+from flask import current_app, has_app_context
+from werkzeug.security import check_password_hash, generate_password_hash
+from app.cache import LRUCache
+from app.instrumentation import track_work
+
+# werkzeug's own default, spelled out so stored hashes can be compared with it
+DEFAULT_METHOD = "scrypt:32768:8:1"
+
+_pool_lock = threading.Lock()
+
+
+class HashingBusy(Exception):
+    """Too many passwords are already being hashed, or hashing timed out."""
+
+
+class HashPool:
+    """Process pool for password hashing with a cap on queued + running work.
+
+    Hashes are slow on purpose; in their own processes a burst of logins
+    cannot starve the worker's request threads of CPU, and past the cap new
+    work is turned away at once instead of queueing behind it.
+    """
+
+    def __init__(self, workers, max_pending, timeout):
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Spawned, not forked: this process runs request threads
+        self._executor = ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self.timeout = timeout
+
+    def run(self, fn, *args):
+        """Runs fn(*args) in the pool and returns its result; raises
+        HashingBusy when the pool is full or the result is late."""
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy("too many passwords waiting to be hashed")
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise HashingBusy("password hashing timed out") from None
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def get_hash_pool():
+    """Returns the app's hashing pool, creating it on first use; None when
+    PASSWORD_HASH_WORKERS is 0 and hashing runs in the request thread."""
+    pool = current_app.extensions.get("hash_pool")
+    if pool is None and current_app.config["PASSWORD_HASH_WORKERS"] > 0:
+        with _pool_lock:
+            pool = current_app.extensions.get("hash_pool")
+            if pool is None:
+                pool = current_app.extensions["hash_pool"] = HashPool(
+                    current_app.config["PASSWORD_HASH_WORKERS"],
+                    current_app.config["PASSWORD_HASH_MAX_PENDING"],
+                    current_app.config["PASSWORD_HASH_TIMEOUT"],
+                )
+    return pool
+
+
+def _run(fn, *args):
+    if not has_app_context():
+        return fn(*args)
+    pool = get_hash_pool()
+    with track_work("password_hash"):
+        if pool is None:
+            return fn(*args)
+        return pool.run(fn, *args)
+
+
+def hash_password(password):
+    """Hashes with PASSWORD_HASH_METHOD, in the hashing pool if there is one."""
+    method = (
+        current_app.config["PASSWORD_HASH_METHOD"]
+        if has_app_context()
+        else DEFAULT_METHOD
+    )
+    return _run(generate_password_hash, password, method)
+
+
+def verify_password(pwhash, password):
+    """check_password_hash, in the hashing pool if there is one."""
+    return _run(check_password_hash, pwhash, password)
+
+
+def needs_rehash(pwhash):
+    """Whether `pwhash` was made with other parameters than the configured
+    PASSWORD_HASH_METHOD (werkzeug stores them before the first "$")."""
+    return pwhash.split("$", 1)[0] != current_app.config["PASSWORD_HASH_METHOD"]
+
+
+class LoginThrottle:
+    """Counts failed logins per client IP and per account over a sliding
+    window, and refuses further attempts once either reaches its limit.
+
+    Per process, like the autocomplete registry: with several workers each
+    one counts separately.
+    """
+
+    def __init__(
+        self, max_per_ip, max_per_account, window, maxsize=10000, clock=time.monotonic
+    ):
+        self.limits = {"ip": max_per_ip, "account": max_per_account}
+        self.window = window
+        self._clock = clock
+        self._failures = LRUCache(maxsize=maxsize, ttl=window, clock=clock)
+        self._lock = threading.Lock()
+
+    def _recent(self, key, now):
+        return [t for t in self._failures.get(key, ()) if t > now - self.window]
+
+    def retry_after(self, ip, account):
+        """Whole seconds until another attempt is allowed; 0 if it is now."""
+        now = self._clock()
+        wait = 0.0
+        with self._lock:
+            for kind, value in (("ip", ip), ("account", account)):
+                limit = self.limits[kind]
+                recent = self._recent((kind, value), now)
+                if limit and len(recent) >= limit:
+                    wait = max(wait, recent[-limit] + self.window - now)
+        return math.ceil(wait)
+
+    def failed(self, ip, account):
+        now = self._clock()
+        with self._lock:
+            for kind, value in (("ip", ip), ("account", account)):
+                limit = self.limits[kind]
+                if limit:
+                    recent = self._recent((kind, value), now) + [now]
+                    self._failures.set((kind, value), recent[-limit:])
+
+    def succeeded(self, account):
+        with self._lock:
+            self._failures.delete(("account", account))
+
+
+def get_login_throttle():
+    """Returns the app's login throttle, creating it on first use."""
+    throttle = current_app.extensions.get("login_throttle")
+    if throttle is None:
+        throttle = current_app.extensions["login_throttle"] = LoginThrottle(
+            current_app.config["LOGIN_MAX_FAILURES_PER_IP"],
+            current_app.config["LOGIN_MAX_FAILURES_PER_ACCOUNT"],
+            current_app.config["LOGIN_THROTTLE_WINDOW"],
+        )
+    return throttle
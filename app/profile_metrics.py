@@ -0,0 +1,123 @@
+from typing import NamedTuple
+from flask import current_app
+from sqlalchemy import event, inspect, select
+from app import db  # type: ignore
+from app.cache import LRUCache
+from app.models import User
+
+# The User fields derived metrics are computed from
+PROFILE_FIELDS = ("weight", "height", "age", "fitness_goal")
+
+# Activity multiplier per goal: moderate default
+ACTIVITY_MULTIPLIERS = {"cutting": 1.4, "lean muscle": 1.6, "endurance": 1.7}
+DEFAULT_ACTIVITY = 1.5
+
+# Share of daily calories from protein, carbs and fats
+MACRO_SPLITS = {
+    "cutting": (0.40, 0.30, 0.30),
+    "lean muscle": (0.30, 0.45, 0.25),
+    "endurance": (0.20, 0.60, 0.20),
+}
+DEFAULT_MACRO_SPLIT = (0.30, 0.40, 0.30)
+CALORIES_PER_GRAM = (4, 4, 9)
+
+
+class ProfileMetrics(NamedTuple):
+    bmr: int
+    tdee: int
+    protein: int  # daily targets, grams
+    carbs: int
+    fats: int
+
+
+def _bmr(weight, height, age):
+    # Harris-Benedict Formula for BMR; works on floats and NumPy arrays alike
+    weight_kg = weight * 0.4536
+    height_cm = height * 2.54
+    return 10 * weight_kg + 6.25 * height_cm - 5 * age + 5
+
+
+def compute_profile_metrics(weight, height, age, goal):
+    """Derived metrics for one profile. Raises TypeError if a field is None."""
+    bmr = _bmr(weight, height, age)
+    tdee = round(bmr * ACTIVITY_MULTIPLIERS.get(goal, DEFAULT_ACTIVITY))
+    split = MACRO_SPLITS.get(goal, DEFAULT_MACRO_SPLIT)
+    return ProfileMetrics(
+        round(bmr),
+        tdee,
+        *(
+            round(tdee * share / per_gram)
+            for share, per_gram in zip(split, CALORIES_PER_GRAM)
+        ),
+    )
+
+
+def batch_profile_metrics(rows):
+    """compute_profile_metrics for many (user_id, weight, height, age, goal)
+    rows at once, keyed by user id. Rows must have complete profiles."""
+    import numpy as np
+
+    rows = list(rows)
+    if not rows:
+        return {}
+    user_ids, weights, heights, ages, goals = zip(*rows)
+
+    bmr = _bmr(
+        np.array(weights, float), np.array(heights, float), np.array(ages, float)
+    )
+    multipliers = np.array(
+        [ACTIVITY_MULTIPLIERS.get(g, DEFAULT_ACTIVITY) for g in goals]
+    )
+    tdee = np.round(bmr * multipliers)
+    splits = np.array([MACRO_SPLITS.get(g, DEFAULT_MACRO_SPLIT) for g in goals])
+    grams = np.round(tdee[:, None] * splits / np.array(CALORIES_PER_GRAM))
+
+    columns = np.column_stack([np.round(bmr), tdee, grams]).astype(np.int64).tolist()
+    return {
+        user_id: ProfileMetrics(*values) for user_id, values in zip(user_ids, columns)
+    }
+
+
+def load_profile_metrics(user_ids):
+    """batch_profile_metrics for the given users, from one query. Users with
+    an incomplete profile are left out."""
+    rows = db.session.execute(
+        select(User.id, *(getattr(User, field) for field in PROFILE_FIELDS)).where(
+            User.id.in_(user_ids),
+            *(getattr(User, field).is_not(None) for field in PROFILE_FIELDS[:3]),
+        )
+    )
+    return batch_profile_metrics(rows)
+
+
+def get_metrics_cache():
+    """Returns the app's profile metrics cache, building it on first use."""
+    cache = current_app.extensions.get("profile_metrics")
+    if cache is None:
+        cache = current_app.extensions["profile_metrics"] = LRUCache(
+            maxsize=current_app.config["PROFILE_METRICS_CACHE_SIZE"],
+            ttl=current_app.config["PROFILE_METRICS_CACHE_TTL"],
+        )
+    return cache
+
+
+def get_profile_metrics(user):
+    """The user's derived metrics, computed once per profile version."""
+    cache = get_metrics_cache()
+    key = (user.id, user.profile_version)
+    metrics = cache.get(key)
+    if metrics is None:
+        metrics = compute_profile_metrics(
+            *(getattr(user, field) for field in PROFILE_FIELDS)
+        )
+        cache.set(key, metrics)
+    return metrics
+
+
+@event.listens_for(User, "before_update")
+def _bump_profile_version(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in PROFILE_FIELDS):
+        # Evaluated by the UPDATE itself, so concurrent edits cannot share a
+        # version
+        target.profile_version = User.profile_version + 1
@@ -0,0 +1,186 @@
+import random
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import exists, func, insert, select
+from app import db  # type: ignore
+from app.models import Meal, Recommendation, User
+from app.page_cache import invalidate_user_pages
+from app.profile_metrics import batch_profile_metrics
+from app.recommendation_catalog import select_recommendation
+from app.recommendations import RECENT_LIMIT, RecommendationContext
+from app.sharding import map_shards
+from app.utils import _macro_averages
+
+
+# Derived profile metrics need a complete profile
+HAS_PROFILE = (
+    User.weight.is_not(None),
+    User.height.is_not(None),
+    User.age.is_not(None),
+)
+
+
+def stale_user_ids(stale_after, shard=0, shards=1, after_id=0, limit=500):
+    """Ids of users whose latest recommendation is older than `stale_after`
+    seconds (or who have none), in id order."""
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(
+        seconds=stale_after
+    )
+    fresh = exists().where(
+        Recommendation.user_id == User.id, Recommendation.timestamp > cutoff
+    )
+    statement = (
+        select(User.id)
+        .where(
+            User.id > after_id,
+            User.id % shards == shard,
+            ~fresh,
+            *HAS_PROFILE,
+        )
+        .order_by(User.id)
+        .limit(limit)
+    )
+    return db.session.execute(statement).scalars().all()
+
+
+def _ranked(columns, partition, order_by, where):
+    rank = func.row_number().over(partition_by=partition, order_by=order_by)
+    return select(*columns, rank.label("rank")).where(where).subquery()
+
+
+def load_batch_inputs(user_ids):
+    """Fetches everything select_recommendation needs for many users.
+
+    Six set-based queries per batch, whatever its size: users (with their
+    TDEE computed for the whole batch at once), weight logs (one columnar
+    fetch), recent meal averages, recent recommendations and the two
+    feedback counts.
+    """
+    from app.trends import weight_trends
+
+    users = db.session.execute(
+        select(User.id, User.weight, User.height, User.age, User.fitness_goal).where(
+            User.id.in_(user_ids), *HAS_PROFILE
+        )
+    ).all()
+    metrics = batch_profile_metrics(users)
+    inputs = {
+        user.id: {
+            "goal": user.fitness_goal,
+            "tdee": metrics[user.id].tdee,
+            "trend": None,
+            "macros": None,
+            "recent": [],
+            "meal_feedback": [],
+            "workout_feedback": [],
+        }
+        for user in users
+    }
+
+    for user_id, trend in weight_trends(user_ids).items():
+        if user_id in inputs:
+            inputs[user_id]["trend"] = trend
+
+    meals = _ranked(
+        (Meal.user_id, Meal.calories, Meal.protein, Meal.carbs, Meal.fats),
+        Meal.user_id,
+        Meal.id.desc(),
+        Meal.user_id.in_(user_ids),
+    )
+    for user_id, *row in db.session.execute(
+        select(
+            meals.c.user_id,
+            func.count(),
+            func.avg(meals.c.calories),
+            func.avg(meals.c.protein),
+            func.avg(meals.c.carbs),
+            func.avg(meals.c.fats),
+        )
+        .where(meals.c.rank <= 3)
+        .group_by(meals.c.user_id)
+    ):
+        if user_id in inputs:
+            inputs[user_id]["macros"] = _macro_averages(row)
+
+    recs = _ranked(
+        (Recommendation.user_id, Recommendation.meal_rec, Recommendation.workout_rec),
+        Recommendation.user_id,
+        Recommendation.timestamp.desc(),
+        Recommendation.user_id.in_(user_ids),
+    )
+    for row in db.session.execute(select(recs).where(recs.c.rank <= RECENT_LIMIT)):
+        if row.user_id in inputs:
+            inputs[row.user_id]["recent"].append((row.meal_rec, row.workout_rec))
+
+    for column, key in (
+        (Recommendation.meal_rec, "meal_feedback"),
+        (Recommendation.workout_rec, "workout_feedback"),
+    ):
+        for user_id, item, status, count in db.session.execute(
+            select(Recommendation.user_id, column, Recommendation.followed, func.count())
+            .where(
+                Recommendation.user_id.in_(user_ids),
+                Recommendation.followed.is_not(None),
+            )
+            .group_by(Recommendation.user_id, column, Recommendation.followed)
+        ):
+            if user_id in inputs:
+                inputs[user_id][key].append((item, status, count))
+
+    return inputs
+
+
+def generate_batch(user_ids, rng=random):
+    """Generates and bulk-inserts one recommendation per user. Returns the count."""
+    inputs = load_batch_inputs(user_ids)
+    now = datetime.now(timezone.utc)
+    rows = []
+    for user_id, data in inputs.items():
+        context = RecommendationContext(
+            user_id, [], data["meal_feedback"], data["workout_feedback"]
+        )
+        meal, workout, note = select_recommendation(
+            data["goal"],
+            trend=data["trend"],
+            recent=data["recent"],
+            feedback=context.feedback_stats(),
+            tdee=data["tdee"],
+            macros=data["macros"],
+            rng=rng,
+        )
+        rows.append(
+            {
+                "user_id": user_id,
+                "meal_rec": meal,
+                "workout_rec": workout,
+                "trend_note": note,
+                "timestamp": now,
+            }
+        )
+
+    if rows:
+        db.session.execute(insert(Recommendation), rows)
+    db.session.commit()
+    # Only reaches other workers with the shared (sqlite) page cache backend
+    for user_id in inputs:
+        invalidate_user_pages(user_id, "recommendations")
+    return len(rows)
+
+
+def generate_recommendations(
+    stale_after=3600, batch_size=500, shard=0, shards=1, rng=random
+):
+    """Refreshes every stale user in one shard, a batch at a time."""
+    total = 0
+    after_id = 0
+    while True:
+        user_ids = stale_user_ids(stale_after, shard, shards, after_id, batch_size)
+        if not user_ids:
+            return total
+        total += generate_batch(user_ids, rng)
+        after_id = user_ids[-1]
+
+
+def generate_recommendations_parallel(stale_after=3600, batch_size=500, workers=1):
+    """Runs generate_recommendations over `workers` processes, one user-id shard
+    (id % workers) each. Returns the total count."""
+    return sum(map_shards(generate_recommendations, workers, stale_after, batch_size))
@@ -0,0 +1,500 @@
+import functools
+import operator
+import random
+
+# The recommendation rules as data. Each goal has base meal/workout options and
+# weight-trend bands checked in order (first match wins); a band's "when" lists
+# conditions on the weekly rate ("rate") or its magnitude ("abs") that must all
+# hold. compile_catalog() turns this into tuples and frozensets, once, on first
+# use (get_catalog()).
+DEFAULT_GOAL = "balanced"  # base options for users without a known goal
+
+GOALS = {
+    "cutting": {
+        "meals": (
+            "Grilled Chicken & Steamed Broccoli",
+            "Turkey Lettuce Wraps",
+            "Egg Whites + Oats",
+            "Zucchini Noodles + Lean Ground Turkey",
+            "Cauliflower Fried Rice + Shrimp",
+            "Tuna Salad with Avocado",
+            "Greek Yogurt + Berries",
+            "Cottage Cheese + Almonds",
+            "Steak Salad with Olive Oil",
+            "Boiled Eggs + Spinach",
+        ),
+        "workouts": (
+            "30 min HIIT",
+            "45 min Fasted Cardio",
+            "Full Body Calisthenics Circuit",
+            "Tabata Training",
+            "Jump Rope + Bodyweight Mix",
+            "Outdoor Run (3 miles)",
+            "Weighted Circuit Training",
+            "Incline Walking",
+            "Kickboxing",
+        ),
+        "trends": (
+            {
+                "when": (("abs", "<", 0.2),),
+                "meals": (
+                    "Zucchini Noodle Bowl with Turkey Meatballs",
+                    "Kale + Grilled Chicken Salad with Olive Oil Vinaigrette",
+                    "Cauliflower Rice Stir-Fry with Egg Whites",
+                ),
+                "workouts": (
+                    "Extra HIIT Session (20-30 min)",
+                    "Fast-Paced Full-Body Circuit",
+                    "Incline Walk + Core Finisher",
+                ),
+                "note": (
+                    "Your weight hasn't changed much since {since}. "
+                    "Try tightening your meal portions or increasing workout intensity."
+                ),
+            },
+            {
+                "when": (("rate", "<", -2),),
+                "meals": (
+                    "Maintenance Bowl: Salmon, Quinoa, Avocado, Roasted Veggies",
+                    "Refeed Meal: Steak, Roasted Sweet Potato, Sautéed Spinach",
+                    "Protein-Packed Omelet with Whole Eggs and Toast",
+                ),
+                "workouts": (
+                    "Mobility Recovery + Light Walk",
+                    "Yoga Flow + Deep Stretch",
+                    "Zone 2 Cardio (e.g., 45 min bike or walk)",
+                ),
+                "note": (
+                    "You're losing weight too quickly (< -2 lbs/week since {since}). "
+                    "Consider a maintenance day or refeed to preserve muscle and energy."
+                ),
+            },
+            {
+                "when": (("rate", ">", 1),),
+                "meals": (
+                    "Balanced Bowl with Veggies + Lean Protein",
+                    "Healthy Salad with Chicken + Balsamic Dressing",
+                    "Grilled Chicken + Zucchini Noodles",
+                ),
+                "workouts": (
+                    "Strength Training (Full Body)",
+                    "Medium-Intensity Cardio (30-40 mins)",
+                    "Bodyweight HIIT",
+                ),
+                "note": (
+                    "You're gaining weight despite a cutting goal since {since}. "
+                    "Make sure your calorie intake is properly aligned with your goal."
+                ),
+            },
+        ),
+    },
+    "lean muscle": {
+        "meals": (
+            "Steak + Brown Rice + Veggies",
+            "Quinoa + Chicken + Avocado",
+            "Salmon + Sweet Potato",
+            "Ground Turkey Tacos (Whole Wheat)",
+            "Lentil Stew + Grilled Chicken",
+            "Greek Yogurt Smoothie + Granola",
+            "Tofu + Stir-Fried Vegetables + Rice",
+            "Cottage Cheese + Banana + Peanut Butter",
+            "High-Protein Pasta Bowl",
+        ),
+        "workouts": (
+            "Push-Pull-Legs Split",
+            "Upper/Lower Body Split",
+            "Heavy Compound Lifting (Squat/Deadlift)",
+            "Chest + Triceps Day",
+            "Back + Biceps Routine",
+            "Shoulder & Core Superset",
+            "Barbell Complexes",
+            "Progressive Overload Program",
+        ),
+        "trends": (
+            {
+                "when": (("rate", "<", 0.1),),
+                "meals": (
+                    "Chicken Thighs with Jasmine Rice and Avocado",
+                    "High-Calorie Protein Shake with Nut Butter & Oats",
+                    "Ground Beef and Potato Bowl with Veggies",
+                ),
+                "workouts": (
+                    "Heavy Strength Training",
+                    "Push-Pull-Legs Split",
+                    "Upper/Lower Body Split with Progressive Overload",
+                ),
+                "note": (
+                    "Muscle gain progress has slowed since {since}. "
+                    "Add more calories and focus on progressive overload in workouts."
+                ),
+            },
+            {
+                "when": (("rate", ">=", 0.5),),
+                "meals": (
+                    "Protein-Packed Chicken & Rice",
+                    "Tuna Salad with Avocado",
+                    "High-Protein Smoothie + Nut Butters",
+                ),
+                "workouts": (
+                    "Strength Training with Progressive Overload",
+                    "Legs + Back Day",
+                    "Push-Pull Routine",
+                ),
+                "note": (
+                    "You're gaining muscle well since {since}. "
+                    "Keep up with the strength training and nutrition!"
+                ),
+            },
+            # Unreachable after the band above; kept so the table matches the old rules
+            {
+                "when": (("rate", ">", 1),),
+                "meals": (
+                    "Beef + Potato Bowl with Veggies",
+                    "Omelet with Eggs and Avocado",
+                    "High-Calorie Smoothie with Oats and Peanut Butter",
+                ),
+                "workouts": (
+                    "Heavy Resistance Training",
+                    "Upper Body Hypertrophy Focus",
+                    "Lower Body Strength Training",
+                ),
+                "note": (
+                    "You're gaining muscle too rapidly since {since}. "
+                    "Consider adjusting calorie intake for more controlled gains."
+                ),
+            },
+        ),
+    },
+    "endurance": {
+        "meals": (
+            "Whole Grain Pasta + Turkey Meatballs",
+            "Protein Smoothie + Banana",
+            "Oatmeal + Chia Seeds + Almond Butter",
+            "Sweet Potato Hash + Eggs",
+            "Energy Bars + Protein Yogurt",
+            "Salmon + Brown Rice + Greens",
+            "Bean & Veggie Burrito Bowl",
+            "Trail Mix + Greek Yogurt",
+        ),
+        "workouts": (
+            "5K Training Program",
+            "Interval Running (Run/Walk)",
+            "Cycling (40 min steady-state)",
+            "Swimming Laps (30-60 min)",
+            "Rowing Machine Intervals",
+            "Hiking with Pack (1 hr+)",
+            "Stadium Stairs + Core Superset",
+            "Boxing + Jump Rope",
+        ),
+        "trends": (
+            {
+                "when": (("abs", "<", 0.1),),
+                "meals": (
+                    "Lean Chicken Wrap with Veggies",
+                    "Oatmeal with Banana and Almond Butter",
+                    "Tuna Salad on Whole Grain Toast",
+                ),
+                "workouts": (
+                    "Low-Intensity Steady-State Cardio",
+                    "Active Recovery (Yoga/Stretching)",
+                    "Moderate-Intensity Running or Cycling",
+                ),
+                "note": (
+                    "Your weight is staying stable since {since}. "
+                    "Focus on increasing your endurance performance."
+                ),
+            },
+            {
+                "when": (("abs", ">", 1),),
+                "meals": (
+                    "Healthy Chicken Salad with Quinoa",
+                    "Roasted Salmon with Sweet Potato",
+                    "Greek Yogurt with Berries",
+                ),
+                "workouts": (
+                    "HIIT or Interval Training",
+                    "Strength + Endurance Circuit",
+                    "Long-Distance Running or Cycling",
+                ),
+                "note": (
+                    "You're seeing larger weight fluctuations since {since}. "
+                    "This could indicate changes in muscle/fat distribution, which is normal for endurance training."
+                ),
+            },
+        ),
+    },
+    "balanced": {
+        "meals": (
+            "Grilled Chicken + Rice Bowl",
+            "Shrimp Stir-Fry + Mixed Veggies",
+            "Turkey Sandwich + Sweet Potato",
+            "Veggie Omelet + Whole Wheat Toast",
+            "Tofu Bowl + Edamame + Brown Rice",
+            "Salmon + Couscous + Spinach",
+            "Whole Wheat Wrap + Turkey + Hummus",
+        ),
+        "workouts": (
+            "30 min Mixed Cardio",
+            "Full Body Dumbbell Routine",
+            "Pilates or Yoga Flow",
+            "Basic Strength Training (3x/week)",
+            "Spin Class + Light Core Work",
+            "Bodyweight Supersets",
+            "Resistance Band Conditioning",
+            "Cardio + Stretching Combo",
+        ),
+        "trends": (
+            {
+                "when": (("abs", "<", 0.2),),
+                "meals": (
+                    "Grilled Chicken & Veggies",
+                    "Turkey Sandwich with Avocado",
+                    "Spinach Salad with Grilled Chicken",
+                ),
+                "workouts": (
+                    "Full-Body Strength Workout",
+                    "Cardio + Core",
+                    "Yoga + Stretching",
+                ),
+                "note": (
+                    "You're maintaining weight well since {since}. "
+                    "Keep it balanced and focus on strength and performance."
+                ),
+            },
+            {
+                "when": (("rate", ">", 0.2), ("rate", "<", 1)),
+                "meals": (
+                    "Lean Beef + Sweet Potato",
+                    "Greek Yogurt with Almonds",
+                    "High-Protein Smoothie + Nut Butter",
+                ),
+                "workouts": (
+                    "Strength Training",
+                    "Low-Intensity Cardio",
+                    "Active Recovery",
+                ),
+                "note": (
+                    "You're gaining a little weight, but it's likely muscle. "
+                    "Stay consistent with your balanced fitness approach."
+                ),
+            },
+            {
+                "when": (("rate", ">", 1),),
+                "meals": (
+                    "Grilled Fish + Avocado",
+                    "Protein Shake with Oats and Almond Butter",
+                    "Chicken Salad with Olive Oil Dressing",
+                ),
+                "workouts": (
+                    "Progressive Resistance Training",
+                    "High-Intensity Interval Training",
+                    "Cardio + Core Strengthening",
+                ),
+                "note": (
+                    "You're gaining weight faster than planned since {since}. "
+                    "Consider re-assessing your calorie intake for a more gradual approach."
+                ),
+            },
+        ),
+    },
+}
+
+MACRO_RULES = (
+    {
+        "goal": None,
+        "macro": "protein",
+        "op": "<",
+        "value": 20,  # grams
+        "meals": (
+            "Protein Smoothie with Whey + Greek Yogurt & Berries",
+            "Egg White Omelet with Avocado + Spinach",
+            "Chicken + Tofu Stir-Fry with Edamame and Quinoa",
+        ),
+        "note": " Protein intake is low — adding high-protein meals to support your goal.",
+    },
+    {
+        "goal": "cutting",
+        "macro": "calories",
+        "op": ">",
+        "tdee_margin": 0.05,  # 5% over TDEE considered high for cutting
+        "meals": (
+            "Low-Carb Salad with Lean Chicken + Olive Oil",
+            "Zucchini Noodles with Grilled Turkey & Pesto",
+            "Grilled Cod or Tilapia with Steamed Broccoli & Cauliflower Mash",
+        ),
+        "note": (
+            " Your average calorie intake is above your estimated needs. "
+            "Try lighter, lower-carb meals to stay in a deficit."
+        ),
+    },
+)
+
+OPERATORS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+
+class Options:
+    """An ordered tuple of options plus a frozenset for membership tests."""
+
+    __slots__ = ("items", "members", "_without")
+
+    def __init__(self, items):
+        self.items = tuple(items)
+        self.members = frozenset(self.items)
+        self._without = {frozenset(): self.items}
+
+    def without(self, excluded):
+        """The options minus `excluded`, in order. Results are memoized by the
+        excluded members, of which there are only a few combinations."""
+        key = self.members.intersection(excluded)
+        items = self._without.get(key)
+        if items is None:
+            items = tuple(item for item in self.items if item not in key)
+            if len(self._without) < 1024:
+                self._without[key] = items
+        return items
+
+
+class Band:
+    __slots__ = ("conditions", "meals", "workouts", "note")
+
+    def __init__(self, conditions, meals, workouts, note):
+        self.conditions = conditions
+        self.meals = meals
+        self.workouts = workouts
+        self.note = note
+
+    def matches(self, rate):
+        for use_abs, compare, limit in self.conditions:
+            if not compare(abs(rate) if use_abs else rate, limit):
+                return False
+        return True
+
+
+class Catalog:
+    """The compiled rule table.
+
+    `options[(goal, band)]` holds the base options with the matched trend
+    band's additions already appended, for every goal and band (None when no
+    band matched), so a call never builds lists.
+    """
+
+    def __init__(self, goals, macro_rules, default_goal):
+        self.default_goal = default_goal
+        self.bands = {}
+        self.options = {}
+        for goal, rules in goals.items():
+            bands = tuple(
+                Band(
+                    tuple(
+                        (measure == "abs", OPERATORS[op], limit)
+                        for measure, op, limit in band["when"]
+                    ),
+                    band["meals"],
+                    band["workouts"],
+                    band["note"],
+                )
+                for band in rules["trends"]
+            )
+            self.bands[goal] = bands
+            for band in (None, *bands):
+                self.options[(goal, band)] = (
+                    Options(rules["meals"] + (band.meals if band else ())),
+                    Options(rules["workouts"] + (band.workouts if band else ())),
+                )
+        self.macro_rules = tuple(
+            (
+                rule["goal"],
+                rule["macro"],
+                OPERATORS[rule["op"]],
+                rule.get("value"),
+                rule.get("tdee_margin"),
+                rule["meals"],
+                rule["note"],
+            )
+            for rule in macro_rules
+        )
+
+    def match_band(self, goal, trend):
+        if trend:
+            rate = trend["rate_per_week"]
+            for band in self.bands.get(goal, ()):
+                if band.matches(rate):
+                    return band
+        return None
+
+
+def compile_catalog(goals=GOALS, macro_rules=MACRO_RULES, default_goal=DEFAULT_GOAL):
+    return Catalog(goals, macro_rules, default_goal)
+
+
+@functools.cache
+def get_catalog():
+    """The compiled default catalog, built on first use."""
+    return compile_catalog()
+
+
+def __getattr__(name):
+    if name == "CATALOG":
+        return get_catalog()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def select_recommendation(
+    goal,
+    trend=None,
+    recent=(),
+    feedback=(frozenset(), frozenset(), frozenset(), frozenset()),
+    tdee=None,
+    macros=None,
+    rng=random,
+    catalog=None,
+):
+    """Picks a (meal, workout, note) without touching the database.
+
+    `trend` is analyze_weight_trend's result, `recent` the (meal, workout)
+    pairs of the latest recommendations, `feedback` the four sets from
+    RecommendationContext.feedback_stats() and `macros` average_recent_macros'.
+    """
+    if catalog is None:
+        catalog = get_catalog()
+    band = catalog.match_band(goal, trend)
+    base_goal = goal if (goal, None) in catalog.options else catalog.default_goal
+    meals, workouts = catalog.options[(base_goal, band)]
+    note = band.note.format(since=trend["since"]) if band else ""
+
+    extra_meals = []
+    if macros:
+        for rule_goal, macro, compare, value, margin, rule_meals, rule_note in (
+            catalog.macro_rules
+        ):
+            if rule_goal is not None and rule_goal != goal:
+                continue
+            limit = value if margin is None else tdee * (1 + margin)
+            if compare(macros[macro], limit):
+                extra_meals.extend(rule_meals)
+                note += rule_note
+
+    meal_choices = meals.without({meal for meal, _ in recent})
+    workout_choices = workouts.without({workout for _, workout in recent})
+
+    # Only when every option was recommended recently: fall back to the
+    # feedback-ranked options (followed first, skipped removed)
+    followed_meals, skipped_meals, followed_workouts, skipped_workouts = feedback
+    if not meal_choices:
+        meal_choices = tuple(
+            dict.fromkeys(
+                (
+                    *sorted(followed_meals),
+                    *meals.without(skipped_meals),
+                    *extra_meals,
+                )
+            )
+        )
+    if not workout_choices:
+        workout_choices = tuple(
+            dict.fromkeys(
+                (*sorted(followed_workouts), *workouts.without(skipped_workouts))
+            )
+        )
+
+    return rng.choice(meal_choices), rng.choice(workout_choices), note
@@ -0,0 +1,131 @@
+from flask import g
+from sqlalchemy import Integer, String, cast, func, literal, null, select, union_all
+from app import db  # type: ignore
+from app.models import Recommendation
+
+RECENT_LIMIT = 3
+FEEDBACK_THRESHOLD = 2  # avoid reacting to one-off decisions
+
+
+class RecommendationContext:
+    """A user's recent recommendations and feedback counts, loaded together.
+
+    Built once per request by get_recommendation_context() and shared by the
+    dashboard and generate_recommendation.
+    """
+
+    def __init__(self, user_id, recent, meal_feedback, workout_feedback):
+        self.user_id = user_id
+        self.recent = recent
+        self.meal_feedback = meal_feedback
+        self.workout_feedback = workout_feedback
+
+    @classmethod
+    def load(cls, user_id, recent_limit=RECENT_LIMIT):
+        """Fetches everything with a single UNION ALL statement."""
+        recent = (
+            select(Recommendation)
+            .where(Recommendation.user_id == user_id)
+            .order_by(Recommendation.timestamp.desc())
+            .limit(recent_limit)
+            .subquery()
+        )
+        has_feedback = (
+            Recommendation.user_id == user_id,
+            Recommendation.followed.is_not(None),
+        )
+        statement = union_all(
+            select(
+                literal("recent", String).label("kind"),
+                recent.c.id,
+                recent.c.meal_rec,
+                recent.c.workout_rec,
+                recent.c.trend_note,
+                recent.c.followed,
+                recent.c.timestamp,
+                cast(null(), Integer).label("count"),
+            ),
+            select(
+                literal("meal"),
+                null(),
+                Recommendation.meal_rec,
+                null(),
+                null(),
+                Recommendation.followed,
+                null(),
+                func.count(),
+            )
+            .where(*has_feedback)
+            .group_by(Recommendation.meal_rec, Recommendation.followed),
+            select(
+                literal("workout"),
+                null(),
+                null(),
+                Recommendation.workout_rec,
+                null(),
+                Recommendation.followed,
+                null(),
+                func.count(),
+            )
+            .where(*has_feedback)
+            .group_by(Recommendation.workout_rec, Recommendation.followed),
+        )
+
+        recent_recs, meal_feedback, workout_feedback = [], [], []
+        for row in db.session.execute(statement).mappings():
+            if row["kind"] == "recent":
+                recent_recs.append(
+                    Recommendation(
+                        id=row["id"],
+                        user_id=user_id,
+                        meal_rec=row["meal_rec"],
+                        workout_rec=row["workout_rec"],
+                        trend_note=row["trend_note"],
+                        followed=row["followed"],
+                        timestamp=row["timestamp"],
+                    )
+                )
+            elif row["kind"] == "meal":
+                meal_feedback.append((row["meal_rec"], row["followed"], row["count"]))
+            else:
+                workout_feedback.append(
+                    (row["workout_rec"], row["followed"], row["count"])
+                )
+
+        # The subquery's LIMIT picks the rows but UNION ALL does not promise
+        # to keep their order
+        recent_recs.sort(key=lambda r: r.timestamp, reverse=True)
+        return cls(user_id, recent_recs, meal_feedback, workout_feedback)
+
+    @property
+    def latest(self):
+        return self.recent[0] if self.recent else None
+
+    def add(self, recommendation):
+        """Records a recommendation created during this request."""
+        self.recent = [recommendation, *self.recent][:RECENT_LIMIT]
+
+    def feedback_stats(self, threshold=FEEDBACK_THRESHOLD):
+        """Returns sets of meals/workouts that are frequently followed or skipped."""
+        followed_meals, skipped_meals = _split(self.meal_feedback, threshold)
+        followed_workouts, skipped_workouts = _split(self.workout_feedback, threshold)
+        return followed_meals, skipped_meals, followed_workouts, skipped_workouts
+
+
+def _split(feedback, threshold):
+    followed, skipped = set(), set()
+    for item, status, count in feedback:
+        if count >= threshold:
+            if status == "followed":
+                followed.add(item)
+            elif status == "skipped":
+                skipped.add(item)
+    return followed, skipped
+
+
+def get_recommendation_context(user_id):
+    """Returns this request's RecommendationContext for a user."""
+    contexts = g.setdefault("recommendation_contexts", {})
+    if user_id not in contexts:
+        contexts[user_id] = RecommendationContext.load(user_id)
+    return contexts[user_id]
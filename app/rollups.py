@@ -0,0 +1,195 @@
+from sqlalchemy import delete, event, func, insert, inspect, select, update
+from app import db  # type: ignore
+from app.models import Meal, UserRollup, Workout
+
+# rollup column -> model attribute
+MEAL_FIELDS = {"calories": "calories", "protein": "protein", "carbs": "carbs", "fats": "fats"}
+WORKOUT_FIELDS = {"workout_minutes": "duration", "workout_calories": "calories_burned"}
+COLUMNS = ("meal_count", *MEAL_FIELDS, "workout_count", *WORKOUT_FIELDS)
+
+
+def _raw_totals(connection, user_id=None):
+    """Recomputes rollup values from the raw meal and workout rows."""
+    totals = {}
+    for model, count_column, fields in (
+        (Meal, "meal_count", MEAL_FIELDS),
+        (Workout, "workout_count", WORKOUT_FIELDS),
+    ):
+        query = select(
+            model.user_id,
+            func.count(),
+            *(func.coalesce(func.sum(getattr(model, attr)), 0) for attr in fields.values()),
+        ).group_by(model.user_id)
+        if user_id is not None:
+            query = query.where(model.user_id == user_id)
+
+        for uid, count, *sums in connection.execute(query):
+            if uid is None:
+                continue
+            row = totals.setdefault(uid, dict.fromkeys(COLUMNS, 0))
+            row[count_column] = count
+            row.update(zip(fields, sums))
+    return totals
+
+
+def _ensure(connection, user_id):
+    """Creates the user's rollup from the raw rows if it does not exist yet.
+
+    Runs before the row change is written, so existing users (or a dropped
+    rollup) are seeded with their history rather than just the new change.
+    """
+    if user_id is None:
+        return
+
+    exists = connection.execute(
+        select(UserRollup.user_id).where(UserRollup.user_id == user_id)
+    ).first()
+    if exists is None:
+        row = _raw_totals(connection, user_id).get(user_id, dict.fromkeys(COLUMNS, 0))
+        connection.execute(insert(UserRollup).values(user_id=user_id, **row))
+
+
+def _apply(connection, user_id, count_column, count, deltas):
+    """Adds deltas to a user's rollup inside the current flush."""
+    if user_id is None:
+        return
+
+    values = {count_column: getattr(UserRollup, count_column) + count}
+    values.update({col: getattr(UserRollup, col) + d for col, d in deltas.items()})
+    connection.execute(
+        update(UserRollup).where(UserRollup.user_id == user_id).values(values)
+    )
+
+
+def _old_value(target, attr, default):
+    history = inspect(target).attrs[attr].history
+    return history.deleted[0] if history.deleted else default
+
+
+def _track(model, count_column, fields):
+    def values(target):
+        return {col: getattr(target, attr) or 0 for col, attr in fields.items()}
+
+    # Edits need the previous value even when the attribute was expired (e.g.
+    # after a commit), so have SQLAlchemy load it before it is overwritten
+    for attr in ("user_id", *fields.values()):
+        event.listen(
+            getattr(model, attr), "set", lambda *args: None, active_history=True
+        )
+
+    @event.listens_for(model, "before_insert")
+    @event.listens_for(model, "before_delete")
+    def seed(mapper, connection, target):
+        _ensure(connection, target.user_id)
+
+    @event.listens_for(model, "before_update")
+    def seed_both(mapper, connection, target):
+        _ensure(connection, _old_value(target, "user_id", target.user_id))
+        _ensure(connection, target.user_id)
+
+    @event.listens_for(model, "after_insert")
+    def added(mapper, connection, target):
+        _apply(connection, target.user_id, count_column, 1, values(target))
+
+    @event.listens_for(model, "after_delete")
+    def removed(mapper, connection, target):
+        negated = {col: -v for col, v in values(target).items()}
+        _apply(connection, target.user_id, count_column, -1, negated)
+
+    @event.listens_for(model, "after_update")
+    def edited(mapper, connection, target):
+        new = values(target)
+        old = {
+            col: _old_value(target, attr, new[col]) or 0 for col, attr in fields.items()
+        }
+
+        old_user = _old_value(target, "user_id", target.user_id)
+        if old_user != target.user_id:
+            _apply(connection, old_user, count_column, -1, {c: -v for c, v in old.items()})
+            _apply(connection, target.user_id, count_column, 1, new)
+        elif old != new:
+            _apply(
+                connection,
+                target.user_id,
+                count_column,
+                0,
+                {col: new[col] - old[col] for col in fields},
+            )
+
+
+_track(Meal, "meal_count", MEAL_FIELDS)
+_track(Workout, "workout_count", WORKOUT_FIELDS)
+
+TRACKED = {Meal: ("meal_count", MEAL_FIELDS), Workout: ("workout_count", WORKOUT_FIELDS)}
+
+
+def bulk_insert(model, rows):
+    """Inserts rows (dicts) with one executemany, keeping rollups in step.
+
+    Bulk inserts skip the mapper events above, so the affected users' rollups
+    are seeded first and then given one aggregated delta each.
+    """
+    if not rows:
+        return
+    connection = db.session.connection()
+    tracked = TRACKED.get(model)
+    if tracked is not None:
+        for user_id in {row["user_id"] for row in rows}:
+            _ensure(connection, user_id)
+
+    db.session.execute(insert(model), rows)
+
+    if tracked is not None:
+        count_column, fields = tracked
+        sums = {}
+        for row in rows:
+            totals = sums.setdefault(row["user_id"], [0, dict.fromkeys(fields, 0)])
+            totals[0] += 1
+            for col, attr in fields.items():
+                totals[1][col] += row.get(attr) or 0
+        for user_id, (count, deltas) in sums.items():
+            _apply(connection, user_id, count_column, count, deltas)
+
+
+def get_user_totals(user_id):
+    """Returns the user's rollup, computing one (without saving it) if missing."""
+    rollup = db.session.get(UserRollup, user_id)
+    if rollup is None:
+        row = _raw_totals(db.session.connection(), user_id).get(
+            user_id, dict.fromkeys(COLUMNS, 0)
+        )
+        rollup = UserRollup(user_id=user_id, **row)
+    return rollup
+
+
+def rebuild_rollups():
+    """Recomputes every user's rollup from the raw rows. Returns the user count."""
+    totals = _raw_totals(db.session.connection())
+    db.session.execute(delete(UserRollup))
+    if totals:
+        db.session.execute(
+            insert(UserRollup), [{"user_id": uid, **row} for uid, row in totals.items()]
+        )
+    db.session.commit()
+    return len(totals)
+
+
+def check_rollups(tolerance=1e-6):
+    """Compares stored rollups with the raw rows.
+
+    Returns a list of (user_id, column, stored, expected) for every mismatch.
+    """
+    expected = _raw_totals(db.session.connection())
+    stored = {r.user_id: r for r in UserRollup.query.all()}
+
+    mismatches = []
+    for user_id in sorted(expected.keys() | stored.keys()):
+        want = expected.get(user_id, dict.fromkeys(COLUMNS, 0))
+        have = stored.get(user_id)
+        for column in COLUMNS:
+            value = getattr(have, column) if have is not None else None
+            if value is None or abs(value - want[column]) > tolerance:
+                if have is None and not want[column]:
+                    continue
+                mismatches.append((user_id, column, value, want[column]))
+    return mismatches
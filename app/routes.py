@@ -1,9 +1,35 @@
+import io
+import secrets
 from datetime import datetime, timezone
-from flask import jsonify, request, redirect, url_for, render_template, flash, session
+from flask import (
+    Blueprint,
+    Response,
+    current_app,
+    jsonify,
+    request,
+    redirect,
+    url_for,
+    render_template,
+    flash,
+    session,
+    stream_template,
+    stream_with_context,
+)
 from flask_login import current_user, login_user, logout_user, login_required
-from sqlalchemy import or_
-from app import app, db  # type: ignore
+from sqlalchemy import or_, select
+from app import db  # type: ignore
 from app.models import Meal, User, WeightLog, Workout, Recommendation
+from app.autocomplete import get_autocomplete_state, stream_suggestions
+from app.bulk_import import InvalidImport, guess_format, import_rows, read_rows
+from app.charts import invalidate_weight_chart, weight_chart
+from app.data_export import FORMATS, KINDS, InvalidExport, export_chunks
+from app.page_cache import get_page_cache, invalidate_user_pages
+from app.pagination import InvalidCursor, iter_rows, seek_page
+from app.passwords import HashingBusy, get_login_throttle
+from app.profile_metrics import get_profile_metrics
+from app.recommendations import get_recommendation_context
+from app.rollups import get_user_totals
+from app.usda import UpstreamUnavailable
 from app.forms import (
     MealForm,
     ProfileForm,
@@ -13,67 +39,101 @@ from app.forms import (
     LoginForm,
 )
 from app.utils import (
-    estimate_tdee,
     generate_recommendation,
-    search_usda_food,
+    autocomplete_foods,
+    get_food_cache,
+    lookup_usda_food,
     calculate_progress_stats,
 )
 
+bp = Blueprint("main", __name__)
+
 
-@app.route("/")
+@bp.route("/")
 def home():
     return render_template("home.html")
 
 
-@app.route("/dashboard")
+@bp.route("/dashboard")
 @login_required
 def user_dashboard():
     user = current_user
-
-    # OPTIONAL: Auto-generate a rec if no recent one exists
-    rec = (
-        Recommendation.query.filter_by(user_id=user.id)
-        .order_by(Recommendation.timestamp.desc())
-        .first()
-    )
-    if (
+    cache = get_page_cache()
+    fragments = {
+        "recommendation": cache.fragment(
+            "dashboard_recommendation",
+            user.id,
+            lambda: _render_dashboard_recommendation(user),
+            ttl=lambda: _recommendation_fresh_for(user.id),
+        ),
+        "recent": cache.fragment(
+            "dashboard_recent", user.id, lambda: _render_dashboard_recent(user)
+        ),
+    }
+    return render_template("user_dashboard.html", user=user, fragments=fragments)
+
+
+def _recommendation_fresh_for(user_id):
+    """Seconds until the dashboard would replace the user's latest
+    recommendation, so its cached card expires when it goes stale."""
+    if not current_app.config["RECOMMENDATIONS_ON_DASHBOARD"]:
+        return None  # the batch job invalidates what it replaces
+    rec = get_recommendation_context(user_id).latest
+    if rec is None:
+        return 0
+    age = (
+        datetime.now(timezone.utc) - rec.timestamp.replace(tzinfo=timezone.utc)
+    ).total_seconds()
+    return current_app.config["RECOMMENDATION_STALE_AFTER"] - age
+
+
+def _render_dashboard_recommendation(user):
+    # One query for the latest recs and feedback, shared with the generator
+    context = get_recommendation_context(user.id)
+
+    # OPTIONAL: Auto-generate a rec if no recent one exists (turned off when
+    # `flask generate-recommendations` keeps them fresh instead)
+    rec = context.latest
+    if current_app.config["RECOMMENDATIONS_ON_DASHBOARD"] and (
         not rec
         or (
             datetime.now(timezone.utc) - rec.timestamp.replace(tzinfo=timezone.utc)
         ).total_seconds()
-        > 3600
+        > current_app.config["RECOMMENDATION_STALE_AFTER"]
     ):
-        meal, workout, note = generate_recommendation(user)
+        meal, workout, note = generate_recommendation(user, context)
         rec = Recommendation(
             user_id=user.id, meal_rec=meal, workout_rec=workout, trend_note=note
         )
         db.session.add(rec)
         db.session.commit()
+        context.add(rec)
 
-    workouts = Workout.query.filter_by(user_id=user.id).all()
-    meals = Meal.query.filter_by(user_id=user.id).all()
-    recommendation = (
-        Recommendation.query.filter_by(user_id=user.id)
-        .order_by(Recommendation.timestamp.desc())
-        .first()
+    return render_template(
+        "dashboard_recommendation.html", recommendation=context.latest
     )
 
-    return render_template(
-        "user_dashboard.html",
-        user=user,
-        workouts=workouts,
-        meals=meals,
-        recommendation=recommendation,
+
+def _render_dashboard_recent(user):
+    workouts, _ = seek_page(
+        select(Workout).where(Workout.user_id == user.id),
+        Workout.date,
+        Workout.id,
+        limit=5,
     )
+    meals = (
+        Meal.query.filter_by(user_id=user.id).order_by(Meal.id.desc()).limit(5).all()
+    )
+    return render_template("dashboard_recent.html", workouts=workouts, meals=meals)
 
 
-@app.route("/dashboard_redirect", methods=["POST"])
+@bp.route("/dashboard_redirect", methods=["POST"])
 def dashboard_redirect():
     # Redirect to the generic dashboard route
-    return redirect(url_for("user_dashboard"))
+    return redirect(url_for("main.user_dashboard"))
 
 
-@app.route("/log_workout", methods=["GET", "POST"])
+@bp.route("/log_workout", methods=["GET", "POST"])
 @login_required
 def log_workout():
     form = WorkoutForm()
@@ -86,23 +146,24 @@ def log_workout():
         )
         db.session.add(workout)
         db.session.commit()
+        invalidate_user_pages(current_user.id, "workouts")
         flash("Workout logged successfully!", "success")
-        return redirect(url_for("user_dashboard"))
+        return redirect(url_for("main.user_dashboard"))
 
     return render_template("log_workout.html", form=form, user=current_user)
 
 
-@app.route("/register", methods=["GET", "POST"])
+@bp.route("/register", methods=["GET", "POST"])
 def register():
     if current_user.is_authenticated:
-        return redirect(url_for("user_dashboard"))
+        return redirect(url_for("main.user_dashboard"))
     form = UserRegistrationForm()
     if form.validate_on_submit():
         existing_user = User.query.filter_by(email=form.email.data).first()
         existing_username = User.query.filter_by(username=form.username.data).first()
         if existing_user or existing_username:
             flash("Email or username already in use.", "danger")
-            return redirect(url_for("register"))
+            return redirect(url_for("main.register"))
 
         user = User(
             username=form.username.data,
@@ -113,7 +174,13 @@ def register():
             height=form.height.data,
             fitness_goal=form.fitness_goal.data,
         )
-        user.set_password(form.password.data)
+        try:
+            user.set_password(form.password.data)
+        except HashingBusy:
+            flash(
+                "Registration is busy right now. Please try again shortly.", "warning"
+            )
+            return render_template("register.html", form=form), 503
 
         db.session.add(user)
         db.session.commit()
@@ -126,19 +193,19 @@ def register():
         db.session.commit()
 
         flash("Account created successfully!", "success")
-        return redirect(url_for("register_success"))
+        return redirect(url_for("main.register_success"))
     return render_template("register.html", form=form)
 
 
-@app.route("/register_success")
+@bp.route("/register_success")
 def register_success():
     return render_template("register_success.html")
 
 
-@app.route("/login", methods=["GET", "POST"])
+@bp.route("/login", methods=["GET", "POST"])
 def login():
     if current_user.is_authenticated:
-        return redirect(url_for("user_dashboard"))
+        return redirect(url_for("main.user_dashboard"))
     form = LoginForm()
     if form.validate_on_submit():
         identifier = (form.email.data or "").strip()
@@ -146,26 +213,57 @@ def login():
             or_(User.email == identifier, User.username == identifier)
         ).first()
 
-        if user and user.check_password(form.password.data):
+        # Throttled per account whichever identifier was typed; unknown ones
+        # count too, so they cannot be told apart from wrong passwords
+        throttle = get_login_throttle()
+        ip = request.remote_addr or ""
+        account = f"user:{user.id}" if user else identifier.lower()
+        retry_after = throttle.retry_after(ip, account)
+        if retry_after:
+            flash(
+                f"Too many failed logins. Try again in {retry_after} seconds.",
+                "danger",
+            )
+            headers = {"Retry-After": str(retry_after)}
+            return render_template("login.html", form=form), 429, headers
+
+        try:
+            valid = user is not None and user.check_password(form.password.data)
+        except HashingBusy:
+            flash("Login is busy right now. Please try again shortly.", "warning")
+            headers = {"Retry-After": "1"}
+            return render_template("login.html", form=form), 503, headers
+
+        if valid:
+            throttle.succeeded(account)
+            if user.password_needs_rehash():
+                # Stored with older hash parameters: upgrade while we have the
+                # password, or at a later login if the pool is busy now
+                try:
+                    user.set_password(form.password.data)
+                    db.session.commit()
+                except HashingBusy:
+                    db.session.rollback()
             login_user(user)
             flash(f"Welcome back, {user.name}!", "success")
             next_page = request.args.get("next")
             if not next_page or not next_page.startswith("/"):
-                next_page = url_for("user_dashboard")
+                next_page = url_for("main.user_dashboard")
             return redirect(next_page)
         else:
+            throttle.failed(ip, account)
             flash("Invalid email/username or password.", "danger")
     return render_template("login.html", form=form)
 
 
-@app.route("/logout")
+@bp.route("/logout")
 def logout():
     logout_user()
     flash("You have been logged out.", "info")
-    return redirect(url_for("home"))
+    return redirect(url_for("main.home"))
 
 
-@app.route("/log_meal", methods=["GET", "POST"])
+@bp.route("/log_meal", methods=["GET", "POST"])
 @login_required
 def log_meal():
     form = MealForm()
@@ -190,13 +288,14 @@ def log_meal():
         )
         db.session.add(meal)
         db.session.commit()
+        invalidate_user_pages(current_user.id, "meals")
         flash("Meal logged successfully!", "success")
-        return redirect(url_for("user_dashboard"))
+        return redirect(url_for("main.user_dashboard"))
 
     return render_template("log_meal.html", form=form, user=current_user)
 
 
-@app.route("/profile", methods=["GET", "POST"])
+@bp.route("/profile", methods=["GET", "POST"])
 @login_required
 def edit_profile():
     form = ProfileForm(obj=current_user)
@@ -235,16 +334,28 @@ def edit_profile():
 
         # Update password if provided
         if form.password.data:
-            current_user.set_password(form.password.data)
+            try:
+                current_user.set_password(form.password.data)
+            except HashingBusy:
+                db.session.rollback()
+                flash(
+                    "Could not change the password right now. Please try again.",
+                    "warning",
+                )
+                return (
+                    render_template("edit_profile.html", form=form, user=current_user),
+                    503,
+                )
 
         db.session.commit()
+        invalidate_user_pages(current_user.id, "profile")
         flash("Profile updated successfully!", "success")
-        return redirect(url_for("user_dashboard"))
+        return redirect(url_for("main.user_dashboard"))
 
     return render_template("edit_profile.html", form=form, user=current_user)
 
 
-@app.route("/recommend", methods=["POST"])
+@bp.route("/recommend", methods=["POST"])
 @login_required
 def create_recommendation():
     meal, workout, trend_note = generate_recommendation(current_user)
@@ -256,72 +367,180 @@ def create_recommendation():
     )
     db.session.add(rec)
     db.session.commit()
+    invalidate_user_pages(current_user.id, "recommendations")
 
     flash("New recommendation generated!", "success")
     return redirect(
-        url_for("user_dashboard", ts=datetime.now(timezone.utc).timestamp())
+        url_for("main.user_dashboard", ts=datetime.now(timezone.utc).timestamp())
     )
 
 
-@app.route("/recommendations")
+@bp.route("/recommendations")
 @login_required
 def recommendation_history():
-    recommendations = (
-        Recommendation.query.filter_by(user_id=current_user.id)
-        .order_by(Recommendation.timestamp.desc())
-        .all()
-    )
+    try:
+        recommendations, next_cursor = _recommendation_page()
+    except InvalidCursor:
+        return redirect(url_for("main.recommendation_history"))
     return render_template(
         "recommendation_history.html",
         user=current_user,
         recommendations=recommendations,
+        next_cursor=next_cursor,
     )
 
 
-@app.route("/recommendation_feedback/<int:rec_id>/<status>", methods=["POST"])
+@bp.route("/recommendations/export")
+@login_required
+def export_recommendation_history():
+    statement = (
+        select(Recommendation)
+        .where(Recommendation.user_id == current_user.id)
+        .order_by(Recommendation.timestamp.desc(), Recommendation.id.desc())
+    )
+    return stream_template(
+        "recommendation_history.html",
+        user=current_user,
+        recommendations=iter_rows(statement, current_app.config["EXPORT_BATCH_SIZE"]),
+        next_cursor=None,
+    )
+
+
+@bp.route("/api/recommendations")
+@login_required
+def api_recommendations():
+    try:
+        recommendations, next_cursor = _recommendation_page()
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
+    items = [
+        {
+            "id": r.id,
+            "timestamp": r.timestamp.isoformat() if r.timestamp else None,
+            "meal_rec": r.meal_rec,
+            "workout_rec": r.workout_rec,
+            "trend_note": r.trend_note,
+            "followed": r.followed,
+        }
+        for r in recommendations
+    ]
+    return jsonify({"items": items, "next_cursor": next_cursor})
+
+
+def _page_limit():
+    limit = request.args.get("limit", current_app.config["HISTORY_PAGE_SIZE"], type=int)
+    return max(1, min(limit, current_app.config["HISTORY_PAGE_MAX"]))
+
+
+def _recommendation_page():
+    return seek_page(
+        select(Recommendation).where(Recommendation.user_id == current_user.id),
+        Recommendation.timestamp,
+        Recommendation.id,
+        cursor=request.args.get("cursor"),
+        limit=_page_limit(),
+    )
+
+
+def _workout_page():
+    return seek_page(
+        select(Workout).where(Workout.user_id == current_user.id),
+        Workout.date,
+        Workout.id,
+        cursor=request.args.get("cursor"),
+        limit=_page_limit(),
+    )
+
+
+@bp.route("/recommendation_feedback/<int:rec_id>/<status>", methods=["POST"])
 @login_required
 def recommendation_feedback(rec_id, status):
     recommendation = Recommendation.query.get_or_404(rec_id)
 
     if recommendation.user_id != current_user.id:
         flash("You are not authorized to modify this recommendation.", "danger")
-        return redirect(url_for("user_dashboard"))
+        return redirect(url_for("main.user_dashboard"))
 
     if status not in ["followed", "skipped"]:
         flash("Invalid feedback option.", "danger")
-        return redirect(url_for("user_dashboard"))
+        return redirect(url_for("main.user_dashboard"))
 
     recommendation.followed = status
     db.session.commit()
+    invalidate_user_pages(current_user.id, "recommendations")
     flash(f"Recommendation marked as {status}.", "success")
-    return redirect(url_for("user_dashboard"))
+    return redirect(url_for("main.user_dashboard"))
 
 
-@app.route("/search_food", methods=["POST"])
+@bp.route("/search_food", methods=["POST"])
 def search_food():
     data = request.get_json()
     query = data.get("query") if data else None
     if not query:
         return jsonify({"error": "No query provided"}), 400
 
-    results = search_usda_food(query)
-    if results:
-        return jsonify(results[0])  # return top match
+    try:
+        food = lookup_usda_food(
+            query, source=current_app.config["FOOD_AUTOCOMPLETE_SOURCE"]
+        )
+    except UpstreamUnavailable:
+        return jsonify({"error": "Food search is temporarily unavailable"}), 503
+    if food:
+        return jsonify(food)  # return top match
     return jsonify({"error": "No results found"}), 404
 
 
-@app.route("/autocomplete_food", methods=["GET"])
+@bp.route("/autocomplete_food", methods=["GET"])
 def autocomplete_food():
     query = request.args.get("q", "")
-    if not query.strip():
+    if len(query.strip()) < current_app.config["AUTOCOMPLETE_MIN_PREFIX"]:
         return jsonify([])
 
-    results = search_usda_food(query, max_results=10)
+    source = (
+        request.args.get("source") or current_app.config["FOOD_AUTOCOMPLETE_SOURCE"]
+    )
+    try:
+        results = autocomplete_foods(query, max_results=10, source=source)
+    except UpstreamUnavailable:
+        return jsonify({"error": "Food search is temporarily unavailable"}), 503
     suggestions = [{"label": f["name"], "value": f} for f in results]
     return jsonify(suggestions)
 
 
-@app.route("/previous_meals")
+@bp.route("/autocomplete_food/stream", methods=["GET"])
+@login_required
+def autocomplete_food_stream():
+    """Server-sent events version of /autocomplete_food.
+
+    The browser opens one stream per keystroke with an increasing `seq` and
+    a random `page` id per page load; a newer keystroke from the same session
+    cancels any older stream still debouncing or waiting on the USDA API.
+    """
+    query = request.args.get("q", "").strip()
+    source = (
+        request.args.get("source") or current_app.config["FOOD_AUTOCOMPLETE_SOURCE"]
+    )
+    sid = session.setdefault("autocomplete_id", secrets.token_hex(8))
+    registry, _ = get_autocomplete_state()
+    seq = registry.claim(
+        sid, request.args.get("seq", type=int), request.args.get("page")
+    )
+
+    events = stream_suggestions(sid, seq, query, limit=10, source=source)
+    return Response(
+        stream_with_context(events),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@bp.route("/autocomplete_food/stats", methods=["GET"])
+@login_required
+def food_cache_stats():
+    return jsonify(get_food_cache().stats())
+
+
+@bp.route("/previous_meals")
 @login_required
 def previous_meals():
     meals = (
@@ -333,14 +552,14 @@ def previous_meals():
     return render_template("previous_meals.html", user=current_user, meals=meals)
 
 
-@app.route("/reuse_meal/<int:meal_id>")
+@bp.route("/reuse_meal/<int:meal_id>")
 @login_required
 def reuse_meal(meal_id):
     meal = Meal.query.get_or_404(meal_id)
 
     if meal.user_id != current_user.id:
         flash("Unauthorized meal access.", "danger")
-        return redirect(url_for("user_dashboard"))
+        return redirect(url_for("main.user_dashboard"))
 
     # Temporarily store meal data in session
     session["prefill"] = {
@@ -351,47 +570,60 @@ def reuse_meal(meal_id):
         "fats": meal.fats,
     }
 
-    return redirect(url_for("log_meal"))
+    return redirect(url_for("main.log_meal"))
 
 
-@app.route("/progress")
+@bp.route("/progress")
 @login_required
 def progress():
-    workouts = Workout.query.filter_by(user_id=current_user.id).all()
-    meals = Meal.query.filter_by(user_id=current_user.id).all()
-    tdee = estimate_tdee(current_user)
-
-    weight_logs = (
-        WeightLog.query.filter_by(user_id=current_user.id)
-        .order_by(WeightLog.date.asc())
-        .all()
-    )
+    user = current_user
+    cache = get_page_cache()
+    fragments = {
+        "stats": cache.fragment(
+            "progress_stats", user.id, lambda: _render_progress_stats(user)
+        ),
+        "weights": cache.fragment(
+            "progress_weights", user.id, lambda: _render_progress_weights(user)
+        ),
+    }
+    return render_template("progress.html", user=user, fragments=fragments)
 
-    # Extract labels (dates) and data (weights)
-    weight_labels = [log.date.strftime("%b %d") for log in weight_logs]
-    weight_values = [log.weight for log in weight_logs]
 
+def _render_progress_stats(user):
+    totals = get_user_totals(user.id)
     avg_macros, total_protein, total_carbs, total_fats = calculate_progress_stats(
-        current_user
+        user
     )
-
     return render_template(
-        "progress.html",
-        user=current_user,
-        workouts=workouts,
-        meals=meals,
-        tdee=tdee,
+        "progress_stats.html",
+        workout_count=totals.workout_count,
+        meal_count=totals.meal_count,
+        metrics=get_profile_metrics(user),
         avg_macros=avg_macros,
         total_protein=total_protein,
         total_carbs=total_carbs,
         total_fats=total_fats,
-        weight_logs=weight_logs,
-        weight_labels=weight_labels,
-        weight_values=weight_values,
     )
 
 
-@app.route("/log_weight", methods=["GET", "POST"])
+def _render_progress_weights(user):
+    weight_logs = (
+        WeightLog.query.filter_by(user_id=user.id).order_by(WeightLog.date.asc()).all()
+    )
+    return render_template("progress_weights.html", weight_logs=weight_logs)
+
+
+@bp.route("/progress/weight_series")
+@login_required
+def progress_weight_series():
+    # The chart is fetched separately so long histories arrive downsampled
+    config = current_app.config
+    points = request.args.get("points", config["WEIGHT_CHART_POINTS"], type=int)
+    points = max(3, min(points, config["WEIGHT_CHART_POINTS_MAX"]))
+    return jsonify(weight_chart(current_user.id, points))
+
+
+@bp.route("/log_weight", methods=["GET", "POST"])
 @login_required
 def log_weight():
     form = WeightForm()
@@ -408,41 +640,131 @@ def log_weight():
         # Update the user's current weight
         current_user.weight = new_weight
         db.session.commit()
+        invalidate_weight_chart(current_user.id)
+        invalidate_user_pages(current_user.id, "weights", "profile")
 
         flash("Weight logged and profile updated!", "success")
-        return redirect(url_for("progress"))
+        return redirect(url_for("main.progress"))
 
     return render_template("log_weight.html", form=form, user=current_user)
 
 
-@app.route("/previous_workouts")
+@bp.route("/previous_workouts")
 @login_required
 def previous_workouts():
-    workouts = (
-        Workout.query.filter_by(user_id=current_user.id)
-        .order_by(Workout.date.desc())
-        .all()
-    )
+    try:
+        workouts, next_cursor = _workout_page()
+    except InvalidCursor:
+        return redirect(url_for("main.previous_workouts"))
     return render_template(
-        "previous_workouts.html", workouts=workouts, user=current_user
+        "previous_workouts.html",
+        workouts=workouts,
+        user=current_user,
+        next_cursor=next_cursor,
+    )
+
+
+@bp.route("/previous_workouts/export")
+@login_required
+def export_previous_workouts():
+    statement = (
+        select(Workout)
+        .where(Workout.user_id == current_user.id)
+        .order_by(Workout.date.desc(), Workout.id.desc())
+    )
+    return stream_template(
+        "previous_workouts.html",
+        workouts=iter_rows(statement, current_app.config["EXPORT_BATCH_SIZE"]),
+        user=current_user,
+        next_cursor=None,
+    )
+
+
+@bp.route("/api/workouts")
+@login_required
+def api_workouts():
+    try:
+        workouts, next_cursor = _workout_page()
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
+    items = [
+        {
+            "id": w.id,
+            "date": w.date.isoformat() if w.date else None,
+            "type": w.type,
+            "duration": w.duration,
+            "calories_burned": w.calories_burned,
+        }
+        for w in workouts
+    ]
+    return jsonify({"items": items, "next_cursor": next_cursor})
+
+
+@bp.route("/import/<kind>", methods=["POST"])
+@login_required
+def import_history(kind):
+    upload = request.files.get("file")
+    if upload is None:
+        return jsonify({"error": "No file uploaded"}), 400
+    fmt = request.form.get("format") or guess_format(upload.filename or "")
+
+    # Werkzeug spools large uploads to disk; rows are read off it one by one
+    stream = io.TextIOWrapper(upload.stream, encoding="utf-8-sig", newline="")
+    try:
+        report = import_rows(
+            current_user.id,
+            kind,
+            read_rows(stream, fmt),
+            chunk_size=current_app.config["IMPORT_CHUNK_SIZE"],
+            max_errors=current_app.config["IMPORT_MAX_ERRORS"],
+        )
+    except InvalidImport as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(report.to_dict())
+
+
+@bp.route("/export")
+@login_required
+def export_history():
+    fmt = request.args.get("format", "jsonl")
+    kinds = request.args.get("kind", ",".join(KINDS)).split(",")
+    try:
+        chunks = export_chunks(
+            fmt,
+            kinds,
+            user_id=current_user.id,
+            batch_size=current_app.config["EXPORT_BATCH_SIZE"],
+        )
+    except InvalidExport as e:
+        return jsonify({"error": str(e)}), 400
+
+    extension = "jsonl" if fmt == "jsonl" else "csv"
+    name = kinds[0] if len(kinds) == 1 else "history"
+    return Response(
+        stream_with_context(chunks),
+        mimetype=FORMATS[fmt],
+        headers={
+            "Content-Disposition": f'attachment; filename="{name}.{extension}"'
+        },
     )
 
 
-@app.route("/delete_weight/<int:log_id>", methods=["POST"])
+@bp.route("/delete_weight/<int:log_id>", methods=["POST"])
 @login_required
 def delete_weight(log_id):
     log = WeightLog.query.get_or_404(log_id)
 
     if log.user_id != current_user.id:
         flash("Unauthorized action.", "danger")
-        return redirect(url_for("progress"))
+        return redirect(url_for("main.progress"))
 
     if WeightLog.query.filter_by(user_id=log.user_id).count() <= 1:
         flash("You must have at least one weight entry.", "warning")
-        return redirect(url_for("progress"))
+        return redirect(url_for("main.progress"))
 
     db.session.delete(log)
     db.session.commit()
+    invalidate_weight_chart(log.user_id)
     flash("Weight log deleted.", "success")
 
     # Recalculate the user's current weight
@@ -457,5 +779,6 @@ def delete_weight(log_id):
     else:
         current_user.weight = None  # or default value like 0
     db.session.commit()
+    invalidate_user_pages(current_user.id, "weights", "profile")
 
-    return redirect(url_for("progress"))
+    return redirect(url_for("main.progress"))
@@ -0,0 +1,35 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from flask import current_app
+from app import create_app  # type: ignore
+
+_worker_app = None
+
+
+def _init_worker(config):
+    # Each worker builds its own app, and engine, from the parent's settings;
+    # connections inherited from the parent process must not be reused
+    global _worker_app
+    _worker_app = create_app(config)
+
+
+def _run_shard(fn, shards, args, kwargs, shard):
+    with _worker_app.app_context():
+        return fn(*args, shard=shard, shards=shards, **kwargs)
+
+
+def map_shards(fn, shards, *args, **kwargs):
+    """Calls fn(*args, shard=n, shards=shards, **kwargs) for each user-id shard
+    n (id % shards), in parallel processes, and returns the results in shard
+    order. A single shard runs in this process, in the current app context.
+
+    `fn` must be importable by the worker processes (a module-level function).
+    """
+    if shards <= 1:
+        return [fn(*args, shard=0, shards=1, **kwargs)]
+
+    with ProcessPoolExecutor(
+        shards, initializer=_init_worker, initargs=(dict(current_app.config),)
+    ) as pool:
+        run = partial(_run_shard, fn, shards, args, kwargs)
+        return list(pool.map(run, range(shards)))
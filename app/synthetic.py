@@ -0,0 +1,207 @@
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from sqlalchemy import func, select
+from werkzeug.security import generate_password_hash
+from app import db  # type: ignore
+from app.models import Meal, Recommendation, User, WeightLog, Workout
+from app.recommendation_catalog import GOALS
+from app.rollups import rebuild_rollups
+
+GOAL_NAMES = ("cutting", "lean muscle", "endurance", "balanced")
+# Expected weight change per week (lbs) for each goal
+GOAL_TRENDS = {
+    "cutting": -0.6,
+    "lean muscle": 0.25,
+    "endurance": -0.15,
+    "balanced": 0.0,
+}
+
+# (type, kcal per minute); types match WorkoutForm's choices
+WORKOUT_TYPES = (
+    ("Cardio", 9.0),
+    ("Strength", 7.0),
+    ("Flexibility", 4.0),
+    ("HIIT", 12.0),
+    ("Other", 6.0),
+)
+
+# (name, calories, protein, carbs, fats) for one standard portion, from seed.py
+MEALS = (
+    ("Zoodles & Grilled Turkey", 320, 32, 12, 10),
+    ("Protein Smoothie + Yogurt", 280, 35, 8, 5),
+    ("Steak & Sweet Potato", 520, 40, 30, 20),
+    ("Quinoa Chicken Bowl", 480, 36, 35, 18),
+    ("Tofu Wrap", 420, 22, 40, 15),
+    ("Salmon + Brown Rice", 460, 35, 30, 18),
+    ("Egg White Omelet + Toast", 300, 28, 22, 10),
+    ("Greek Salad + Chicken", 350, 30, 10, 15),
+    ("Beef & Rice Bowl", 700, 45, 60, 30),
+    ("High-Calorie Shake", 600, 50, 40, 20),
+)
+PASSWORD = "password"
+
+
+def _profile(rng, user_id, password_hash):
+    return {
+        "id": user_id,
+        "username": f"load{user_id:07d}",
+        "name": f"Load User {user_id}",
+        "email": f"load{user_id:07d}@example.com",
+        "age": int(rng.integers(18, 70)),
+        "weight": round(float(np.clip(rng.normal(180, 30), 110, 320)), 1),
+        "height": round(float(np.clip(rng.normal(68, 4), 58, 80)), 1),
+        "fitness_goal": GOAL_NAMES[rng.integers(0, len(GOAL_NAMES))],
+        "password_hash": password_hash,
+    }
+
+
+def _day_times(rng, per_day, days, first_day, hours):
+    """Random timestamps, Poisson(per_day) of them on each day, in order."""
+    counts = rng.poisson(per_day, days)
+    day = np.repeat(np.arange(days), counts)
+    minutes = rng.integers(hours[0] * 60, hours[1] * 60, len(day))
+    offsets = np.sort(day * 1440 + minutes)
+    return [first_day + timedelta(minutes=int(m)) for m in offsets]
+
+
+def _history(rng, user, days, first_day, params):
+    """One user's workouts, meals, weigh-ins and recommendations."""
+    user_id = user["id"]
+    rows = {"workouts": [], "meals": [], "weights": [], "recommendations": []}
+
+    times = _day_times(rng, params["workouts_per_day"], days, first_day, (6, 21))
+    kinds = rng.integers(0, len(WORKOUT_TYPES), len(times))
+    durations = rng.integers(15, 91, len(times))
+    noise = rng.normal(1, 0.15, len(times))
+    for when, kind, duration, factor in zip(times, kinds, durations, noise):
+        name, rate = WORKOUT_TYPES[kind]
+        rows["workouts"].append(
+            {
+                "type": name,
+                "duration": int(duration),
+                "calories_burned": max(1, int(duration * rate * factor)),
+                "date": when,
+                "user_id": user_id,
+            }
+        )
+
+    meal_count = int(rng.poisson(params["meals_per_day"] * days))
+    picks = rng.integers(0, len(MEALS), meal_count)
+    portions = rng.uniform(0.75, 1.35, meal_count)
+    for pick, portion in zip(picks, portions):
+        name, calories, protein, carbs, fats = MEALS[pick]
+        rows["meals"].append(
+            {
+                "name": name,
+                "calories": round(calories * portion),
+                "protein": round(protein * portion, 1),
+                "carbs": round(carbs * portion, 1),
+                "fats": round(fats * portion, 1),
+                "user_id": user_id,
+            }
+        )
+
+    times = _day_times(rng, params["weigh_ins_per_week"] / 7, days, first_day, (6, 9))
+    if not times:  # every user gets at least one weigh-in, as registration does
+        times = [first_day + timedelta(hours=7)]
+    elapsed = np.array([(t - first_day).total_seconds() / 86400 for t in times])
+    weekly = GOAL_TRENDS[user["fitness_goal"]] * rng.uniform(0.3, 1.7)
+    weights = user["weight"] + elapsed * weekly / 7 + rng.normal(0, 0.8, len(times))
+    for when, weight in zip(times, np.round(weights, 1)):
+        rows["weights"].append(
+            {"weight": float(weight), "date": when, "user_id": user_id}
+        )
+    user["weight"] = rows["weights"][-1]["weight"]
+
+    options = GOALS[user["fitness_goal"]]
+    per_day = params["recommendations_per_week"] / 7
+    times = _day_times(rng, per_day, days, first_day, (5, 23))
+    outcome = rng.random(len(times))
+    meals = rng.integers(0, len(options["meals"]), len(times))
+    workouts = rng.integers(0, len(options["workouts"]), len(times))
+    followed, skipped = params["followed_ratio"], params["skipped_ratio"]
+    for when, roll, meal, workout in zip(times, outcome, meals, workouts):
+        rows["recommendations"].append(
+            {
+                "user_id": user_id,
+                "meal_rec": options["meals"][meal],
+                "workout_rec": options["workouts"][workout],
+                "trend_note": None,
+                "followed": (
+                    "followed"
+                    if roll < followed
+                    else "skipped" if roll < followed + skipped else None
+                ),
+                "timestamp": when,
+            }
+        )
+    return rows
+
+
+def generate_data(
+    users=100,
+    days=90,
+    meals_per_day=3.0,
+    workouts_per_day=0.7,
+    weigh_ins_per_week=3.0,
+    recommendations_per_week=7.0,
+    followed_ratio=0.4,
+    skipped_ratio=0.2,
+    seed=0,
+    end=None,
+    chunk_users=200,
+):
+    """Adds `users` synthetic users with `days` of history ending at `end`.
+
+    Each user's data comes from its own NumPy generator seeded with
+    (seed, user number), so the same arguments (including `end`) always
+    produce the same rows. Rows are bulk-inserted and committed
+    `chunk_users` users at a time; rollups are rebuilt once at the end. The
+    password of every user is "password", hashed once. Returns row counts.
+    """
+    if end is None:
+        end = datetime.now(timezone.utc).replace(
+            tzinfo=None, hour=0, minute=0, second=0, microsecond=0
+        )
+    first_day = end - timedelta(days=days)
+    params = {
+        "meals_per_day": meals_per_day,
+        "workouts_per_day": workouts_per_day,
+        "weigh_ins_per_week": weigh_ins_per_week,
+        "recommendations_per_week": recommendations_per_week,
+        "followed_ratio": followed_ratio,
+        "skipped_ratio": skipped_ratio,
+    }
+    tables = {
+        "workouts": Workout.__table__,
+        "meals": Meal.__table__,
+        "weights": WeightLog.__table__,
+        "recommendations": Recommendation.__table__,
+    }
+    password_hash = generate_password_hash(PASSWORD)
+    first_id = (db.session.execute(select(func.max(User.id))).scalar() or 0) + 1
+    counts = dict.fromkeys(["users", *tables], 0)
+
+    for start in range(0, users, chunk_users):
+        size = min(chunk_users, users - start)
+        chunk = []
+        batch = {name: [] for name in tables}
+        for n in range(start, start + size):
+            rng = np.random.default_rng([seed, n])
+            user = _profile(rng, first_id + n, password_hash)
+            for name, rows in _history(rng, user, days, first_day, params).items():
+                batch[name].extend(rows)
+            chunk.append(user)
+
+        # Plain Core executemany: no ORM objects, no per-row events
+        connection = db.session.connection()
+        connection.execute(User.__table__.insert(), chunk)
+        for name, table in tables.items():
+            if batch[name]:
+                connection.execute(table.insert(), batch[name])
+            counts[name] += len(batch[name])
+        counts["users"] += size
+        db.session.commit()
+
+    rebuild_rollups()
+    return counts
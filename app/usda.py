@@ -0,0 +1,205 @@
+import threading
+import time
+from flask import current_app
+
+
+class UpstreamUnavailable(Exception):
+    """The USDA API could not be reached (timeout, outage or open breaker)."""
+
+
+class CircuitBreaker:
+    """Stops calling a failing upstream for a while after repeated errors.
+
+    After `threshold` consecutive failures the breaker opens and every call is
+    rejected for `reset_after` seconds. Then one trial call is let through: a
+    success closes the breaker, a failure opens it again.
+    """
+
+    def __init__(self, threshold=5, reset_after=30, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if self._clock() - self.opened_at >= self.reset_after:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.failures >= self.threshold or self.opened_at is not None:
+                self.opened_at = self._clock()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one execution."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class USDAClient:
+    """Keep-alive session to FoodData Central with bounded waits and retries."""
+
+    def __init__(
+        self,
+        base_url,
+        api_key=None,
+        connect_timeout=3.05,
+        read_timeout=10,
+        retries=2,
+        backoff_factor=0.3,
+        pool_size=10,
+        breaker=None,
+    ):
+        # requests and urllib3 are imported with the first client, not with
+        # the app
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout = (connect_timeout, read_timeout)
+        # Worst case for one search: every attempt hits both timeouts, plus
+        # urllib3's backoff sleeps between attempts
+        self.max_duration = (connect_timeout + read_timeout) * (retries + 1) + sum(
+            min(backoff_factor * 2 ** (n - 1), Retry.DEFAULT_BACKOFF_MAX)
+            for n in range(1, retries + 1)
+        )
+        self.breaker = breaker or CircuitBreaker()
+        self.flights = SingleFlight()
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET",),
+            raise_on_status=False,
+            # urllib3 would otherwise sleep for whatever Retry-After says,
+            # parking the Flask worker; use our own bounded backoff instead
+            respect_retry_after_header=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def search(self, query, page_size=5):
+        """Returns the raw /foods/search payload for a query."""
+        return self.flights.do(
+            ("search", query, page_size),
+            lambda: self._get(
+                "/foods/search",
+                {"api_key": self.api_key, "query": query, "pageSize": page_size},
+            ),
+        )
+
+    def _get(self, path, params):
+        import requests
+
+        if not self.breaker.allow():
+            raise UpstreamUnavailable("USDA API circuit breaker is open")
+
+        try:
+            response = self.session.get(
+                self.base_url + path, params=params, timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            self.breaker.record_failure()
+            raise UpstreamUnavailable(str(e)) from e
+
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+            raise UpstreamUnavailable(f"USDA API returned {response.status_code}")
+
+        self.breaker.record_success()
+        if response.status_code >= 400:
+            raise UpstreamUnavailable(f"USDA API returned {response.status_code}")
+        try:
+            return response.json()
+        except ValueError as e:
+            raise UpstreamUnavailable("USDA API returned a non-JSON body") from e
+
+
+def get_usda_client():
+    """Returns the app's shared USDA client, building it on first use."""
+    client = current_app.extensions.get("usda_client")
+    if client is None:
+        config = current_app.config
+        client = current_app.extensions["usda_client"] = USDAClient(
+            config["USDA_API_URL"],
+            api_key=config.get("USDA_API_KEY"),
+            connect_timeout=config["USDA_CONNECT_TIMEOUT"],
+            read_timeout=config["USDA_READ_TIMEOUT"],
+            retries=config["USDA_MAX_RETRIES"],
+            backoff_factor=config["USDA_BACKOFF_FACTOR"],
+            pool_size=config["USDA_POOL_SIZE"],
+            breaker=CircuitBreaker(
+                threshold=config["USDA_BREAKER_THRESHOLD"],
+                reset_after=config["USDA_BREAKER_RESET"],
+            ),
+        )
+    return client
@@ -0,0 +1,84 @@
+import hashlib
+from flask import current_app, has_app_context, has_request_context, session
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import make_transient_to_detached
+from app import db, login  # type: ignore
+from app.cache import LRUCache
+from app.models import User
+
+# Digest of the user's row as last loaded by this browser's session; a
+# cached copy is only used while it matches
+SESSION_KEY = "_user_stamp"
+
+_COLUMNS = tuple(attr.key for attr in inspect(User).column_attrs)
+
+
+def get_user_cache():
+    """Returns the app's logged-in user cache, building it on first use."""
+    cache = current_app.extensions.get("user_cache")
+    if cache is None:
+        cache = current_app.extensions["user_cache"] = LRUCache(
+            maxsize=current_app.config["USER_CACHE_SIZE"],
+            ttl=current_app.config["USER_CACHE_TTL"],
+        )
+    return cache
+
+
+def user_stamp(user):
+    """A short digest of every column of `user`, so any edit changes it."""
+    values = repr(tuple(getattr(user, key) for key in _COLUMNS))
+    return hashlib.blake2b(values.encode(), digest_size=8).hexdigest()
+
+
+def _detached_copy(user):
+    copy = User(**{key: getattr(user, key) for key in _COLUMNS})
+    make_transient_to_detached(copy)
+    return copy
+
+
+def load_cached_user(user_id):
+    """The user for this request, without a SELECT when the cached row's stamp
+    matches the session's.
+
+    A miss, a stale or missing stamp (any write to the user drops it, see
+    below) or an expired entry reloads the row and records its stamp. Cached
+    copies are detached and never modified; each request gets its own copy
+    through merge(load=False).
+    """
+    existing = db.session.identity_map.get(db.session.identity_key(User, user_id))
+    if existing is not None:
+        return existing
+
+    cache = get_user_cache()
+    stamp = session.get(SESSION_KEY)
+    entry = cache.get(user_id)
+    if stamp is not None and entry is not None and entry[0] == stamp:
+        return db.session.merge(entry[1], load=False)
+
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+    stamp = user_stamp(user)
+    cache.set(user_id, (stamp, _detached_copy(user)))
+    if session.get(SESSION_KEY) != stamp:
+        session[SESSION_KEY] = stamp
+    return user
+
+
+@login.user_loader
+def load_user(id):
+    return load_cached_user(int(id))
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _forget_user(mapper, connection, target):
+    # This worker drops its copy; the writer's session drops its stamp, so
+    # its next request reloads the row whichever worker serves it. Other
+    # browsers of the same user may see the old row for USER_CACHE_TTL.
+    if has_app_context():
+        cache = current_app.extensions.get("user_cache")
+        if cache is not None:
+            cache.delete(target.id)
+    if has_request_context() and session.get("_user_id") == str(target.id):
+        session.pop(SESSION_KEY, None)
@@ -0,0 +1,348 @@
+"""The original generate_recommendation, kept as the reference for the
+compiled catalog in app/recommendation_catalog.py."""
+
+
+def legacy_recommendation(goal, trend, recent, feedback, tdee, macros, rng):
+    """generate_recommendation as it was before the rule table, minus its
+    queries: `recent` is (meal, workout) pairs of the last 3 recommendations
+    and `feedback` the four sets from
+    RecommendationContext.feedback_stats()."""
+
+    # --- CUTTING GOAL ---
+    cutting_meals = [
+        "Grilled Chicken & Steamed Broccoli",
+        "Turkey Lettuce Wraps",
+        "Egg Whites + Oats",
+        "Zucchini Noodles + Lean Ground Turkey",
+        "Cauliflower Fried Rice + Shrimp",
+        "Tuna Salad with Avocado",
+        "Greek Yogurt + Berries",
+        "Cottage Cheese + Almonds",
+        "Steak Salad with Olive Oil",
+        "Boiled Eggs + Spinach",
+    ]
+    cutting_workouts = [
+        "30 min HIIT",
+        "45 min Fasted Cardio",
+        "Full Body Calisthenics Circuit",
+        "Tabata Training",
+        "Jump Rope + Bodyweight Mix",
+        "Outdoor Run (3 miles)",
+        "Weighted Circuit Training",
+        "Incline Walking",
+        "Kickboxing",
+    ]
+
+    # --- LEAN MUSCLE GAIN GOAL ---
+    muscle_meals = [
+        "Steak + Brown Rice + Veggies",
+        "Quinoa + Chicken + Avocado",
+        "Salmon + Sweet Potato",
+        "Ground Turkey Tacos (Whole Wheat)",
+        "Lentil Stew + Grilled Chicken",
+        "Greek Yogurt Smoothie + Granola",
+        "Tofu + Stir-Fried Vegetables + Rice",
+        "Cottage Cheese + Banana + Peanut Butter",
+        "High-Protein Pasta Bowl",
+    ]
+    muscle_workouts = [
+        "Push-Pull-Legs Split",
+        "Upper/Lower Body Split",
+        "Heavy Compound Lifting (Squat/Deadlift)",
+        "Chest + Triceps Day",
+        "Back + Biceps Routine",
+        "Shoulder & Core Superset",
+        "Barbell Complexes",
+        "Progressive Overload Program",
+    ]
+
+    # --- ENDURANCE GOAL ---
+    endurance_meals = [
+        "Whole Grain Pasta + Turkey Meatballs",
+        "Protein Smoothie + Banana",
+        "Oatmeal + Chia Seeds + Almond Butter",
+        "Sweet Potato Hash + Eggs",
+        "Energy Bars + Protein Yogurt",
+        "Salmon + Brown Rice + Greens",
+        "Bean & Veggie Burrito Bowl",
+        "Trail Mix + Greek Yogurt",
+    ]
+    endurance_workouts = [
+        "5K Training Program",
+        "Interval Running (Run/Walk)",
+        "Cycling (40 min steady-state)",
+        "Swimming Laps (30-60 min)",
+        "Rowing Machine Intervals",
+        "Hiking with Pack (1 hr+)",
+        "Stadium Stairs + Core Superset",
+        "Boxing + Jump Rope",
+    ]
+
+    # --- BALANCED / DEFAULT GOAL ---
+    balanced_meals = [
+        "Grilled Chicken + Rice Bowl",
+        "Shrimp Stir-Fry + Mixed Veggies",
+        "Turkey Sandwich + Sweet Potato",
+        "Veggie Omelet + Whole Wheat Toast",
+        "Tofu Bowl + Edamame + Brown Rice",
+        "Salmon + Couscous + Spinach",
+        "Whole Wheat Wrap + Turkey + Hummus",
+    ]
+    balanced_workouts = [
+        "30 min Mixed Cardio",
+        "Full Body Dumbbell Routine",
+        "Pilates or Yoga Flow",
+        "Basic Strength Training (3x/week)",
+        "Spin Class + Light Core Work",
+        "Bodyweight Supersets",
+        "Resistance Band Conditioning",
+        "Cardio + Stretching Combo",
+    ]
+
+    if goal == "cutting":
+        meal_opts = cutting_meals[:]
+        workout_opts = cutting_workouts[:]
+    elif goal == "lean muscle":
+        meal_opts = muscle_meals[:]
+        workout_opts = muscle_workouts[:]
+    elif goal == "endurance":
+        meal_opts = endurance_meals[:]
+        workout_opts = endurance_workouts[:]
+    else:
+        meal_opts = balanced_meals[:]
+        workout_opts = balanced_workouts[:]
+
+    # === Analyze Weight Trend ===
+    trend_note = ""
+
+    if trend:
+        rate = trend["rate_per_week"]
+        since = trend["since"]
+
+        if goal == "cutting":
+            if abs(rate) < 0.2:
+                # Weight is stalling or making very slow progress
+                meal_opts += [
+                    "Zucchini Noodle Bowl with Turkey Meatballs",
+                    "Kale + Grilled Chicken Salad with Olive Oil Vinaigrette",
+                    "Cauliflower Rice Stir-Fry with Egg Whites",
+                ]
+                workout_opts += [
+                    "Extra HIIT Session (20-30 min)",
+                    "Fast-Paced Full-Body Circuit",
+                    "Incline Walk + Core Finisher",
+                ]
+                trend_note = (
+                    f"Your weight hasn't changed much since {since}. "
+                    "Try tightening your meal portions or increasing workout intensity."
+                )
+
+            elif rate < -2:
+                # Weight dropping too quickly (rapid weight loss)
+                meal_opts += [
+                    "Maintenance Bowl: Salmon, Quinoa, Avocado, Roasted Veggies",
+                    "Refeed Meal: Steak, Roasted Sweet Potato, Sautéed Spinach",
+                    "Protein-Packed Omelet with Whole Eggs and Toast",
+                ]
+                workout_opts += [
+                    "Mobility Recovery + Light Walk",
+                    "Yoga Flow + Deep Stretch",
+                    "Zone 2 Cardio (e.g., 45 min bike or walk)",
+                ]
+                trend_note = (
+                    f"You're losing weight too quickly (< -2 lbs/week since {since}). "
+                    "Consider a maintenance day or refeed to preserve muscle and energy."
+                )
+
+            elif rate > 1:
+                # Gaining weight on a cutting goal (should not be happening)
+                meal_opts += [
+                    "Balanced Bowl with Veggies + Lean Protein",
+                    "Healthy Salad with Chicken + Balsamic Dressing",
+                    "Grilled Chicken + Zucchini Noodles",
+                ]
+                workout_opts += [
+                    "Strength Training (Full Body)",
+                    "Medium-Intensity Cardio (30-40 mins)",
+                    "Bodyweight HIIT",
+                ]
+                trend_note = (
+                    f"You're gaining weight despite a cutting goal since {since}. "
+                    "Make sure your calorie intake is properly aligned with your goal."
+                )
+
+        elif goal == "lean muscle":
+            if rate < 0.1:
+                # Slow muscle gain (muscle gain progress is stagnating)
+                meal_opts += [
+                    "Chicken Thighs with Jasmine Rice and Avocado",
+                    "High-Calorie Protein Shake with Nut Butter & Oats",
+                    "Ground Beef and Potato Bowl with Veggies",
+                ]
+                workout_opts += [
+                    "Heavy Strength Training",
+                    "Push-Pull-Legs Split",
+                    "Upper/Lower Body Split with Progressive Overload",
+                ]
+                trend_note = (
+                    f"Muscle gain progress has slowed since {since}. "
+                    "Add more calories and focus on progressive overload in workouts."
+                )
+
+            elif rate >= 0.5:
+                # Healthy muscle gain
+                meal_opts += [
+                    "Protein-Packed Chicken & Rice",
+                    "Tuna Salad with Avocado",
+                    "High-Protein Smoothie + Nut Butters",
+                ]
+                workout_opts += [
+                    "Strength Training with Progressive Overload",
+                    "Legs + Back Day",
+                    "Push-Pull Routine",
+                ]
+                trend_note = f"You're gaining muscle well since {since}. Keep up with the strength training and nutrition!"
+
+            elif rate > 1:
+                # Rapid muscle gain (warning)
+                meal_opts += [
+                    "Beef + Potato Bowl with Veggies",
+                    "Omelet with Eggs and Avocado",
+                    "High-Calorie Smoothie with Oats and Peanut Butter",
+                ]
+                workout_opts += [
+                    "Heavy Resistance Training",
+                    "Upper Body Hypertrophy Focus",
+                    "Lower Body Strength Training",
+                ]
+                trend_note = f"You're gaining muscle too rapidly since {since}. Consider adjusting calorie intake for more controlled gains."
+
+        elif goal == "endurance":
+            if abs(rate) < 0.1:
+                # No change, endurance improvement still slow
+                meal_opts += [
+                    "Lean Chicken Wrap with Veggies",
+                    "Oatmeal with Banana and Almond Butter",
+                    "Tuna Salad on Whole Grain Toast",
+                ]
+                workout_opts += [
+                    "Low-Intensity Steady-State Cardio",
+                    "Active Recovery (Yoga/Stretching)",
+                    "Moderate-Intensity Running or Cycling",
+                ]
+                trend_note = f"Your weight is staying stable since {since}. Focus on increasing your endurance performance."
+
+            elif abs(rate) > 1:
+                # Significant weight fluctuation in endurance goal
+                meal_opts += [
+                    "Healthy Chicken Salad with Quinoa",
+                    "Roasted Salmon with Sweet Potato",
+                    "Greek Yogurt with Berries",
+                ]
+                workout_opts += [
+                    "HIIT or Interval Training",
+                    "Strength + Endurance Circuit",
+                    "Long-Distance Running or Cycling",
+                ]
+                trend_note = f"You're seeing larger weight fluctuations since {since}. This could indicate changes in muscle/fat distribution, which is normal for endurance training."
+
+        elif goal == "balanced":
+            if abs(rate) < 0.2:
+                # Maintaining current weight, great for a balanced goal
+                meal_opts += [
+                    "Grilled Chicken & Veggies",
+                    "Turkey Sandwich with Avocado",
+                    "Spinach Salad with Grilled Chicken",
+                ]
+                workout_opts += [
+                    "Full-Body Strength Workout",
+                    "Cardio + Core",
+                    "Yoga + Stretching",
+                ]
+                trend_note = f"You're maintaining weight well since {since}. Keep it balanced and focus on strength and performance."
+
+            elif rate > 0.2 and rate < 1:
+                # Slowly gaining muscle and improving fitness
+                meal_opts += [
+                    "Lean Beef + Sweet Potato",
+                    "Greek Yogurt with Almonds",
+                    "High-Protein Smoothie + Nut Butter",
+                ]
+                workout_opts += [
+                    "Strength Training",
+                    "Low-Intensity Cardio",
+                    "Active Recovery",
+                ]
+                trend_note = "You're gaining a little weight, but it's likely muscle. Stay consistent with your balanced fitness approach."
+
+            elif rate > 1:
+                # Gaining weight faster than expected
+                meal_opts += [
+                    "Grilled Fish + Avocado",
+                    "Protein Shake with Oats and Almond Butter",
+                    "Chicken Salad with Olive Oil Dressing",
+                ]
+                workout_opts += [
+                    "Progressive Resistance Training",
+                    "High-Intensity Interval Training",
+                    "Cardio + Core Strengthening",
+                ]
+                trend_note = f"You're gaining weight faster than planned since {since}. Consider re-assessing your calorie intake for a more gradual approach."
+
+    # === Filter Out Last 3 Recommendations ===
+    recent_meals = {meal for meal, _ in recent}
+    recent_workouts = {workout for _, workout in recent}
+
+    filtered_meals = [m for m in meal_opts if m not in recent_meals]
+    filtered_workouts = [w for w in workout_opts if w not in recent_workouts]
+
+    # === Feedback-Aware Filtering ===
+    followed_meals, skipped_meals, followed_workouts, skipped_workouts = feedback
+
+    meal_opts = [m for m in meal_opts if m not in skipped_meals]
+    workout_opts = [w for w in workout_opts if w not in skipped_workouts]
+
+    if followed_meals:
+        meal_opts = list(followed_meals) + meal_opts
+    if followed_workouts:
+        workout_opts = list(followed_workouts) + workout_opts
+
+    # === Personalization Based on User Macros and TDEE ===
+
+    if macros:
+        low_protein_threshold = 20  # grams
+        high_calorie_margin = 0.05  # 5% over TDEE considered high for cutting
+
+        # Case 1: Protein intake is critically low
+        if macros["protein"] < low_protein_threshold:
+            meal_opts += [
+                "Protein Smoothie with Whey + Greek Yogurt & Berries",
+                "Egg White Omelet with Avocado + Spinach",
+                "Chicken + Tofu Stir-Fry with Edamame and Quinoa",
+            ]
+            trend_note += " Protein intake is low — adding high-protein meals to support your goal."
+
+        # Case 2: User is trying to cut but consuming more than TDEE
+        if goal == "cutting" and macros["calories"] > tdee * (
+            1 + high_calorie_margin
+        ):
+            meal_opts += [
+                "Low-Carb Salad with Lean Chicken + Olive Oil",
+                "Zucchini Noodles with Grilled Turkey & Pesto",
+                "Grilled Cod or Tilapia with Steamed Broccoli & Cauliflower Mash",
+            ]
+            trend_note += (
+                " Your average calorie intake is above your estimated needs. "
+                "Try lighter, lower-carb meals to stay in a deficit."
+            )
+
+    # === Deduplication and Fallbacks ===
+    meal_opts = list(dict.fromkeys(meal_opts))
+    workout_opts = list(dict.fromkeys(workout_opts))
+
+    if not filtered_meals:
+        filtered_meals = meal_opts
+    if not filtered_workouts:
+        filtered_workouts = workout_opts
+
+    return rng.choice(filtered_meals), rng.choice(filtered_workouts), trend_note
@@ -0,0 +1,120 @@
+"""Login throughput and latency with N concurrent clients, hashing passwords in
+the request threads ("inline") and in the hashing process pool ("pool").
+
+Clients are threads of one worker process, as with a threaded server; each
+logs in as its own user, over and over. Meanwhile one more client keeps
+loading a page that does no hashing, to show what a burst of logins does to
+everything else the worker serves. Login throttling is off.
+
+    python -m benchmarks.login
+    python -m benchmarks.login --clients 1 8 32 --workers 2 --max-pending 8
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+
+def percentile(seconds, q):
+    return float(np.percentile(seconds, q)) * 1e3 if seconds else float("nan")
+
+
+def run(app, clients, seconds):
+    logins, statuses, pages = [], [], []
+    lock = threading.Lock()
+    start = threading.Barrier(clients + 2)
+    deadline = [0.0]
+
+    def client(n):
+        data = {"email": f"load{n + 1:07d}", "password": "password"}
+        start.wait()
+        while time.perf_counter() < deadline[0]:
+            began = time.perf_counter()
+            status = app.test_client().post("/login", data=data).status_code
+            with lock:
+                statuses.append(status)
+                if status == 302:
+                    logins.append(time.perf_counter() - began)
+
+    def probe():
+        http = app.test_client()
+        start.wait()
+        while time.perf_counter() < deadline[0]:
+            began = time.perf_counter()
+            http.get("/login").close()
+            pages.append(time.perf_counter() - began)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    threads.append(threading.Thread(target=probe))
+    for thread in threads:
+        thread.start()
+    deadline[0] = time.perf_counter() + seconds
+    start.wait()
+    for thread in threads:
+        thread.join()
+
+    return {
+        "logins": len(logins) / seconds,
+        "login_p50_ms": percentile(logins, 50),
+        "login_p95_ms": percentile(logins, 95),
+        "busy": statuses.count(503),
+        "page_p95_ms": percentile(pages, 95),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument(
+        "--workers", type=int, default=1, help="Hashing processes in pool mode."
+    )
+    parser.add_argument("--max-pending", type=int, default=8)
+    args = parser.parse_args()
+
+    db_fd, db_path = tempfile.mkstemp(suffix=".db")
+    os.close(db_fd)
+    from app import create_app, db
+    from app.synthetic import generate_data
+
+    settings = {
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{db_path}",
+        "TESTING": True,
+        "WTF_CSRF_ENABLED": False,
+        "LOGIN_MAX_FAILURES_PER_IP": 0,
+        "LOGIN_MAX_FAILURES_PER_ACCOUNT": 0,
+        "PASSWORD_HASH_MAX_PENDING": args.max_pending,
+    }
+    try:
+        with create_app(settings).app_context():
+            db.create_all()
+            generate_data(users=max(args.clients), days=1)
+
+        print(
+            f"{'mode':<8}{'clients':>8}{'logins/s':>10}{'p50':>10}{'p95':>10}"
+            f"{'busy':>7}{'page p95':>11}"
+        )
+        for clients in args.clients:
+            for mode, workers in (("inline", 0), ("pool", args.workers)):
+                app = create_app({**settings, "PASSWORD_HASH_WORKERS": workers})
+                # Start the pool before the clock does
+                app.test_client().post(
+                    "/login", data={"email": "load0000001", "password": "password"}
+                )
+                row = run(app, clients, args.seconds)
+                if workers:
+                    app.extensions["hash_pool"].shutdown()
+                print(
+                    f"{mode:<8}{clients:>8}{row['logins']:>10.1f}"
+                    f"{row['login_p50_ms']:>8.0f}ms{row['login_p95_ms']:>8.0f}ms"
+                    f"{row['busy']:>7}{row['page_p95_ms']:>9.1f}ms"
+                )
+    finally:
+        os.unlink(db_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Per-call cost of picking a recommendation: the old list-building code
+against the compiled catalog, on the same inputs.
+
+    python -m benchmarks.recommendation_catalog
+"""
+import random
+import timeit
+
+from app.recommendation_catalog import select_recommendation
+from benchmarks.legacy_recommendation import legacy_recommendation
+
+CASES = [
+    ("cutting", {"rate_per_week": -0.1, "since": "Jan 01"}, {"calories": 2900, "protein": 15}),
+    ("lean muscle", {"rate_per_week": 0.7, "since": "Jan 01"}, {"calories": 2600, "protein": 40}),
+    ("endurance", None, None),
+    ("balanced", {"rate_per_week": 0.5, "since": "Jan 01"}, {"calories": 2000, "protein": 25}),
+]
+RECENT = [("Turkey Lettuce Wraps", "30 min HIIT"), ("Salmon + Sweet Potato", "Legs + Back Day")]
+FEEDBACK = ({"Tuna Salad with Avocado"}, {"Egg Whites + Oats"}, set(), {"Kickboxing"})
+
+
+def run(fn, rng, number):
+    def call():
+        for goal, trend, macros in CASES:
+            fn(goal, trend, RECENT, FEEDBACK, 2400, macros, rng)
+
+    return min(timeit.repeat(call, number=number, repeat=5)) / (number * len(CASES))
+
+
+def main(number=2000):
+    legacy = run(legacy_recommendation, random.Random(0), number)
+    compiled = run(
+        lambda *args: select_recommendation(*args[:6], rng=args[6]), random.Random(0), number
+    )
+    print(f"legacy:   {legacy * 1e6:7.2f} µs/call")
+    print(f"compiled: {compiled * 1e6:7.2f} µs/call ({legacy / compiled:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""Latency percentiles and SQL query counts for the hot routes, on a database
+from `flask generate-data` and with a local stub in place of the USDA API,
+checked against a stored baseline.
+
+    python -m benchmarks.routes                  # compare with the baseline
+    python -m benchmarks.routes --save           # record a new baseline
+    python -m benchmarks.routes --threshold 0.5 --query-threshold 1
+
+Exits 1 if any case's p95 grew by more than --threshold (a fraction of
+the baseline) or its worst-case query count by more than --query-threshold.
+Both runs must use the same data, cache and stub options; latencies are
+only comparable on the same machine, query counts anywhere.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+BASELINE = Path(__file__).with_name("baseline.json")
+ROUTES = (
+    "/dashboard",
+    "/progress",
+    "/recommendations",
+    "/previous_workouts",
+    "/autocomplete_food",
+)
+FOODS = ("chicken", "oats", "salmon", "greek yogurt", "rice", "banana", "tofu")
+
+
+class StubUSDA(BaseHTTPRequestHandler):
+    """Answers /foods/search like FoodData Central, after `latency` seconds."""
+
+    latency = 0.0
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        if url.path != "/foods/search":
+            self.send_error(404)
+            return
+        time.sleep(self.latency)
+        query = params.get("query", [""])[0]
+        size = int(params.get("pageSize", ["5"])[0])
+        foods = [
+            {
+                "description": f"{query} {n}".upper(),
+                "foodNutrients": [
+                    {"nutrientName": "Energy", "unitName": "KCAL", "value": 100 + n},
+                    {"nutrientName": "Protein", "unitName": "G", "value": 10},
+                    {"nutrientName": "Carbohydrate, by difference", "value": 20},
+                    {"nutrientName": "Total lipid (fat)", "unitName": "G", "value": 5},
+                ],
+            }
+            for n in range(size)
+        ]
+        body = json.dumps({"foods": foods}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_usda(latency):
+    StubUSDA.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubUSDA)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def summarize(seconds, queries):
+    ms = np.array(seconds) * 1e3
+    return {
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "queries": max(queries),
+    }
+
+
+def run_cases(app, db, args):
+    from sqlalchemy import event, select
+    from sqlalchemy.engine import Engine
+
+    from app.models import User
+    from app.utils import generate_recommendation
+
+    counter = {"queries": 0}
+
+    def count(*_):
+        counter["queries"] += 1
+
+    def measure(fn, iterations):
+        seconds, queries = [], []
+        for i in range(args.warmup + iterations):
+            counter["queries"] = 0
+            start = time.perf_counter()
+            fn(i)
+            elapsed = time.perf_counter() - start
+            if i >= args.warmup:
+                seconds.append(elapsed)
+                queries.append(counter["queries"])
+        return summarize(seconds, queries)
+
+    with app.app_context():
+        user_ids = db.session.execute(select(User.id).order_by(User.id)).scalars().all()
+
+    client = app.test_client()
+
+    def get(route):
+        def call(i):
+            # A different user each time, so caches are mostly cold
+            with client.session_transaction() as session:
+                session["_user_id"] = str(user_ids[i % len(user_ids)])
+            url = route
+            if route == "/autocomplete_food":
+                url += f"?source=api&q={FOODS[i % len(FOODS)]} {i}"
+            response = client.get(url)
+            if response.status_code != 200:
+                raise SystemExit(f"{url} returned {response.status_code}")
+            response.close()
+
+        return call
+
+    def recommend(i):
+        with app.app_context():
+            user = db.session.get(User, user_ids[i % len(user_ids)])
+            generate_recommendation(user)
+
+    results = {}
+    # Every engine: GET requests read through the read-only one
+    event.listen(Engine, "before_cursor_execute", count)
+    try:
+        # Requests run outside any app context of ours, as in production: an
+        # outer context would share its session, and its identity map, with
+        # every request
+        for route in ROUTES:
+            results[route] = measure(get(route), args.requests)
+        results["generate_recommendation"] = measure(recommend, args.requests)
+    finally:
+        event.remove(Engine, "before_cursor_execute", count)
+    return results
+
+
+def compare(results, baseline, threshold, query_threshold):
+    """Returns one message per regression against the baseline results."""
+    regressions = []
+    for name, now in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        limit = before["p95_ms"] * (1 + threshold)
+        if now["p95_ms"] > limit:
+            regressions.append(
+                f"{name}: p95 {now['p95_ms']:.2f}ms > {limit:.2f}ms "
+                f"(baseline {before['p95_ms']:.2f}ms)"
+            )
+        if now["queries"] > before["queries"] + query_threshold:
+            regressions.append(
+                f"{name}: {now['queries']} queries, baseline {before['queries']}"
+            )
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    data = parser.add_argument_group("data")
+    data.add_argument("--users", type=int, default=200)
+    data.add_argument("--days", type=int, default=365)
+    data.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--requests", type=int, default=100, help="Per case.")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument(
+        "--usda-latency", type=float, default=0.0, help="Stub delay in seconds."
+    )
+    parser.add_argument(
+        "--page-cache",
+        action="store_true",
+        help="Keep the rendered-section cache on (off by default, so every "
+        "request renders).",
+    )
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--save", action="store_true", help="Write the baseline.")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="Allowed p95 growth as a fraction of the baseline.",
+    )
+    parser.add_argument(
+        "--query-threshold",
+        type=int,
+        default=0,
+        help="Allowed extra queries per call.",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    params = {
+        "users": args.users,
+        "days": args.days,
+        "seed": args.seed,
+        "page_cache": args.page_cache,
+        "usda_latency": args.usda_latency,
+    }
+
+    db_fd, db_path = tempfile.mkstemp(suffix=".db")
+    os.close(db_fd)
+    server = start_stub_usda(args.usda_latency)
+    # Configuration is read when the app is imported
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["USDA_API_URL"] = f"http://127.0.0.1:{server.server_port}"
+    os.environ["USDA_API_KEY"] = "benchmark"
+    os.environ["USDA_CACHE_PATH"] = ""
+    os.environ["PAGE_CACHE_BACKEND"] = "memory" if args.page_cache else "none"
+
+    from app import app, db
+    from app.synthetic import generate_data
+
+    try:
+        with app.app_context():
+            db.create_all()
+            start = time.perf_counter()
+            counts = generate_data(users=args.users, days=args.days, seed=args.seed)
+            print(
+                f"Generated {sum(counts.values())} rows "
+                f"in {time.perf_counter() - start:.1f}s."
+            )
+        results = run_cases(app, db, args)
+    finally:
+        server.shutdown()
+        os.unlink(db_path)
+
+    print(f"{'case':<26}{'p50':>10}{'p95':>10}{'queries':>9}")
+    for name, r in results.items():
+        print(f"{name:<26}{r['p50_ms']:>8.2f}ms{r['p95_ms']:>8.2f}ms{r['queries']:>9}")
+
+    if args.save:
+        args.baseline.write_text(
+            json.dumps({"params": params, "results": results}, indent=2) + "\n"
+        )
+        print(f"Saved baseline to {args.baseline}.")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; run with --save to record one.")
+        return 0
+    baseline = json.loads(args.baseline.read_text())
+    if baseline["params"] != params:
+        print(f"Baseline was recorded with {baseline['params']}, not {params}.")
+        return 2
+    regressions = compare(
+        results, baseline["results"], args.threshold, args.query_threshold
+    )
+    for message in regressions:
+        print("REGRESSION " + message)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
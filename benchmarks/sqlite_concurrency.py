@@ -0,0 +1,135 @@
+"""Read and write throughput with N client processes sharing one SQLite file,
+under SQLite's default settings and under the WAL profile.
+
+Readers load /progress and /previous_workouts, writers post to /log_meal and
+/log_weight, each process through its own app as a gunicorn worker would.
+
+    python -m benchmarks.sqlite_concurrency
+    python -m benchmarks.sqlite_concurrency --clients 1 4 8 --writers 0.25
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sqlalchemy.exc import OperationalError
+
+READS = ("/progress", "/previous_workouts")
+WRITES = (
+    (
+        "/log_meal",
+        {"name": "Oats", "calories": 300, "protein": 10, "carbs": 50, "fats": 5},
+    ),
+    ("/log_weight", {"weight": 180.5}),
+)
+
+
+def client(db_path, profile, user_id, writer, start_at, seconds):
+    """One worker process: requests in a loop until the deadline."""
+    from app import create_app
+
+    app = create_app(
+        {
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{db_path}",
+            "SQLITE_PROFILE": profile,
+            "TESTING": True,
+            "WTF_CSRF_ENABLED": False,
+            "PAGE_CACHE_BACKEND": "none",
+            "RECOMMENDATIONS_ON_DASHBOARD": False,
+        }
+    )
+    http = app.test_client()
+    with http.session_transaction() as session:
+        session["_user_id"] = str(user_id)
+
+    latencies, errors, n = [], 0, 0
+    time.sleep(max(0.0, start_at - time.time()))
+    deadline = start_at + seconds
+    while time.time() < deadline:
+        began = time.perf_counter()
+        try:
+            if writer:
+                url, data = WRITES[n % len(WRITES)]
+                ok = http.post(url, data=data).status_code == 302
+            else:
+                ok = http.get(READS[n % len(READS)]).status_code == 200
+        except OperationalError:  # database is locked
+            ok = False
+        n += 1
+        if ok:
+            latencies.append(time.perf_counter() - began)
+        else:
+            errors += 1
+    return writer, latencies, errors
+
+
+def run(db_path, profile, clients, writers, seconds):
+    start_at = time.time() + 2  # after every process has built its app
+    specs = [
+        (db_path, profile, 1 + i, i < writers, start_at, seconds)
+        for i in range(clients)
+    ]
+    with ProcessPoolExecutor(clients) as pool:
+        results = list(pool.map(client, *zip(*specs)))
+
+    row = {}
+    for kind, is_writer in (("reads", False), ("writes", True)):
+        latencies = [s for w, lat, _ in results if w == is_writer for s in lat]
+        row[kind] = len(latencies) / seconds
+        row[f"{kind}_p95_ms"] = (
+            float(np.percentile(latencies, 95)) * 1e3 if latencies else float("nan")
+        )
+    row["errors"] = sum(e for _, _, e in results)
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument(
+        "--writers", type=float, default=0.25, help="Share of clients that write."
+    )
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--days", type=int, default=365)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    template = os.path.join(workdir, "template.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{template}"
+    os.environ["SQLITE_PROFILE"] = "default"
+    from app import create_app, db
+    from app.synthetic import generate_data
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        generate_data(users=args.users, days=args.days)
+        db.engine.dispose()
+
+    print(
+        f"{'profile':<9}{'clients':>8}{'writers':>8}{'reads/s':>10}{'read p95':>11}"
+        f"{'writes/s':>10}{'write p95':>11}{'errors':>8}"
+    )
+    try:
+        for clients in args.clients:
+            writers = round(clients * args.writers)
+            for profile in ("default", "wal"):
+                # A fresh copy each run: WAL mode is stored in the file
+                db_path = os.path.join(workdir, f"{profile}-{clients}.db")
+                shutil.copy(template, db_path)
+                row = run(db_path, profile, clients, writers, args.seconds)
+                print(
+                    f"{profile:<9}{clients:>8}{writers:>8}{row['reads']:>10.0f}"
+                    f"{row['reads_p95_ms']:>9.1f}ms{row['writes']:>10.0f}"
+                    f"{row['writes_p95_ms']:>9.1f}ms{row['errors']:>8}"
+                )
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
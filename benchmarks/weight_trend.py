@@ -0,0 +1,99 @@
+"""analyze_weight_trend before and after the NumPy trend module, on one user
+with 10, 1k and 100k weight logs, and for 1000 users at once.
+
+    python -m benchmarks.weight_trend
+"""
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_db_fd, _db_path = tempfile.mkstemp(suffix=".db")
+os.close(_db_fd)
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_path}"
+
+from sqlalchemy import insert  # noqa: E402
+
+from app import app, db  # noqa: E402
+from app.models import User, WeightLog  # noqa: E402
+from app.trends import weight_trends  # noqa: E402
+from app.utils import analyze_weight_trend  # noqa: E402
+
+
+def legacy_analyze_weight_trend(user_id):
+    """The original: load every log as an ORM object, use the first and last."""
+    logs = (
+        WeightLog.query.filter_by(user_id=user_id).order_by(WeightLog.date.asc()).all()
+    )
+    if len(logs) < 2:
+        return None
+    first, last = logs[0], logs[-1]
+    delta_days = (last.date - first.date).days
+    if delta_days == 0:
+        return None
+    delta_weight = last.weight - first.weight
+    return {
+        "change": round(delta_weight, 1),
+        "rate_per_week": round(delta_weight / delta_days * 7, 2),
+        "since": first.date.strftime("%b %d"),
+    }
+
+
+def add_logs(user_id, count, rng):
+    start = datetime(2015, 1, 1)
+    db.session.execute(
+        insert(WeightLog),
+        [
+            {
+                "user_id": user_id,
+                "weight": 200 - i * 0.01 + rng.gauss(0, 1),
+                "date": start + timedelta(hours=6 * i),
+            }
+            for i in range(count)
+        ],
+    )
+
+
+def best_of(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    rng = random.Random(0)
+    with app.app_context():
+        db.create_all()
+        print(f"{'case':<22}{'legacy':>12}{'numpy':>12}")
+        for count in (10, 1_000, 100_000):
+            user = User(username=f"bench{count}", name="B")
+            db.session.add(user)
+            db.session.flush()
+            user_id = user.id
+            add_logs(user_id, count, rng)
+            db.session.commit()
+            legacy = best_of(lambda: legacy_analyze_weight_trend(user_id))
+            vectorized = best_of(lambda: analyze_weight_trend(user_id))
+            label = f"{count} points"
+            print(f"{label:<22}{legacy * 1e3:>10.2f}ms{vectorized * 1e3:>10.2f}ms")
+
+        users = [User(username=f"many{i}", name="M") for i in range(1000)]
+        db.session.add_all(users)
+        db.session.flush()
+        for user in users:
+            add_logs(user.id, 100, rng)
+        db.session.commit()
+        ids = [u.id for u in users]
+        legacy = best_of(lambda: [legacy_analyze_weight_trend(i) for i in ids], 1)
+        vectorized = best_of(lambda: weight_trends(ids), 3)
+        print(f"{'1000 users x 100':<22}{legacy * 1e3:>10.2f}ms{vectorized * 1e3:>10.2f}ms")
+    os.unlink(_db_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,4 +7,147 @@ load_dotenv(os.path.join(basedir, '.env'))
 SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
     'sqlite:///' + os.path.join(basedir, 'app.db')
 SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# Connection pool per worker process (QueuePool; ignored for in-memory SQLite).
+# Size it for the worker's threads plus background streams.
+SQLALCHEMY_ENGINE_OPTIONS = {
+    'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+    'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+    'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+    'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true',
+}
+
+# SQLite pragmas applied to every new connection (see app/database.py). The
+# "wal" profile turns on write-ahead logging, so readers no longer wait for a
+# committing writer, with synchronous=NORMAL (durable across app crashes, not
+# power loss), a larger page cache (negative: KiB), memory-mapped reads and a
+# busy timeout (ms) instead of failing on a locked database. "default" keeps
+# SQLite's own settings.
+SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'wal')
+SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', -64 * 1024))
+SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))
+
+# Reads of GET requests go through a read-only engine; writes, and everything
+# after a request's first write, use the primary. DATABASE_READ_URL points at
+# a replica; unset, a SQLite file is opened a second time with mode=ro.
+# READ_ROUTING=false sends everything to the primary.
+READ_ROUTING = os.environ.get('READ_ROUTING', 'true').lower() == 'true'
+DATABASE_READ_URL = os.environ.get('DATABASE_READ_URL')
 SECRET_KEY = os.environ.get('SECRET_KEY') or 'you-will-never-guess'
+
+# USDA food search cache: in-process LRU plus a SQLite file shared by workers.
+# Set USDA_CACHE_PATH to an empty string to keep the cache in memory only.
+USDA_CACHE_SIZE = int(os.environ.get('USDA_CACHE_SIZE', 2048))
+USDA_CACHE_TTL = int(os.environ.get('USDA_CACHE_TTL', 24 * 60 * 60))
+USDA_CACHE_PATH = os.environ.get('USDA_CACHE_PATH',
+                                 os.path.join(basedir, 'usda_cache.db'))
+
+# Where /autocomplete_food looks first: "local" answers from the imported
+# FoodData Central table (see `flask import-foods`), "api" always calls USDA.
+FOOD_AUTOCOMPLETE_SOURCE = os.environ.get('FOOD_AUTOCOMPLETE_SOURCE', 'local')
+# Seconds between checks for a re-imported food table in running workers
+FOOD_INDEX_REFRESH = int(os.environ.get('FOOD_INDEX_REFRESH', 60))
+
+# USDA FoodData Central client: one keep-alive session per worker with bounded
+# timeouts (seconds), retries with exponential backoff and a circuit breaker
+# that fails fast for USDA_BREAKER_RESET seconds after repeated errors.
+USDA_API_KEY = os.environ.get('USDA_API_KEY')
+USDA_API_URL = os.environ.get('USDA_API_URL', 'https://api.nal.usda.gov/fdc/v1')
+USDA_CONNECT_TIMEOUT = float(os.environ.get('USDA_CONNECT_TIMEOUT', 3.05))
+USDA_READ_TIMEOUT = float(os.environ.get('USDA_READ_TIMEOUT', 10))
+USDA_MAX_RETRIES = int(os.environ.get('USDA_MAX_RETRIES', 2))
+USDA_BACKOFF_FACTOR = float(os.environ.get('USDA_BACKOFF_FACTOR', 0.3))
+USDA_POOL_SIZE = int(os.environ.get('USDA_POOL_SIZE', 10))
+USDA_BREAKER_THRESHOLD = int(os.environ.get('USDA_BREAKER_THRESHOLD', 5))
+USDA_BREAKER_RESET = float(os.environ.get('USDA_BREAKER_RESET', 30))
+
+# Autocomplete: queries shorter than the minimum prefix are not looked up, and
+# the streaming endpoint waits out the debounce window so a newer keystroke can
+# cancel it before any work is done.
+AUTOCOMPLETE_MIN_PREFIX = int(os.environ.get('AUTOCOMPLETE_MIN_PREFIX', 2))
+AUTOCOMPLETE_DEBOUNCE_MS = int(os.environ.get('AUTOCOMPLETE_DEBOUNCE_MS', 150))
+AUTOCOMPLETE_LOOKUP_THREADS = int(os.environ.get('AUTOCOMPLETE_LOOKUP_THREADS', 4))
+# Lookups queued or running in the pool before new ones are turned away
+AUTOCOMPLETE_MAX_PENDING = int(os.environ.get('AUTOCOMPLETE_MAX_PENDING', 32))
+
+# History pages (/previous_workouts, /recommendations and their /api/ JSON
+# twins) are keyset-paginated; ?limit= is capped at HISTORY_PAGE_MAX. The
+# /export variants stream every row, fetching EXPORT_BATCH_SIZE at a time.
+HISTORY_PAGE_SIZE = int(os.environ.get('HISTORY_PAGE_SIZE', 20))
+HISTORY_PAGE_MAX = int(os.environ.get('HISTORY_PAGE_MAX', 100))
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 500))
+
+# Instrumentation: per-endpoint SQL counts and time, external API time and the
+# slowest statements, served in Prometheus format at /metrics to scrapers that
+# send "Authorization: Bearer <METRICS_TOKEN>"; without a token set, /metrics
+# is off. The debug header adds Server-Timing and X-Query-Count to every
+# response.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+METRICS_DEBUG_HEADER = os.environ.get('METRICS_DEBUG_HEADER', 'false').lower() == 'true'
+METRICS_SLOW_STATEMENTS = int(os.environ.get('METRICS_SLOW_STATEMENTS', 10))
+
+# Recommendations older than RECOMMENDATION_STALE_AFTER seconds are replaced.
+# By default /dashboard does that inline; set RECOMMENDATIONS_ON_DASHBOARD to
+# false when `flask generate-recommendations` runs on a schedule instead.
+RECOMMENDATION_STALE_AFTER = int(os.environ.get('RECOMMENDATION_STALE_AFTER', 3600))
+RECOMMENDATIONS_ON_DASHBOARD = (
+    os.environ.get('RECOMMENDATIONS_ON_DASHBOARD', 'true').lower() == 'true'
+)
+
+# /progress/weight_series downsamples long weight histories to at most
+# WEIGHT_CHART_POINTS points (?points= is capped at WEIGHT_CHART_POINTS_MAX)
+# and caches the result per user until a log is added or deleted.
+WEIGHT_CHART_POINTS = int(os.environ.get('WEIGHT_CHART_POINTS', 200))
+WEIGHT_CHART_POINTS_MAX = int(os.environ.get('WEIGHT_CHART_POINTS_MAX', 1000))
+WEIGHT_CHART_CACHE_SIZE = int(os.environ.get('WEIGHT_CHART_CACHE_SIZE', 1024))
+WEIGHT_CHART_CACHE_TTL = int(os.environ.get('WEIGHT_CHART_CACHE_TTL', 24 * 60 * 60))
+
+# Rendered sections of /dashboard and /progress are cached per user and
+# dropped whenever that user logs or edits something. "sqlite" shares them
+# through PAGE_CACHE_PATH, so a write handled by one worker (or by `flask
+# generate-recommendations`) reaches them all; "memory" keeps them in each
+# worker and is only safe with a single worker process; "none" disables.
+PAGE_CACHE_BACKEND = os.environ.get('PAGE_CACHE_BACKEND', 'sqlite')
+PAGE_CACHE_PATH = os.environ.get('PAGE_CACHE_PATH',
+                                 os.path.join(basedir, 'page_cache.db'))
+PAGE_CACHE_SIZE = int(os.environ.get('PAGE_CACHE_SIZE', 4096))
+PAGE_CACHE_TTL = int(os.environ.get('PAGE_CACHE_TTL', 10 * 60))
+
+# Derived profile metrics (BMR, TDEE, macro targets) are memoized per user and
+# profile version; a profile edit or weigh-in bumps the version.
+PROFILE_METRICS_CACHE_SIZE = int(os.environ.get('PROFILE_METRICS_CACHE_SIZE', 4096))
+PROFILE_METRICS_CACHE_TTL = int(os.environ.get('PROFILE_METRICS_CACHE_TTL', 24 * 60 * 60))
+
+# The logged-in user is cached per worker, keyed by id and checked against a
+# stamp of the row kept in the session, so most requests skip its SELECT. A
+# write to the user drops the copy and the writer's stamp; other sessions of
+# the same user may see the old row for up to USER_CACHE_TTL seconds.
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 4096))
+USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 30))
+
+# Password hashing runs in PASSWORD_HASH_WORKERS processes per worker (0: in
+# the request thread). Past PASSWORD_HASH_MAX_PENDING hashes queued or running,
+# or after PASSWORD_HASH_TIMEOUT seconds, login and registration answer 503.
+# Hashes stored with other parameters than PASSWORD_HASH_METHOD are replaced at
+# the user's next successful login.
+PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 1))
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 8))
+PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+
+# Failed logins allowed per client IP and per account within
+# LOGIN_THROTTLE_WINDOW seconds; after that, logins are refused (429) without
+# checking the password until the oldest failure ages out. 0 disables a limit.
+# Counted per worker process.
+LOGIN_MAX_FAILURES_PER_IP = int(os.environ.get('LOGIN_MAX_FAILURES_PER_IP', 20))
+LOGIN_MAX_FAILURES_PER_ACCOUNT = int(os.environ.get('LOGIN_MAX_FAILURES_PER_ACCOUNT', 5))
+LOGIN_THROTTLE_WINDOW = int(os.environ.get('LOGIN_THROTTLE_WINDOW', 15 * 60))
+
+# Bulk history import (/import/<kind> and `flask import-history`): rows are
+# inserted and committed IMPORT_CHUNK_SIZE at a time; at most IMPORT_MAX_ERRORS
+# rejected rows are listed in the report (all are counted).
+IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', 1000))
+IMPORT_MAX_ERRORS = int(os.environ.get('IMPORT_MAX_ERRORS', 100))
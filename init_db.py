@@ -1,4 +1,6 @@
-from app import app, db
+from app import create_app, db
+
+app = create_app()
 
 with app.app_context():
     db.create_all()
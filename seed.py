@@ -1,7 +1,9 @@
-from app import app, db
+from app import create_app, db
 from app.models import User, Workout, Meal, WeightLog
 from datetime import datetime, timedelta, UTC
 
+app = create_app()
+
 with app.app_context():
     db.drop_all()
     db.create_all()
@@ -8,21 +8,40 @@ import pytest
 ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(ROOT))
 
-from app import app, db
+import app as app_package
+from app import create_app, db
+
+_db_fd, DB_PATH = tempfile.mkstemp(suffix=".db")
+os.close(_db_fd)
+
+TEST_CONFIG = {
+    "TESTING": True,
+    "WTF_CSRF_ENABLED": False,
+    "SQLALCHEMY_DATABASE_URI": f"sqlite:///{DB_PATH}",
+    # Hash in the test process; tests/test_passwords.py covers the pool
+    "PASSWORD_HASH_WORKERS": 0,
+    # One process; a cache file would also outlive each test's database
+    "PAGE_CACHE_BACKEND": "memory",
+}
+
+# One app for the session, built from the test config; test modules get it
+# from `from app import app`, which would otherwise build one from config.py
+app = app_package.app = create_app(TEST_CONFIG)
+
+
+def pytest_unconfigure(config):
+    if os.path.exists(DB_PATH):
+        os.unlink(DB_PATH)
 
 
 @pytest.fixture
 def client():
-    db_fd, db_path = tempfile.mkstemp()
-    os.close(db_fd)
-
-    app.config.update(
-        {
-            "TESTING": True,
-            "WTF_CSRF_ENABLED": False,
-            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{db_path}",
-        }
-    )
+    # Caches and login counts outlive a test's database; user ids restart at 1
+    # in the next one
+    for cache in (
+        "page_cache", "chart_cache", "profile_metrics", "user_cache", "login_throttle"
+    ):
+        app.extensions.pop(cache, None)
 
     with app.app_context():
         db.create_all()
@@ -35,4 +54,3 @@ def client():
         with app.app_context():
             db.session.remove()
             db.drop_all()
-        os.unlink(db_path)
@@ -0,0 +1,185 @@
+import json
+import threading
+import time
+
+import pytest
+
+from app import app, db
+from app import utils
+from app.autocomplete import (
+    LatestRequests,
+    LookupPool,
+    get_autocomplete_state,
+    stream_suggestions,
+)
+from app.models import User
+
+
+def parse_events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        name, data = block.split("\n")
+        events.append((name[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """A USDA lookup that blocks until the test releases it."""
+    state = {"calls": [], "release": threading.Event()}
+
+    def fake_fetch(query, max_results=5):
+        state["calls"].append(query)
+        state["release"].wait(5)
+        return [{"name": f"{query} result", "calories": 1, "protein": 1, "carbs": 1, "fat": 1}]
+
+    monkeypatch.setattr(utils, "fetch_usda_food", fake_fetch)
+    monkeypatch.setitem(app.config, "USDA_CACHE_PATH", "")
+    monkeypatch.setitem(app.config, "AUTOCOMPLETE_DEBOUNCE_MS", 20)
+    for key in ("usda_cache", "food_index", "autocomplete"):
+        app.extensions.pop(key, None)
+    yield state
+    state["release"].set()
+    for key in ("usda_cache", "food_index", "autocomplete"):
+        app.extensions.pop(key, None)
+
+
+@pytest.fixture
+def logged_in(client):
+    with app.app_context():
+        user = User(username="typist", name="Typist", email="typist@example.com")
+        user.set_password("password123")
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user_id)
+    return client
+
+
+def test_newer_claim_wakes_waiting_request():
+    registry = LatestRequests()
+    seq = registry.claim("s1")
+    threading.Timer(0.05, registry.claim, ("s1",)).start()
+
+    start = time.monotonic()
+    assert registry.wait("s1", seq, timeout=2) is False
+    assert time.monotonic() - start < 1
+
+
+def test_out_of_order_keystroke_is_stale_from_the_start():
+    registry = LatestRequests()
+    newest = registry.claim("s1", 2, "page-a")
+    late = registry.claim("s1", 1, "page-a")
+    assert registry.wait("s1", late, timeout=0) is False
+    assert registry.wait("s1", newest, timeout=0) is True
+
+
+def test_reloaded_page_supersedes_the_old_one():
+    registry = LatestRequests()
+    # Still waiting on upstream when the page reloads
+    before_reload = registry.claim("s1", 7, "page-a")
+    # The new page's counter starts again at 1
+    after_reload = registry.claim("s1", 1, "page-b")
+    assert registry.wait("s1", before_reload, timeout=0) is False
+    assert registry.wait("s1", after_reload, timeout=0) is True
+    assert registry.wait("s1", registry.claim("s1", 2, "page-b"), timeout=0)
+
+
+def test_stream_requires_login(client, upstream):
+    response = client.get("/autocomplete_food/stream?q=oats&seq=1")
+
+    assert response.status_code == 302
+    assert upstream["calls"] == []
+
+
+def test_short_prefix_is_not_looked_up(logged_in, upstream):
+    client = logged_in
+    response = client.get("/autocomplete_food/stream?q=c&seq=1")
+
+    assert response.mimetype == "text/event-stream"
+    assert parse_events(response.get_data(as_text=True)) == [
+        ("suggestions", {"source": "none", "items": []}),
+        ("done", {"seq": 1}),
+    ]
+    assert client.get("/autocomplete_food?q=c").get_json() == []
+    assert upstream["calls"] == []
+
+
+def test_stream_returns_upstream_suggestions(logged_in, upstream):
+    upstream["release"].set()
+    response = logged_in.get("/autocomplete_food/stream?q=oats&seq=1")
+
+    events = parse_events(response.get_data(as_text=True))
+    assert events[0][0] == "suggestions"
+    assert events[0][1]["items"][0]["label"] == "oats result"
+    assert events[-1] == ("done", {"seq": 1})
+
+
+def test_superseded_request_stops_waiting_on_upstream(client, upstream):
+    events = []
+
+    with app.test_request_context():
+        registry, _ = get_autocomplete_state()
+        seq = registry.claim("typist")
+
+        def consume():
+            with app.app_context():
+                events.extend(stream_suggestions("typist", seq, "chic"))
+
+        worker = threading.Thread(target=consume)
+        worker.start()
+        deadline = time.monotonic() + 2
+        while not upstream["calls"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        registry.claim("typist")  # the next keystroke arrives
+        worker.join(1)
+
+    assert not worker.is_alive()
+    assert events == [f"event: cancelled\ndata: {json.dumps({'seq': seq})}\n\n"]
+    assert upstream["calls"] == ["chic"]
+
+
+def test_request_superseded_during_debounce_skips_lookup(client, upstream):
+    app.config["AUTOCOMPLETE_DEBOUNCE_MS"] = 500
+
+    with app.test_request_context():
+        registry, _ = get_autocomplete_state()
+        seq = registry.claim("typist")
+        threading.Timer(0.05, registry.claim, ("typist",)).start()
+        events = list(stream_suggestions("typist", seq, "chic"))
+
+    assert events[0].startswith("event: cancelled")
+    assert upstream["calls"] == []
+
+
+def test_lookup_pool_turns_away_work_beyond_its_cap():
+    release = threading.Event()
+    pool = LookupPool(workers=1, max_pending=2)
+
+    first = pool.submit(release.wait, 5)
+    second = pool.submit(release.wait, 5)
+    assert pool.submit(release.wait, 5) is None
+
+    release.set()
+    first.result(1)
+    second.result(1)
+    assert pool.submit(lambda: "ok").result(1) == "ok"
+
+
+def test_failed_lookup_ends_the_stream_with_an_error(logged_in, monkeypatch):
+    def broken(query, max_results=5):
+        raise ValueError("unexpected payload")
+
+    monkeypatch.setattr(utils, "fetch_usda_food", broken)
+    monkeypatch.setitem(app.config, "USDA_CACHE_PATH", "")
+    monkeypatch.setitem(app.config, "AUTOCOMPLETE_DEBOUNCE_MS", 0)
+    for key in ("usda_cache", "food_index", "autocomplete"):
+        monkeypatch.delitem(app.extensions, key, raising=False)
+
+    response = logged_in.get("/autocomplete_food/stream?q=oats&seq=1&page=p")
+    assert parse_events(response.get_data(as_text=True)) == [
+        ("error", {"error": "Food search failed"})
+    ]
@@ -0,0 +1,129 @@
+import io
+import json
+
+import pytest
+from sqlalchemy import event
+
+from app import app, db
+from app.bulk_import import InvalidImport, import_rows, read_rows
+from app.models import Meal, User, WeightLog, Workout
+from app.rollups import check_rollups, get_user_totals
+
+
+@pytest.fixture
+def importer(client):
+    with app.app_context():
+        user = User(username="migrant", name="M", email="m@example.com", weight=200)
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user_id)
+    return client, user_id
+
+
+def upload(client, kind, text, filename):
+    return client.post(
+        f"/import/{kind}",
+        data={"file": (io.BytesIO(text.encode()), filename)},
+        content_type="multipart/form-data",
+    )
+
+
+def test_csv_workouts_are_validated_like_the_form(importer):
+    client, user_id = importer
+    text = (
+        "date,type,duration,calories_burned\n"
+        "2023-05-01T07:30:00,Cardio,30,300\n"
+        "2023-05-02T07:30:00+02:00,HIIT,20,250\n"
+        "2023-05-03,Yoga,30,100\n"
+        "2023-05-04,Strength,0,100\n"
+        "yesterday,Strength,45,200\n"
+    )
+    report = upload(client, "workouts", text, "workouts.csv").get_json()
+
+    assert report["inserted"] == 2
+    assert report["rejected"] == 3
+    assert [e["line"] for e in report["errors"]] == [4, 5, 6]
+    assert report["errors"][0]["errors"] == {"type": ["Not a valid choice."]}
+    assert "duration" in report["errors"][1]["errors"]
+    assert report["errors"][2]["errors"] == {"date": ["Not a valid ISO 8601 date."]}
+
+    with app.app_context():
+        workouts = Workout.query.filter_by(user_id=user_id).order_by(Workout.date).all()
+        assert [(w.type, w.date.hour) for w in workouts] == [("Cardio", 7), ("HIIT", 5)]
+        totals = get_user_totals(user_id)
+        assert (totals.workout_count, totals.workout_minutes) == (2, 50)
+        assert check_rollups() == []
+
+
+def test_jsonl_meals_and_weights(importer):
+    client, user_id = importer
+    meals = "\n".join(
+        [
+            json.dumps({"name": "Oats", "calories": 300, "protein": 10, "carbs": 50, "fats": 5}),
+            "",
+            "{not json",
+            json.dumps(["a", "list"]),
+            json.dumps({"name": "Eggs", "calories": 150, "protein": 12, "carbs": 0, "fats": 10}),
+        ]
+    )
+    report = upload(client, "meals", meals, "meals.jsonl").get_json()
+    assert (report["inserted"], report["rejected"]) == (2, 2)
+    assert [e["errors"] for e in report["errors"]] == [
+        {"row": ["Not valid JSON."]},
+        {"row": ["Expected a JSON object."]},
+    ]
+
+    weights = "\n".join(
+        json.dumps({"date": f"2023-01-{day:02d}", "weight": 200 - day}) for day in (3, 1, 2)
+    )
+    assert upload(client, "weights", weights, "w.ndjson").get_json()["inserted"] == 3
+
+    with app.app_context():
+        assert get_user_totals(user_id).meal_count == 2
+        assert Meal.query.filter_by(user_id=user_id).count() == 2
+        # The profile follows the latest weigh-in by date, not by file order
+        assert db.session.get(User, user_id).weight == 197
+        assert WeightLog.query.filter_by(user_id=user_id).count() == 3
+
+
+def test_rejects_unknown_kind_format_or_missing_file(importer):
+    client, _ = importer
+    assert upload(client, "sleep", "a\n1\n", "x.csv").status_code == 400
+    response = upload(client, "meals", "a\n1\n", "meals.txt")
+    assert response.status_code == 400
+    assert "Unknown format" in response.get_json()["error"]
+    assert client.post("/import/meals").status_code == 400
+
+
+def test_inserts_in_chunks_and_caps_listed_errors(importer):
+    _, user_id = importer
+    lines = ["type,duration,calories_burned"]
+    lines += ["Cardio,10,100"] * 25 + ["Cardio,-1,100"] * 5
+    inserts = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO workouts"):
+            inserts.append(len(parameters) if executemany else 1)
+
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            report = import_rows(
+                user_id,
+                "workouts",
+                read_rows(io.StringIO("\n".join(lines)), "csv"),
+                chunk_size=10,
+                max_errors=2,
+            )
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+
+        assert (report.inserted, report.rejected, len(report.errors)) == (25, 5, 2)
+        assert inserts == [10, 10, 5]
+        assert get_user_totals(user_id).workout_calories == 2500
+
+        with pytest.raises(InvalidImport):
+            import_rows(user_id, "sleep", iter(()))
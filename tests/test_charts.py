@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import app, db
+from app.charts import get_chart_cache, lttb
+from app.models import User, WeightLog
+
+
+@pytest.fixture
+def weigher(client):
+    """A logged-in user with 1000 daily weigh-ins and one spike."""
+    with app.app_context():
+        get_chart_cache().clear()
+        user = User(
+            username="weigher",
+            name="W",
+            email="w@example.com",
+            weight=180,
+            height=70,
+            age=30,
+        )
+        db.session.add(user)
+        db.session.commit()
+
+        start = datetime(2022, 1, 1)
+        db.session.add_all(
+            WeightLog(
+                user_id=user.id,
+                weight=230 if i == 400 else 200 - i * 0.02,
+                date=start + timedelta(days=i),
+            )
+            for i in range(1000)
+        )
+        db.session.commit()
+        user_id = user.id
+
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user_id)
+    return client
+
+
+def test_lttb_keeps_endpoints_and_extremes():
+    x = np.arange(500, dtype=float)
+    y = np.sin(x / 20)
+    y[123] = 10
+
+    keep = lttb(x, y, 50)
+
+    assert len(keep) == 50
+    assert keep[0] == 0 and keep[-1] == 499
+    assert np.all(np.diff(keep) > 0)
+    assert 123 in keep
+
+
+def test_lttb_returns_short_series_unchanged():
+    x = np.arange(5, dtype=float)
+    assert list(lttb(x, x, 10)) == [0, 1, 2, 3, 4]
+
+
+def test_weight_series_is_downsampled(weigher):
+    series = weigher.get("/progress/weight_series?points=100").get_json()
+
+    assert series["total_points"] == 1000
+    assert len(series["labels"]) == len(series["weights"]) == len(series["trend"]) == 100
+    assert series["labels"][0] == "Jan 01, 2022"
+    assert 230 in series["weights"]
+    assert series["summary"]["since"] == "Jan 01"
+
+    default = weigher.get("/progress/weight_series").get_json()
+    assert len(default["weights"]) == app.config["WEIGHT_CHART_POINTS"]
+
+
+def test_weight_series_is_cached_until_a_log_changes(weigher):
+    first = weigher.get("/progress/weight_series").get_json()
+
+    with app.app_context():
+        hits = get_chart_cache().stats()["hits"]
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(Engine, "before_cursor_execute", record)
+        try:
+            assert weigher.get("/progress/weight_series").get_json() == first
+        finally:
+            event.remove(Engine, "before_cursor_execute", record)
+        # Only checking the latest log id: the user comes from the user cache
+        assert len(statements) == 1
+        assert get_chart_cache().stats()["hits"] == hits + 1
+
+    weigher.post("/log_weight", data={"weight": 150})
+    logged = weigher.get("/progress/weight_series").get_json()
+    assert logged["total_points"] == 1001
+    assert logged["weights"][-1] == 150
+
+    with app.app_context():
+        latest = WeightLog.query.order_by(WeightLog.id.desc()).first().id
+    weigher.post(f"/delete_weight/{latest}")
+    assert weigher.get("/progress/weight_series").get_json() == first
+
+
+def test_progress_page_does_not_embed_the_series(weigher):
+    html = weigher.get("/progress").get_data(as_text=True)
+    assert "/progress/weight_series" in html
+    assert "Jan 01, 2022" in html  # the history table
+    assert '"weights"' not in html
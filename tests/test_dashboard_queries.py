@@ -0,0 +1,96 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import app, db
+from app.models import Meal, Recommendation, User, WeightLog, Workout
+from app.recommendations import RecommendationContext
+
+# user, recommendation context, weight trend, recent macros, insert, the
+# refreshed user/recommendation after commit, workouts and meals
+MAX_DASHBOARD_QUERIES = 10
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    # Every engine: GET requests read through the read-only one
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+
+
+@pytest.fixture
+def active_user(client):
+    with app.app_context():
+        user = User(
+            username="busy", name="Busy", email="busy@example.com",
+            age=30, weight=180, height=70, fitness_goal="cutting",
+        )
+        db.session.add(user)
+        db.session.commit()
+
+        now = datetime.now(timezone.utc)
+        for i in range(20):
+            db.session.add(Meal(name=f"Meal {i}", calories=500, protein=30, carbs=50, fats=15, user_id=user.id))
+            db.session.add(Workout(type="Run", duration=30, calories_burned=300, user_id=user.id))
+            db.session.add(WeightLog(weight=180 - i * 0.2, date=now - timedelta(days=20 - i), user_id=user.id))
+        for i, status in enumerate(["followed", "followed", "skipped", "skipped", None]):
+            db.session.add(
+                Recommendation(
+                    user_id=user.id,
+                    meal_rec="Turkey Lettuce Wraps" if i < 2 else "Tuna Salad with Avocado",
+                    workout_rec="HIIT",
+                    followed=status,
+                    timestamp=now - timedelta(days=5 - i),
+                )
+            )
+        db.session.commit()
+        user_id = user.id
+
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user_id)
+    return client, user_id
+
+
+def test_dashboard_stays_under_query_budget(active_user):
+    client, _ = active_user
+
+    # First view generates a recommendation, the second reuses it
+    for _ in range(2):
+        with count_queries() as statements:
+            response = client.get("/dashboard")
+        assert response.status_code == 200
+        assert len(statements) <= MAX_DASHBOARD_QUERIES, statements
+
+
+def test_context_matches_separate_queries(active_user):
+    _, user_id = active_user
+    with app.test_request_context():
+        with count_queries() as statements:
+            context = RecommendationContext.load(user_id)
+        assert len(statements) == 1
+
+        expected = (
+            Recommendation.query.filter_by(user_id=user_id)
+            .order_by(Recommendation.timestamp.desc())
+            .limit(3)
+            .all()
+        )
+        assert [r.id for r in context.recent] == [r.id for r in expected]
+        assert context.feedback_stats() == (
+            {"Turkey Lettuce Wraps"},
+            {"Tuna Salad with Avocado"},
+            {"HIIT"},
+            {"HIIT"},
+        )
+        assert context.feedback_stats(threshold=3) == (set(), set(), set(), set())
@@ -0,0 +1,106 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+from app import app, db
+from app.bulk_import import import_rows, read_rows
+from app.data_export import export_all
+from app.models import Meal, Recommendation, User, WeightLog, Workout
+
+
+@pytest.fixture
+def exporter(client):
+    with app.app_context():
+        users = [
+            User(username=f"user{i}", name=f"U{i}", email=f"u{i}@example.com")
+            for i in range(3)
+        ]
+        db.session.add_all(users)
+        db.session.commit()
+        for user in users:
+            for day in range(1, 4):
+                db.session.add(
+                    Workout(
+                        type="Cardio",
+                        duration=10 * day,
+                        calories_burned=100 * day,
+                        date=datetime(2024, 1, day, 7),
+                        user_id=user.id,
+                    )
+                )
+                db.session.add(WeightLog(weight=180 - day, date=datetime(2024, 1, day), user_id=user.id))
+            db.session.add(Meal(name="Oats, honey", calories=300, protein=10, carbs=50, fats=5, user_id=user.id))
+            db.session.add(Recommendation(user_id=user.id, meal_rec="Salad", workout_rec="Run"))
+        db.session.commit()
+        user_ids = [user.id for user in users]
+
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user_ids[0])
+    return client, user_ids
+
+
+def test_jsonl_export_streams_only_the_users_rows(exporter):
+    client, user_ids = exporter
+    response = client.get("/export")
+
+    assert response.is_streamed
+    assert response.mimetype == "application/x-ndjson"
+    assert 'filename="history.jsonl"' in response.headers["Content-Disposition"]
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [row["kind"] for row in rows] == ["workouts"] * 3 + ["meals"] + ["weights"] * 3 + ["recommendations"]
+    assert rows[0] == {
+        "kind": "workouts",
+        "id": 1,
+        "date": "2024-01-01T07:00:00",
+        "type": "Cardio",
+        "duration": 10,
+        "calories_burned": 100,
+    }
+    assert all("user_id" not in row for row in rows)
+
+
+def test_csv_export_can_be_imported_again(exporter):
+    client, user_ids = exporter
+    response = client.get("/export?format=csv&kind=workouts")
+    text = response.get_data(as_text=True)
+    assert text.splitlines()[0] == "id,date,type,duration,calories_burned"
+
+    with app.app_context():
+        report = import_rows(user_ids[2], "workouts", read_rows(io.StringIO(text), "csv"))
+        assert (report.inserted, report.rejected) == (3, 0)
+        dates = [
+            w.date
+            for w in Workout.query.filter_by(user_id=user_ids[2]).order_by(Workout.id)
+        ]
+        assert dates[3:] == dates[:3]
+
+
+def test_columnar_export_and_bad_requests(exporter):
+    client, _ = exporter
+    text = client.get("/export?format=columnar&kind=meals,weights").get_data(as_text=True)
+    rows = list(csv.DictReader(io.StringIO(text)))
+    assert [row["kind"] for row in rows] == ["meals", "weights", "weights", "weights"]
+    assert rows[0]["name"] == "Oats, honey"
+    assert rows[0]["weight"] == "" and rows[1]["name"] == ""
+
+    assert client.get("/export?format=csv").status_code == 400
+    assert client.get("/export?format=parquet").status_code == 400
+    assert client.get("/export?kind=sleep").status_code == 400
+
+
+def test_export_all_shards_cover_every_user_once(exporter, tmp_path):
+    _, user_ids = exporter
+    with app.app_context():
+        paths = export_all(str(tmp_path), "jsonl", ("workouts",), workers=2)
+
+    assert [p.rsplit("/", 1)[-1] for p in paths] == ["export-000-of-002.jsonl", "export-001-of-002.jsonl"]
+    seen = []
+    for shard, path in enumerate(paths):
+        with open(path) as f:
+            rows = [json.loads(line) for line in f]
+        assert all(row["user_id"] % 2 == shard for row in rows)
+        seen += [row["user_id"] for row in rows]
+    assert sorted(seen) == sorted(user_ids * 3)
@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool, StaticPool
+
+from app import create_app, db
+
+
+def pragmas(app, *names):
+    with app.app_context():
+        return [db.session.execute(text(f"PRAGMA {n}")).scalar() for n in names]
+
+
+def test_wal_profile_sets_pragmas_on_every_connection(tmp_path):
+    app = create_app(
+        {
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'wal.db'}",
+            "SQLITE_CACHE_SIZE": -2048,
+            "SQLITE_BUSY_TIMEOUT": 1234,
+        }
+    )
+    assert pragmas(app, "journal_mode", "synchronous", "cache_size") == [
+        "wal",
+        1,  # NORMAL
+        -2048,
+    ]
+    with app.app_context():
+        assert isinstance(db.engine.pool, QueuePool)
+        assert db.engine.pool.size() == app.config["SQLALCHEMY_ENGINE_OPTIONS"][
+            "pool_size"
+        ]
+        # A second pooled connection is configured too
+        with db.engine.connect() as first, db.engine.connect() as second:
+            for connection in (first, second):
+                timeout = connection.execute(text("PRAGMA busy_timeout")).scalar()
+                assert timeout == 1234
+
+
+def test_default_profile_keeps_sqlite_settings(tmp_path):
+    app = create_app(
+        {
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'plain.db'}",
+            "SQLITE_PROFILE": "default",
+        }
+    )
+    assert pragmas(app, "journal_mode", "synchronous") == ["delete", 2]
+
+
+def test_in_memory_database_drops_queue_pool_options():
+    app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite://"})
+    with app.app_context():
+        assert isinstance(db.engine.pool, StaticPool)
+    assert "pool_size" not in app.config["SQLALCHEMY_ENGINE_OPTIONS"]
+    assert pragmas(app, "busy_timeout") == [5000]
+
+
+def test_unknown_profile_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="SQLITE_PROFILE"):
+        create_app(
+            {
+                "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'x.db'}",
+                "SQLITE_PROFILE": "turbo",
+            }
+        )
@@ -0,0 +1,138 @@
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from app import app, db
+from app import utils
+from app.food_index import (
+    FoodIndex,
+    _iter_json_array,
+    get_food_index,
+    import_foods,
+    read_fdc_download,
+)
+from app.models import Food
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+
+@pytest.fixture
+def usda_calls(monkeypatch):
+    calls = []
+
+    def fake_fetch(query, max_results=5):
+        calls.append(query)
+        return [{"name": "Upstream Food", "calories": 1, "protein": 1, "carbs": 1, "fat": 1}]
+
+    monkeypatch.setattr(utils, "fetch_usda_food", fake_fetch)
+    monkeypatch.setitem(app.config, "USDA_CACHE_PATH", "")
+    app.extensions.pop("usda_cache", None)
+    yield calls
+    app.extensions.pop("usda_cache", None)
+    app.extensions.pop("food_index", None)
+
+
+def test_reads_json_download_with_atwater_energy_fallback():
+    rows = {r["id"]: r for r in read_fdc_download(str(FIXTURES / "fdc_foods.json"))}
+
+    assert len(rows) == 8
+    assert rows[172183]["calories"] == 143  # kcal, not the kJ entry
+    assert rows[175167]["calories"] == 208  # only reported as Atwater energy
+    assert rows[168917]["carbs"] == 28.2
+
+
+def test_reads_csv_download():
+    rows = {r["name"]: r for r in read_fdc_download(str(FIXTURES / "fdc_csv"))}
+
+    assert rows["Nuts, almonds"] == {
+        "id": 170567, "name": "Nuts, almonds", "calories": 579.0,
+        "protein": 21.2, "carbs": 21.6, "fat": 49.9,
+    }
+
+
+def test_index_prefix_and_fuzzy_search():
+    index = FoodIndex([
+        ("Chicken breast, raw", 120, 22.5, 0, 2.6),
+        ("Soup, chicken noodle", 62, 3.2, 7.1, 2.4),
+        ("Chickpeas, cooked", 164, 8.9, 27.4, 2.6),
+        ("Broccoli, raw", 34, 2.8, 6.6, 0.4),
+    ])
+
+    assert [f["name"] for f in index.search("chick")] == [
+        "Chickpeas, cooked", "Chicken breast, raw", "Soup, chicken noodle",
+    ]
+    assert [f["name"] for f in index.search("noodle chick")] == ["Soup, chicken noodle"]
+    assert index.search("brocolli")[0]["name"] == "Broccoli, raw"
+    assert index.get("broccoli  RAW")["calories"] == 34
+
+
+def test_autocomplete_answers_locally_and_falls_back_on_miss(client, usda_calls):
+    with app.app_context():
+        assert import_foods(str(FIXTURES / "fdc_foods.json")) == 8
+
+    response = client.get("/autocomplete_food?q=chick")
+    labels = [s["label"] for s in response.get_json()]
+    assert labels[0].startswith("Chick")
+    assert len(labels) == 3
+    assert usda_calls == []
+
+    response = client.post("/search_food", json={"query": labels[0]})
+    assert response.get_json()["name"] == labels[0]
+    assert usda_calls == []
+
+    response = client.get("/autocomplete_food?q=zzqx")
+    assert response.get_json()[0]["label"] == "Upstream Food"
+    assert usda_calls == ["zzqx"]
+
+
+def test_search_stops_after_enough_candidates():
+    index = FoodIndex(
+        (f"Chicken dish {i}", 1, 1, 1, 1) for i in range(5000)
+    )
+    visited = []
+    stream = index._prefix_stream
+
+    def counting_stream(prefix):
+        for i in stream(prefix):
+            visited.append(i)
+            yield i
+
+    index._prefix_stream = counting_stream
+    assert len(index.search("chick", limit=10)) == 10
+    assert len(visited) == 10
+
+
+def test_json_array_is_decoded_incrementally():
+    foods = [{"fdcId": i, "description": f"Food {i}", "foodNutrients": []} for i in range(50)]
+    text = json.dumps({"BrandedFoods": foods})
+
+    items = list(_iter_json_array(io.StringIO(text), chunk_size=64))
+
+    assert items == foods
+
+
+def test_missing_food_table_is_an_empty_index(client, usda_calls):
+    with app.app_context():
+        Food.__table__.drop(db.engine)
+
+    response = client.get("/autocomplete_food?q=chick")
+    assert response.status_code == 200
+    assert response.get_json()[0]["label"] == "Upstream Food"
+
+    response = client.post("/search_food", json={"query": "chick"})
+    assert response.status_code == 200
+
+    with app.app_context():
+        assert import_foods(str(FIXTURES / "fdc_foods.json")) == 8
+
+
+def test_workers_pick_up_a_new_import(client, usda_calls, monkeypatch):
+    with app.app_context():
+        assert len(get_food_index()) == 0
+        db.session.add(Food(id=1, name="Oats", calories=389, protein=16.9, carbs=66.3, fat=6.9))
+        db.session.commit()
+
+        monkeypatch.setitem(app.config, "FOOD_INDEX_REFRESH", 0)
+        assert get_food_index().get("oats")["calories"] == 389
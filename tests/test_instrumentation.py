@@ -0,0 +1,107 @@
+import pytest
+
+from app import app, db
+from app import utils
+from app.instrumentation import Metrics, RequestStats
+from app.models import User
+
+TOKEN = "scrape-secret"
+AUTH = {"Authorization": f"Bearer {TOKEN}"}
+
+
+@pytest.fixture
+def instrumented(client, monkeypatch):
+    monkeypatch.setitem(app.config, "METRICS_ENABLED", True)
+    monkeypatch.setitem(app.config, "METRICS_DEBUG_HEADER", True)
+    monkeypatch.setitem(app.config, "METRICS_TOKEN", TOKEN)
+    monkeypatch.setitem(app.config, "USDA_CACHE_PATH", "")
+    for key in ("metrics", "usda_cache"):
+        monkeypatch.delitem(app.extensions, key, raising=False)
+
+    with app.app_context():
+        user = User(
+            username="gauge", name="G", email="g@example.com",
+            age=30, weight=170, height=68, fitness_goal="balanced",
+        )
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user_id)
+    return client
+
+
+def test_debug_header_reports_queries(instrumented):
+    response = instrumented.get("/dashboard")
+
+    assert response.status_code == 200
+    assert int(response.headers["X-Query-Count"]) > 0
+    assert response.headers["Server-Timing"].startswith("db;dur=")
+
+
+def test_metrics_endpoint_aggregates_per_endpoint(instrumented, monkeypatch):
+    class FakeClient:
+        def search(self, query, page_size=5):
+            return {"foods": [{"description": "Egg", "foodNutrients": []}]}
+
+    monkeypatch.setattr(utils, "get_usda_client", lambda: FakeClient())
+
+    instrumented.get("/dashboard")
+    instrumented.get("/dashboard")
+    response = instrumented.post("/search_food", json={"query": "egg"})
+    assert "usda;dur=" in response.headers["Server-Timing"]
+
+    body = instrumented.get("/metrics", headers=AUTH).get_data(as_text=True)
+    assert 'app_requests_total{endpoint="user_dashboard"} 2' in body
+    assert 'app_sql_queries_total{endpoint="user_dashboard"}' in body
+    assert 'app_external_calls_total{endpoint="search_food",service="usda"} 1' in body
+    assert 'app_cache_misses_total{cache="usda"}' in body
+    assert "app_sql_slowest_statement_seconds{" in body
+
+
+def test_password_hashing_is_local_work_not_external_time(client, monkeypatch):
+    monkeypatch.setitem(app.config, "METRICS_ENABLED", True)
+    monkeypatch.setitem(app.config, "METRICS_TOKEN", TOKEN)
+    monkeypatch.delitem(app.extensions, "metrics", raising=False)
+    with app.app_context():
+        user = User(username="hasher", name="H", email="h@example.com")
+        user.set_password("secret")
+        db.session.add(user)
+        db.session.commit()
+
+    client.post("/login", data={"email": "hasher", "password": "secret"})
+    body = client.get("/metrics", headers=AUTH).get_data(as_text=True)
+    assert 'app_work_calls_total{endpoint="login",task="password_hash"} 1' in body
+    assert 'service="password_hash"' not in body
+
+
+def test_metrics_can_be_disabled(instrumented, monkeypatch):
+    monkeypatch.setitem(app.config, "METRICS_ENABLED", False)
+
+    response = instrumented.get("/dashboard")
+    assert "X-Query-Count" not in response.headers
+    assert instrumented.get("/metrics", headers=AUTH).status_code == 404
+
+
+def test_metrics_refuse_requests_without_the_token(instrumented, monkeypatch):
+    instrumented.get("/dashboard")
+    anonymous = app.test_client().get("/metrics")
+    assert anonymous.status_code == 401
+    assert "app_sql" not in anonymous.get_data(as_text=True)
+    wrong = {"Authorization": "Bearer guess"}
+    assert instrumented.get("/metrics", headers=wrong).status_code == 401
+
+    # No token configured: nobody gets in
+    monkeypatch.setitem(app.config, "METRICS_TOKEN", "")
+    assert instrumented.get("/metrics", headers=AUTH).status_code == 404
+
+
+def test_slowest_statements_are_bounded_and_escaped():
+    metrics = Metrics(slow_limit=2)
+    stats = RequestStats()
+    stats.statements = [(0.1, "SELECT 1"), (0.3, 'SELECT "x"'), (0.2, "SELECT 2")]
+    metrics.observe("view", stats, 0.5)
+
+    assert [s for _, _, s in metrics.slowest()] == ['SELECT "x"', "SELECT 2"]
+    assert 'statement="SELECT \\"x\\""' in metrics.render()
@@ -42,7 +42,7 @@ def test_log_meal_authorized(client):
         assert Meal.query.filter_by(user_id=user_id).count() == 1
 
     with app.test_request_context():
-        expected_location = url_for("user_dashboard", username=username)
+        expected_location = url_for("main.user_dashboard", username=username)
     assert response.headers["Location"].endswith(expected_location)
 
 
@@ -63,7 +63,7 @@ def test_log_meal_unauthorized_redirects_with_flash(client):
 
     assert response.status_code == 302
     with app.test_request_context():
-        expected_location = url_for("user_dashboard", username=intruder_username)
+        expected_location = url_for("main.user_dashboard", username=intruder_username)
     assert response.headers["Location"].endswith(expected_location)
 
     with client.session_transaction() as session:
@@ -0,0 +1,174 @@
+import re
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import app, create_app, db
+from app.cache import SQLiteCache
+from app.models import Meal, Recommendation, User, WeightLog
+from app.page_cache import PageCache, get_page_cache
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    # Every engine: GET requests read through the read-only one
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+
+
+@pytest.fixture
+def member(client):
+    with app.app_context():
+        user = User(
+            username="regular",
+            name="Regular",
+            email="regular@example.com",
+            age=30,
+            weight=180,
+            height=70,
+            fitness_goal="cutting",
+        )
+        db.session.add(user)
+        db.session.commit()
+        db.session.add(Meal(name="Oats", calories=300, protein=10, carbs=50, fats=5, user_id=user.id))
+        db.session.add(WeightLog(weight=180, date=datetime(2024, 1, 1), user_id=user.id))
+        db.session.add(
+            Recommendation(
+                user_id=user.id,
+                meal_rec="Tuna Salad",
+                workout_rec="HIIT",
+                timestamp=datetime.now(timezone.utc),
+            )
+        )
+        db.session.commit()
+        user_id = user.id
+
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user_id)
+    return client, user_id
+
+
+def page_stats():
+    with app.app_context():
+        return get_page_cache().stats()
+
+
+@pytest.mark.parametrize("url", ["/dashboard", "/progress"])
+def test_repeat_views_run_no_queries(member, url):
+    client, _ = member
+    first = client.get(url).get_data(as_text=True)
+
+    with count_queries() as statements:
+        second = client.get(url).get_data(as_text=True)
+    assert second == first
+    # Sections come from the page cache and the user from the user cache
+    assert statements == []
+
+
+def test_logging_a_meal_refreshes_the_dashboard_and_progress(member):
+    client, _ = member
+    client.get("/dashboard")
+    client.get("/progress")
+
+    client.post(
+        "/log_meal",
+        data={"name": "Burrito", "calories": 700, "protein": 30, "carbs": 80, "fats": 25},
+    )
+    assert "Burrito" in client.get("/dashboard").get_data(as_text=True)
+    assert "Total Meals Logged:</strong> 2" in client.get("/progress").get_data(as_text=True)
+
+    stats = page_stats()
+    assert stats["dashboard_recent"] == {"hits": 0, "misses": 2}
+    # Still cached: nothing it shows changed
+    assert stats["dashboard_recommendation"] == {"hits": 1, "misses": 1}
+
+
+def test_feedback_and_weights_invalidate_their_sections(member):
+    client, user_id = member
+    client.get("/dashboard")
+    client.get("/progress")
+
+    with app.app_context():
+        rec_id = Recommendation.query.filter_by(user_id=user_id).one().id
+    client.post(f"/recommendation_feedback/{rec_id}/followed")
+    assert re.search(r"<strong\s*>Followed</strong", client.get("/dashboard").get_data(as_text=True))
+
+    client.post("/log_weight", data={"weight": 175.5})
+    html = client.get("/progress").get_data(as_text=True)
+    assert "175.5" in html
+    assert page_stats()["progress_weights"] == {"hits": 0, "misses": 2}
+
+
+def test_recommendation_card_expires_when_it_goes_stale(member):
+    client, user_id = member
+    with app.app_context():
+        rec = Recommendation.query.filter_by(user_id=user_id).one()
+        rec.timestamp = datetime.now(timezone.utc) - timedelta(
+            seconds=app.config["RECOMMENDATION_STALE_AFTER"] - 1
+        )
+        db.session.commit()
+
+    client.get("/dashboard")
+    time.sleep(1.1)
+    client.get("/dashboard")
+    with app.app_context():
+        assert Recommendation.query.filter_by(user_id=user_id).count() == 2
+
+
+def test_sqlite_backend_invalidates_across_workers(tmp_path):
+    path = str(tmp_path / "pages.db")
+    worker_a = PageCache(SQLiteCache(path))
+    worker_b = PageCache(SQLiteCache(path))
+
+    assert worker_a.fragment("dashboard_recent", 1, lambda: "<p>one</p>") == "<p>one</p>"
+    assert worker_b.fragment("dashboard_recent", 1, lambda: "<p>two</p>") == "<p>one</p>"
+
+    worker_b.invalidate(1, "meals")
+    assert worker_a.fragment("dashboard_recent", 1, lambda: "<p>three</p>") == "<p>three</p>"
+    assert worker_a.stats()["dashboard_recent"] == {"hits": 0, "misses": 2}
+    assert worker_b.stats()["dashboard_recent"] == {"hits": 1, "misses": 0}
+
+
+def test_default_backend_reaches_every_worker(tmp_path):
+    settings = {
+        "TESTING": True,
+        "WTF_CSRF_ENABLED": False,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'app.db'}",
+        "PAGE_CACHE_PATH": str(tmp_path / "page_cache.db"),
+        "PASSWORD_HASH_WORKERS": 0,
+    }
+    workers = [create_app(settings) for _ in "ab"]
+    assert workers[0].config["PAGE_CACHE_BACKEND"] == "sqlite"
+    with workers[0].app_context():
+        db.create_all()
+        user = User(
+            username="shared", name="S", email="s@example.com",
+            age=30, weight=180, height=70, fitness_goal="cutting",
+        )
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    clients = [worker.test_client() for worker in workers]
+    for http in clients:
+        with http.session_transaction() as session:
+            session["_user_id"] = str(user_id)
+        assert "Burrito" not in http.get("/dashboard").get_data(as_text=True)
+
+    clients[0].post(
+        "/log_meal",
+        data={"name": "Burrito", "calories": 700, "protein": 30, "carbs": 80, "fats": 25},
+    )
+    assert "Burrito" in clients[1].get("/dashboard").get_data(as_text=True)
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import app, db
+from app.models import Recommendation, User, Workout
+from app.pagination import InvalidCursor, decode_cursor, encode_cursor
+
+
+@pytest.fixture
+def history(client):
+    """A logged-in user with 45 workouts, several sharing a timestamp."""
+    with app.app_context():
+        user = User(username="historian", name="H", email="h@example.com")
+        db.session.add(user)
+        db.session.commit()
+
+        start = datetime(2024, 1, 1)
+        db.session.add_all(
+            Workout(
+                type=f"W{i}",
+                duration=i,
+                calories_burned=i,
+                date=start + timedelta(days=i // 3),
+                user_id=user.id,
+            )
+            for i in range(45)
+        )
+        undated = Workout(type="Undated", user_id=user.id)
+        db.session.add(undated)
+        db.session.add_all(
+            Recommendation(
+                user_id=user.id,
+                meal_rec=f"M{i}",
+                workout_rec="Walk",
+                timestamp=start + timedelta(hours=i),
+            )
+            for i in range(7)
+        )
+        db.session.flush()
+        undated.date = None
+        db.session.commit()
+        user_id = user.id
+
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user_id)
+    return client
+
+
+def walk(client, url, limit):
+    seen, cursor = [], None
+    while True:
+        query = {"limit": limit}
+        if cursor:
+            query["cursor"] = cursor
+        page = client.get(url, query_string=query).get_json()
+        assert len(page["items"]) <= limit
+        seen.extend(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return seen
+
+
+def test_cursor_round_trip():
+    when = datetime(2024, 5, 6, 7, 8, 9, 123456)
+    assert decode_cursor(encode_cursor(when, 42)) == (when, 42)
+    assert decode_cursor(encode_cursor(None, 3)) == (None, 3)
+    with pytest.raises(InvalidCursor):
+        decode_cursor("not a cursor")
+
+
+@pytest.mark.parametrize("limit", [1, 4, 20, 100])
+def test_workout_pages_cover_history_once_in_order(history, limit):
+    items = walk(history, "/api/workouts", limit)
+
+    assert len(items) == 46
+    assert len({w["id"] for w in items}) == 46
+    dated = [(w["date"], w["id"]) for w in items[:-1]]
+    assert dated == sorted(dated, reverse=True)
+    assert items[-1]["type"] == "Undated"
+
+
+def test_recommendation_pages(history):
+    items = walk(history, "/api/recommendations", 3)
+    assert [r["meal_rec"] for r in items] == [f"M{i}" for i in reversed(range(7))]
+
+
+def test_bad_cursor_is_rejected(history):
+    response = history.get("/api/workouts?cursor=%%%")
+    assert response.status_code == 400
+
+
+def test_html_page_links_to_older_rows(history):
+    page = history.get("/previous_workouts?limit=10").get_data(as_text=True)
+    assert page.count("<tr>") == 11  # header + 10 rows
+    assert "cursor=" in page
+
+    export = history.get("/previous_workouts/export")
+    assert export.is_streamed
+    assert export.get_data(as_text=True).count("<tr>") == 47
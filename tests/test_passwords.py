@@ -0,0 +1,156 @@
+import threading
+import time
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from app import app, create_app, db
+from app.models import User
+from app.passwords import HashingBusy, HashPool, LoginThrottle
+
+
+@pytest.fixture
+def member(client):
+    with app.app_context():
+        user = User(username="member", name="Member", email="member@example.com")
+        # Parameters from an older release
+        user.password_hash = generate_password_hash("secret", "pbkdf2:sha256:600000")
+        db.session.add(user)
+        db.session.commit()
+    return client
+
+
+def login(client, identifier, password):
+    client.get("/logout")
+    return client.post("/login", data={"email": identifier, "password": password})
+
+
+def stored_hash():
+    with app.app_context():
+        return db.session.execute(db.select(User.password_hash)).scalar_one()
+
+
+def test_login_upgrades_old_hash_parameters(member):
+    assert login(member, "member", "secret").status_code == 302
+    assert stored_hash().startswith(app.config["PASSWORD_HASH_METHOD"] + "$")
+
+    upgraded = stored_hash()
+    assert login(member, "member@example.com", "secret").status_code == 302
+    assert stored_hash() == upgraded
+    assert login(member, "member", "wrong").status_code == 200
+
+
+def test_account_is_refused_after_repeated_failures(member):
+    for _ in range(app.config["LOGIN_MAX_FAILURES_PER_ACCOUNT"]):
+        assert login(member, "member", "wrong").status_code == 200
+
+    # Either identifier, even with the right password
+    for identifier in ("member", "member@example.com"):
+        response = login(member, identifier, "secret")
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) > 0
+        assert "Too many failed logins" in response.get_data(as_text=True)
+
+
+def test_ip_is_refused_after_failures_across_accounts(member, monkeypatch):
+    monkeypatch.setitem(app.config, "LOGIN_MAX_FAILURES_PER_IP", 3)
+    for name in ("alice", "bob", "carol"):
+        assert login(member, name, "guess").status_code == 200
+    assert login(member, "member", "secret").status_code == 429
+
+
+def test_login_answers_503_when_hashing_is_busy(member, monkeypatch):
+    class FullPool:
+        def run(self, fn, *args):
+            raise HashingBusy("full")
+
+    monkeypatch.setitem(app.config, "LOGIN_MAX_FAILURES_PER_ACCOUNT", 1)
+    monkeypatch.setitem(app.extensions, "hash_pool", FullPool())
+    response = login(member, "member", "secret")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+    # Not counted as a failed attempt
+    monkeypatch.delitem(app.extensions, "hash_pool")
+    assert login(member, "member", "secret").status_code == 302
+
+
+def test_throttle_window_slides():
+    now = [0.0]
+    throttle = LoginThrottle(
+        max_per_ip=0, max_per_account=2, window=60, clock=lambda: now[0]
+    )
+
+    throttle.failed("1.2.3.4", "user:1")
+    now[0] = 30
+    throttle.failed("1.2.3.4", "user:1")
+    assert throttle.retry_after("1.2.3.4", "user:1") == 30
+    assert throttle.retry_after("1.2.3.4", "user:2") == 0
+
+    now[0] = 61  # the first failure aged out
+    assert throttle.retry_after("1.2.3.4", "user:1") == 0
+    throttle.failed("1.2.3.4", "user:1")
+    assert throttle.retry_after("1.2.3.4", "user:1") == 29
+
+    throttle.succeeded("user:1")
+    assert throttle.retry_after("1.2.3.4", "user:1") == 0
+
+
+def test_pool_turns_away_work_past_its_limits():
+    pool = HashPool(workers=1, max_pending=1, timeout=0.2)
+    try:
+        with pytest.raises(HashingBusy):
+            pool.run(time.sleep, 1)  # late
+        # Still running in the pool, holding the only slot
+        with pytest.raises(HashingBusy):
+            pool.run(abs, -1)
+        # The slot comes back once the sleep finishes
+        deadline = time.monotonic() + 10
+        while True:
+            try:
+                assert pool.run(abs, -1) == 1
+                break
+            except HashingBusy:
+                assert time.monotonic() < deadline
+                time.sleep(0.1)
+    finally:
+        pool.shutdown()
+
+
+def test_register_and_login_hash_in_the_pool(tmp_path):
+    pooled = create_app(
+        {
+            "TESTING": True,
+            "WTF_CSRF_ENABLED": False,
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'app.db'}",
+            "PASSWORD_HASH_WORKERS": 1,
+        }
+    )
+    with pooled.app_context():
+        db.create_all()
+    client = pooled.test_client()
+    try:
+        response = client.post(
+            "/register",
+            data={
+                "username": "pooled", "name": "Pooled", "email": "pooled@example.com",
+                "password": "secret", "confirm": "secret", "age": 30,
+                "weight": 180, "height": 70, "fitness_goal": "cutting",
+            },
+        )
+        assert response.status_code == 302, response.get_data(as_text=True)
+        responses = []
+
+        def attempt():
+            data = {"email": "pooled", "password": "secret"}
+            responses.append(pooled.test_client().post("/login", data=data).status_code)
+
+        threads = [threading.Thread(target=attempt) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert responses == [302] * 4
+        assert "hash_pool" in pooled.extensions
+    finally:
+        pooled.extensions["hash_pool"].shutdown()
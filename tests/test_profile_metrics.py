@@ -0,0 +1,116 @@
+import itertools
+
+import pytest
+
+from app import app, db
+from app.models import User
+from app.profile_metrics import (
+    batch_profile_metrics,
+    compute_profile_metrics,
+    get_metrics_cache,
+    get_profile_metrics,
+    load_profile_metrics,
+)
+
+
+def legacy_tdee(weight, height, age, goal):
+    weight_kg = weight * 0.4536
+    height_cm = height * 2.54
+    bmr = 10 * weight_kg + 6.25 * height_cm - 5 * age + 5
+    multiplier = {"cutting": 1.4, "lean muscle": 1.6, "endurance": 1.7}.get(goal, 1.5)
+    return round(bmr * multiplier)
+
+
+PROFILES = list(
+    itertools.product(
+        [110.5, 150, 181.3, 240],
+        [60, 66.5, 74],
+        [19, 35, 70],
+        ["cutting", "lean muscle", "endurance", "balanced", None],
+    )
+)
+
+
+def test_tdee_matches_the_original_formula():
+    for profile in PROFILES:
+        assert compute_profile_metrics(*profile).tdee == legacy_tdee(*profile)
+
+    metrics = compute_profile_metrics(180, 70, 30, "cutting")
+    assert metrics.protein * 4 + metrics.carbs * 4 + metrics.fats * 9 == pytest.approx(
+        metrics.tdee, abs=10
+    )
+    with pytest.raises(TypeError):
+        compute_profile_metrics(None, 70, 30, "cutting")
+
+
+def test_batch_matches_one_at_a_time():
+    rows = [(i, *profile) for i, profile in enumerate(PROFILES)]
+    batch = batch_profile_metrics(rows)
+    assert batch == {i: compute_profile_metrics(*profile) for i, *profile in rows}
+    assert all(type(value) is int for value in batch[0])
+    assert batch_profile_metrics([]) == {}
+
+
+@pytest.fixture
+def profile(client):
+    with app.app_context():
+        user = User(
+            username="lifter",
+            name="L",
+            email="l@example.com",
+            age=30,
+            weight=180,
+            height=70,
+            fitness_goal="cutting",
+        )
+        incomplete = User(username="new", name="N", email="n@example.com")
+        db.session.add_all([user, incomplete])
+        db.session.commit()
+        user_id = user.id
+
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user_id)
+    return client, user_id
+
+
+def test_profile_version_tracks_metric_inputs(profile):
+    _, user_id = profile
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        assert user.profile_version == 1
+
+        user.name = "Renamed"
+        user.weight = 180.0
+        db.session.commit()
+        assert user.profile_version == 1
+
+        user.weight = 175
+        db.session.commit()
+        assert user.profile_version == 2
+
+        user.fitness_goal = "endurance"
+        user.age = 31
+        db.session.commit()
+        assert user.profile_version == 3
+
+
+def test_metrics_are_computed_once_per_version(profile):
+    client, user_id = profile
+    with app.app_context():
+        cache = get_metrics_cache()
+        user = db.session.get(User, user_id)
+        first = get_profile_metrics(user)
+        hits = cache.stats()["hits"]
+        assert get_profile_metrics(user) is first
+        assert cache.stats()["hits"] == hits + 1
+        assert load_profile_metrics([user_id, user_id + 1]) == {user_id: first}
+
+    client.post("/log_weight", data={"weight": 160})
+    html = client.get("/progress").get_data(as_text=True)
+
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        assert user.profile_version == 2
+        updated = get_profile_metrics(user)
+    assert updated.tdee == legacy_tdee(160, 70, 30, "cutting") != first.tdee
+    assert f"{updated.tdee} kcal/day" in html
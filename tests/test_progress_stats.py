@@ -0,0 +1,88 @@
+import random
+
+import pytest
+
+from app import app, db
+from app.models import Meal, User
+from app.utils import average_recent_macros, calculate_progress_stats
+
+
+def reference_progress_stats(meals):
+    """The original Python implementation of calculate_progress_stats."""
+    if not meals:
+        return None, 0, 0, 0
+
+    avg_macros = {
+        "calories": round(sum(m.calories for m in meals) / len(meals), 1),
+        "protein": round(sum(m.protein for m in meals) / len(meals), 1),
+        "carbs": round(sum(m.carbs for m in meals) / len(meals), 1),
+        "fats": round(sum(m.fats for m in meals) / len(meals), 1),
+    }
+    total_protein = sum(m.protein for m in meals)
+    total_carbs = sum(m.carbs for m in meals)
+    total_fats = sum(m.fats for m in meals)
+
+    return avg_macros, total_protein, total_carbs, total_fats
+
+
+def reference_recent_macros(meals, limit=3):
+    """The original Python implementation of average_recent_macros."""
+    recent_meals = sorted(meals, key=lambda m: m.id, reverse=True)[:limit]
+    if not recent_meals:
+        return None
+
+    avg = {
+        "calories": sum(m.calories for m in recent_meals) / len(recent_meals),
+        "protein": sum(m.protein for m in recent_meals) / len(recent_meals),
+        "carbs": sum(m.carbs for m in recent_meals) / len(recent_meals),
+        "fats": sum(m.fats for m in recent_meals) / len(recent_meals),
+    }
+    return {k: round(v, 1) for k, v in avg.items()}
+
+
+def assert_macros_match(actual, expected):
+    if expected is None:
+        assert actual is None
+        return
+    # SQLite may sum in a different order; allow one rounding step of drift
+    assert actual == pytest.approx(expected, abs=0.1)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_sql_aggregates_match_python_reference(client, seed):
+    rng = random.Random(seed)
+
+    with app.app_context():
+        users = [User(username=f"u{seed}-{i}", name="U") for i in range(4)]
+        db.session.add_all(users)
+        db.session.commit()
+
+        for user in users[1:]:
+            for _ in range(rng.randint(1, 60)):
+                db.session.add(
+                    Meal(
+                        name="Meal",
+                        calories=round(rng.uniform(50, 1500), rng.choice([0, 1, 2])),
+                        protein=round(rng.uniform(0, 90), 1),
+                        carbs=round(rng.uniform(0, 150), 1),
+                        fats=round(rng.uniform(0, 70), 2),
+                        user_id=user.id,
+                    )
+                )
+        db.session.commit()
+
+        for user in users:
+            meals = Meal.query.filter_by(user_id=user.id).all()
+
+            avg, protein, carbs, fats = calculate_progress_stats(user)
+            ref_avg, ref_protein, ref_carbs, ref_fats = reference_progress_stats(meals)
+            assert_macros_match(avg, ref_avg)
+            assert (protein, carbs, fats) == pytest.approx(
+                (ref_protein, ref_carbs, ref_fats), rel=1e-9
+            )
+
+            for limit in (1, 3, 10):
+                assert_macros_match(
+                    average_recent_macros(user.id, limit),
+                    reference_recent_macros(meals, limit),
+                )
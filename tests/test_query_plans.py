@@ -0,0 +1,118 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine, func, inspect, select, text
+
+from app import app, db
+from app.migrations import add_missing_columns, upgrade_schema
+from app.models import Meal, Recommendation, WeightLog, Workout
+
+# The per-user queries behind /dashboard, /progress, /previous_workouts,
+# /recommendations and generate_recommendation
+HOT_QUERIES = {
+    "dashboard workouts": select(Workout).where(Workout.user_id == 1),
+    "previous workouts": select(Workout)
+    .where(Workout.user_id == 1)
+    .order_by(Workout.date.desc()),
+    "workout page": select(Workout)
+    .where(Workout.user_id == 1)
+    .order_by(Workout.date.desc(), Workout.id.desc())
+    .limit(21),
+    "recommendation page": select(Recommendation)
+    .where(Recommendation.user_id == 1)
+    .order_by(Recommendation.timestamp.desc(), Recommendation.id.desc())
+    .limit(21),
+    "dashboard meals": select(Meal).where(Meal.user_id == 1),
+    "recent meals": select(Meal)
+    .where(Meal.user_id == 1)
+    .order_by(Meal.id.desc())
+    .limit(3),
+    "latest recommendation": select(Recommendation)
+    .where(Recommendation.user_id == 1)
+    .order_by(Recommendation.timestamp.desc())
+    .limit(1),
+    "meal feedback": select(
+        Recommendation.meal_rec, Recommendation.followed, func.count()
+    )
+    .where(Recommendation.user_id == 1, Recommendation.followed.is_not(None))
+    .group_by(Recommendation.meal_rec, Recommendation.followed),
+    "workout feedback": select(
+        Recommendation.workout_rec, Recommendation.followed, func.count()
+    )
+    .where(Recommendation.user_id == 1, Recommendation.followed.is_not(None))
+    .group_by(Recommendation.workout_rec, Recommendation.followed),
+    "weight history": select(WeightLog)
+    .where(WeightLog.user_id == 1)
+    .order_by(WeightLog.date.asc()),
+    "weight count": select(func.count()).select_from(WeightLog).where(
+        WeightLog.user_id == 1
+    ),
+}
+
+
+def query_plan(statement):
+    compiled = statement.compile(
+        dialect=db.engine.dialect, compile_kwargs={"literal_binds": True}
+    )
+    rows = db.session.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+    return [row[-1] for row in rows]
+
+
+@pytest.mark.parametrize("name", HOT_QUERIES)
+def test_hot_query_uses_an_index(client, name):
+    with app.app_context():
+        plan = query_plan(HOT_QUERIES[name])
+
+    searches = [step for step in plan if step.startswith(("SEARCH", "SCAN"))]
+    assert searches, plan
+    for step in searches:
+        assert "USING" in step and "INDEX" in step, f"{name}: {plan}"
+    assert not any("TEMP B-TREE FOR ORDER BY" in step for step in plan), plan
+
+
+def test_upgrade_adds_indexes_to_existing_database(tmp_path):
+    path = tmp_path / "old.db"
+    with sqlite3.connect(path) as conn:
+        conn.executescript(
+            """
+            CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR(32));
+            CREATE TABLE workouts (id INTEGER PRIMARY KEY, type VARCHAR(50),
+                duration INTEGER, calories_burned INTEGER, date DATETIME,
+                user_id INTEGER);
+            INSERT INTO workouts (type, user_id) VALUES ('HIIT', 1);
+            """
+        )
+    engine = create_engine(f"sqlite:///{path}")
+
+    created = upgrade_schema(engine)
+
+    assert created == ["ix_workouts_user_date"]
+    assert "ix_ai_recommendations_user_followed_meal" in {
+        ix["name"] for ix in inspect(engine).get_indexes("ai_recommendations")
+    }
+    assert {ix["name"] for ix in inspect(engine).get_indexes("workouts")} == {
+        "ix_workouts_user_date"
+    }
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM workouts")).scalar() == 1
+    assert upgrade_schema(engine) == []
+
+
+def test_upgrade_adds_missing_columns(tmp_path):
+    path = tmp_path / "old.db"
+    with sqlite3.connect(path) as conn:
+        conn.executescript(
+            """
+            CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR(32),
+                name VARCHAR(64), email VARCHAR(120), age INTEGER, weight FLOAT,
+                height FLOAT, fitness_goal VARCHAR(120),
+                password_hash VARCHAR(128));
+            INSERT INTO users (username) VALUES ('early');
+            """
+        )
+    engine = create_engine(f"sqlite:///{path}")
+
+    assert add_missing_columns(engine) == ["users.profile_version"]
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT profile_version FROM users")).scalar() == 1
+    assert add_missing_columns(engine) == []
@@ -0,0 +1,105 @@
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.exc import OperationalError
+
+from app import create_app, db
+from app.database import get_read_engine
+from app.models import User, Workout
+
+SETTINGS = {"TESTING": True, "WTF_CSRF_ENABLED": False}
+
+
+def make_app(path, **overrides):
+    return create_app(
+        {**SETTINGS, "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}", **overrides}
+    )
+
+
+def seed(app, duration):
+    """The same user in each database, with one workout telling them apart."""
+    with app.app_context():
+        db.create_all()
+        user = User(username="router", name="R", email="r@example.com")
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(
+            Workout(
+                type="Cardio", duration=duration, calories_burned=100, user_id=user.id
+            )
+        )
+        db.session.commit()
+        return user.id
+
+
+@pytest.fixture
+def routed(tmp_path):
+    """An app whose reads go to a second SQLite file standing in for a replica."""
+    seed(make_app(tmp_path / "replica.db"), duration=11)
+    replica = f"sqlite:///{tmp_path / 'replica.db'}"
+    app = make_app(tmp_path / "primary.db", DATABASE_READ_URL=replica)
+    user_id = seed(app, duration=22)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user_id)
+    return app, client
+
+
+def durations(app):
+    with app.app_context():
+        statement = select(Workout.duration).order_by(Workout.id)
+        return db.session.execute(statement).scalars().all()
+
+
+def test_get_reads_from_the_replica_and_posts_write_to_the_primary(routed):
+    app, client = routed
+    items = client.get("/api/workouts").get_json()["items"]
+    assert [w["duration"] for w in items] == [11]
+
+    response = client.post(
+        "/log_workout", data={"type": "HIIT", "duration": 33, "calories_burned": 300}
+    )
+    assert response.status_code == 302
+    # Outside a request everything uses the primary
+    assert durations(app) == [22, 33]
+    # The replica has not caught up (it never will here)
+    items = client.get("/api/workouts").get_json()["items"]
+    assert [w["duration"] for w in items] == [11]
+
+
+def test_reads_after_a_write_in_a_get_stay_on_the_primary(routed):
+    app, _ = routed
+    with app.test_request_context("/dashboard"):
+        replica = get_read_engine()
+        assert db.session.get_bind() is replica
+        assert db.session.execute(select(Workout.duration)).scalars().all() == [11]
+
+        db.session.add(
+            Workout(type="Other", duration=44, calories_burned=1, user_id=1)
+        )
+        rows = db.session.execute(select(Workout.duration)).scalars().all()
+        # Autoflushed to the primary, then read back from it
+        assert sorted(rows) == [22, 44]
+        assert db.session.get_bind() is db.engine
+        db.session.rollback()
+
+    with app.test_request_context("/log_weight", method="POST"):
+        assert db.session.get_bind() is db.engine
+
+
+def test_sqlite_file_is_read_through_a_read_only_connection(tmp_path):
+    app = make_app(tmp_path / "app.db")
+    seed(app, duration=5)
+    with app.test_request_context("/progress"):
+        engine = get_read_engine()
+        assert engine.url.query["mode"] == "ro"
+        assert db.session.execute(select(Workout.duration)).scalars().all() == [5]
+        with engine.connect() as connection:
+            with pytest.raises(OperationalError, match="readonly"):
+                connection.execute(text("DELETE FROM workouts"))
+
+
+def test_routing_can_be_turned_off(tmp_path):
+    app = make_app(tmp_path / "app.db", READ_ROUTING=False)
+    with app.test_request_context("/progress"):
+        assert get_read_engine() is None
+        assert db.session.get_bind() is db.engine
@@ -0,0 +1,111 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event, func, select
+
+from app import app, db
+from app.models import Meal, Recommendation, User, WeightLog
+from app.recommendation_batch import (
+    generate_recommendations,
+    generate_recommendations_parallel,
+    load_batch_inputs,
+)
+from app.recommendations import RecommendationContext
+from app.utils import analyze_weight_trend, average_recent_macros, estimate_tdee
+
+GOALS = ["cutting", "lean muscle", "endurance", "balanced"]
+
+
+@pytest.fixture
+def population(client):
+    rng = random.Random(3)
+    with app.app_context():
+        users = [
+            User(
+                username=f"batch{i}",
+                name="B",
+                age=rng.randint(18, 70),
+                weight=rng.randint(120, 250),
+                height=rng.randint(58, 78),
+                fitness_goal=rng.choice(GOALS),
+            )
+            for i in range(30)
+        ]
+        users.append(User(username="no-profile", name="N"))
+        db.session.add_all(users)
+        db.session.commit()
+
+        old = datetime.now(timezone.utc) - timedelta(days=30)
+        for user in users:
+            for day in range(rng.randint(0, 6)):
+                db.session.add(
+                    WeightLog(user_id=user.id, weight=rng.uniform(150, 200), date=old + timedelta(days=day * rng.randint(0, 3)))
+                )
+            for _ in range(rng.randint(0, 5)):
+                db.session.add(
+                    Meal(name="M", calories=rng.randint(100, 900), protein=rng.randint(0, 60), carbs=30, fats=10, user_id=user.id)
+                )
+            for i in range(rng.randint(0, 6)):
+                db.session.add(
+                    Recommendation(
+                        user_id=user.id,
+                        meal_rec=rng.choice(["Turkey Lettuce Wraps", "Salmon + Sweet Potato"]),
+                        workout_rec=rng.choice(["30 min HIIT", "Kickboxing"]),
+                        followed=rng.choice([None, "followed", "skipped"]),
+                        timestamp=old + timedelta(hours=i),
+                    )
+                )
+        # One user is already fresh
+        db.session.add(Recommendation(user_id=users[0].id, meal_rec="Fresh", workout_rec="Fresh"))
+        db.session.commit()
+        return [u.id for u in users]
+
+
+def test_batch_inputs_match_per_user_queries(population):
+    with app.test_request_context():
+        inputs = load_batch_inputs(population)
+
+        for user_id in population[:-1]:
+            user = db.session.get(User, user_id)
+            data = inputs[user_id]
+            context = RecommendationContext.load(user_id)
+            assert data["trend"] == analyze_weight_trend(user_id)
+            assert data["macros"] == average_recent_macros(user_id)
+            assert data["tdee"] == estimate_tdee(user)
+            assert data["recent"] == [(r.meal_rec, r.workout_rec) for r in context.recent]
+            batch_context = RecommendationContext(
+                user_id, [], data["meal_feedback"], data["workout_feedback"]
+            )
+            assert batch_context.feedback_stats() == context.feedback_stats()
+
+
+def test_generates_once_per_stale_user_with_constant_queries(population):
+    statements = []
+
+    def record(*args):
+        statements.append(args[2])
+
+    with app.app_context():
+        before = db.session.scalar(select(func.count()).select_from(Recommendation))
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            count = generate_recommendations(stale_after=3600, batch_size=1000)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+
+        # Everyone except the fresh user and the one without a profile
+        assert count == len(population) - 2
+        after = db.session.scalar(select(func.count()).select_from(Recommendation))
+        assert after == before + count
+        # Stale-user lookup, six input queries, the insert, the empty last page
+        assert len(statements) <= 10
+
+        assert generate_recommendations(stale_after=3600) == 0
+
+
+def test_parallel_shards_cover_every_user_once(population):
+    with app.app_context():
+        count = generate_recommendations_parallel(stale_after=3600, batch_size=7, workers=3)
+        assert count == len(population) - 2
+        assert generate_recommendations(stale_after=3600) == 0
@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+from app.recommendation_catalog import CATALOG, compile_catalog, select_recommendation
+from benchmarks.legacy_recommendation import legacy_recommendation
+
+GOALS = ["cutting", "lean muscle", "endurance", "balanced", None, "powerlifting"]
+# Band edges plus values inside every band
+RATES = [-3, -2, -1.5, -0.2, -0.1, 0, 0.05, 0.1, 0.15, 0.2, 0.3, 0.5, 0.9, 1, 1.5, 3]
+ALL_MEALS = sorted({m for meals, _ in CATALOG.options.values() for m in meals.items})
+ALL_WORKOUTS = sorted({w for _, ws in CATALOG.options.values() for w in ws.items})
+
+
+def random_inputs(rng):
+    goal = rng.choice(GOALS)
+    trend = None
+    if rng.random() < 0.8:
+        rate = rng.choice(RATES) if rng.random() < 0.7 else rng.uniform(-4, 4)
+        trend = {"rate_per_week": rate, "since": "Jan 01"}
+    recent = [(rng.choice(ALL_MEALS), rng.choice(ALL_WORKOUTS)) for _ in range(rng.randint(0, 3))]
+    # At most one followed item each: the old code listed a set, whose order
+    # is not reproducible
+    feedback = (
+        set(rng.sample(ALL_MEALS, rng.randint(0, 1))),
+        set(rng.sample(ALL_MEALS, rng.randint(0, 4))),
+        set(rng.sample(ALL_WORKOUTS, rng.randint(0, 1))),
+        set(rng.sample(ALL_WORKOUTS, rng.randint(0, 4))),
+    )
+    macros = None
+    if rng.random() < 0.8:
+        macros = {
+            "calories": rng.uniform(800, 3500),
+            "protein": rng.uniform(5, 60),
+            "carbs": rng.uniform(20, 300),
+            "fats": rng.uniform(10, 120),
+        }
+    tdee = rng.randint(1500, 3200)
+    return goal, trend, recent, feedback, tdee, macros
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_legacy_rules_for_a_fixed_seed(seed):
+    rng = random.Random(seed)
+    for _ in range(200):
+        goal, trend, recent, feedback, tdee, macros = random_inputs(rng)
+        pick_seed = rng.random()
+
+        expected = legacy_recommendation(
+            goal, trend, recent, feedback, tdee, macros, random.Random(pick_seed)
+        )
+        actual = select_recommendation(
+            goal, trend, recent, feedback, tdee, macros, rng=random.Random(pick_seed)
+        )
+        assert actual == expected, (goal, trend, recent, feedback, tdee, macros)
+
+
+def test_falls_back_to_feedback_ranked_options_when_all_were_recent():
+    catalog = compile_catalog(
+        {"balanced": {"meals": ("A", "B"), "workouts": ("X",), "trends": ()}},
+        (),
+        "balanced",
+    )
+    feedback = ({"F"}, {"B"}, set(), set())
+    picks = {
+        select_recommendation(
+            "balanced",
+            recent=[("A", "X"), ("B", "X")],
+            feedback=feedback,
+            rng=random.Random(seed),
+            catalog=catalog,
+        )[:2]
+        for seed in range(50)
+    }
+    assert {meal for meal, _ in picks} == {"F", "A"}
+    assert {workout for _, workout in picks} == {"X"}
+
+
+def test_catalog_is_immutable_tuples_and_frozensets():
+    for meals, workouts in CATALOG.options.values():
+        assert isinstance(meals.items, tuple) and isinstance(meals.members, frozenset)
+        assert isinstance(workouts.items, tuple)
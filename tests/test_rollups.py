@@ -0,0 +1,91 @@
+import random
+
+import pytest
+
+from app import app, db
+from app.models import Meal, User, UserRollup, Workout
+from app.rollups import check_rollups, rebuild_rollups
+
+
+def make_users(*names):
+    users = [User(username=name, name="U") for name in names]
+    db.session.add_all(users)
+    db.session.commit()
+    return users
+
+
+def test_inserts_edits_and_deletes_keep_rollups_exact(client):
+    rng = random.Random(7)
+
+    with app.app_context():
+        users = make_users("roll-a", "roll-b")
+        rows = []
+        for _ in range(200):
+            user = rng.choice(users)
+            if rows and rng.random() < 0.3:
+                row = rows.pop(rng.randrange(len(rows)))
+                db.session.delete(row)
+            elif rows and rng.random() < 0.3:
+                row = rng.choice(rows)
+                if isinstance(row, Meal):
+                    row.protein = round(rng.uniform(0, 80), 1)
+                else:
+                    row.duration = rng.randint(5, 120)
+                row.user_id = rng.choice(users).id
+            elif rng.random() < 0.5:
+                row = Meal(
+                    name="Meal",
+                    calories=rng.randint(50, 1200),
+                    protein=round(rng.uniform(0, 80), 1),
+                    carbs=round(rng.uniform(0, 150), 1),
+                    fats=round(rng.uniform(0, 60), 1),
+                    user_id=user.id,
+                )
+                db.session.add(row)
+                rows.append(row)
+            else:
+                row = Workout(
+                    type="Run",
+                    duration=rng.randint(5, 120),
+                    calories_burned=rng.randint(50, 900),
+                    user_id=user.id,
+                )
+                db.session.add(row)
+                rows.append(row)
+            db.session.commit()
+
+        assert check_rollups() == []
+        for user in users:
+            rollup = db.session.get(UserRollup, user.id)
+            meals = Meal.query.filter_by(user_id=user.id).all()
+            assert rollup.meal_count == len(meals)
+            assert rollup.protein == pytest.approx(sum(m.protein for m in meals))
+
+
+def test_rollup_is_seeded_from_rows_written_before_it_existed(client):
+    with app.app_context():
+        (user,) = make_users("roll-legacy")
+        db.session.add(Meal(name="Old", calories=500, protein=30, carbs=40, fats=10, user_id=user.id))
+        db.session.commit()
+        db.session.delete(db.session.get(UserRollup, user.id))
+        db.session.commit()
+
+        db.session.add(Meal(name="New", calories=300, protein=20, carbs=10, fats=5, user_id=user.id))
+        db.session.commit()
+
+        rollup = db.session.get(UserRollup, user.id)
+        assert (rollup.meal_count, rollup.calories) == (2, 800)
+
+
+def test_checker_reports_drift_and_rebuild_repairs_it(client):
+    with app.app_context():
+        (user,) = make_users("roll-drift")
+        db.session.add(Workout(type="Swim", duration=30, calories_burned=300, user_id=user.id))
+        db.session.commit()
+
+        db.session.get(UserRollup, user.id).workout_minutes = 999
+        db.session.commit()
+        assert (user.id, "workout_minutes", 999, 30) in check_rollups()
+
+        rebuild_rollups()
+        assert check_rollups() == []
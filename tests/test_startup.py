@@ -0,0 +1,69 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+# Budgets for a cold start in a fresh interpreter. Flask, SQLAlchemy and
+# WTForms alone account for about 0.55s and 480 modules.
+MAX_SECONDS = 2.0
+MAX_MODULES = 600
+# Loaded on first use, never at startup
+DEFERRED = ("numpy", "requests", "urllib3", "app.trends", "app.synthetic")
+
+PROFILE = """
+import json, sys, time
+start = time.perf_counter()
+{body}
+print(json.dumps({{
+    "seconds": time.perf_counter() - start,
+    "modules": len(sys.modules),
+    "loaded": [name for name in {deferred!r} if name in sys.modules],
+}}))
+"""
+
+CASES = {
+    # What `flask <command>` and every web worker do before anything else
+    "create_app": "from app import create_app\ncreate_app()",
+    # A process-pool worker of generate-recommendations or export-all
+    "pool_worker": (
+        "from app.sharding import _init_worker\n"
+        "_init_worker({'SQLALCHEMY_DATABASE_URI': 'sqlite://'})"
+    ),
+}
+
+
+def profile(body):
+    code = PROFILE.format(body=body, deferred=DEFERRED)
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        timeout=60,
+        check=True,
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_cold_start_stays_within_budget(case):
+    stats = profile(CASES[case])
+    assert stats["loaded"] == []
+    assert stats["modules"] <= MAX_MODULES
+    assert stats["seconds"] <= MAX_SECONDS
+
+
+def test_cli_commands_are_registered():
+    result = subprocess.run(
+        [sys.executable, "-m", "flask", "--app", "run", "--help"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        timeout=60,
+        check=True,
+    )
+    for command in ("upgrade-db", "generate-data", "export-all"):
+        assert command in result.stdout
@@ -0,0 +1,90 @@
+from datetime import datetime
+
+from sqlalchemy import select
+
+from app import app, db
+from app.models import Meal, Recommendation, User, WeightLog, Workout
+from app.rollups import check_rollups
+from app.synthetic import generate_data
+
+END = datetime(2024, 6, 1)
+KINDS = {
+    "workouts": Workout,
+    "meals": Meal,
+    "weights": WeightLog,
+    "recommendations": Recommendation,
+}
+
+
+def snapshot():
+    # Password hashes are salted, so they differ between runs by design
+    users = select(*(c for c in User.__table__.c if c.name != "password_hash"))
+    tables = {"users": db.session.execute(users.order_by(User.id)).all()}
+    for name, model in KINDS.items():
+        tables[name] = db.session.execute(
+            select(model.__table__).order_by(model.id)
+        ).all()
+    return tables
+
+
+def regenerate(**kwargs):
+    db.drop_all()
+    db.create_all()
+    counts = generate_data(users=6, days=30, seed=7, end=END, **kwargs)
+    return counts, snapshot()
+
+
+def test_same_seed_gives_the_same_rows(client):
+    with app.app_context():
+        counts, first = regenerate()
+        # Chunking only changes how rows are committed, not which rows
+        _, second = regenerate(chunk_users=4)
+        assert first == second
+        assert counts == {name: len(rows) for name, rows in first.items()}
+
+        db.drop_all()
+        db.create_all()
+        generate_data(users=6, days=30, seed=8, end=END)
+        assert snapshot() != first
+
+
+def test_rows_follow_the_parameters(client):
+    with app.app_context():
+        counts = generate_data(
+            users=20,
+            days=60,
+            meals_per_day=2,
+            workouts_per_day=0.5,
+            weigh_ins_per_week=7,
+            recommendations_per_week=7,
+            followed_ratio=1,
+            skipped_ratio=0,
+            end=END,
+        )
+        assert counts["users"] == 20
+        assert 2000 < counts["meals"] < 2800
+        assert 450 < counts["workouts"] < 750
+        assert 1000 < counts["weights"] < 1400
+        assert {r.followed for r in Recommendation.query} == {"followed"}
+        assert all(w.date < END for w in WeightLog.query)
+        assert check_rollups() == []
+
+        # The profile weight is the latest weigh-in, as after logging one
+        user = User.query.first()
+        latest = (
+            WeightLog.query.filter_by(user_id=user.id)
+            .order_by(WeightLog.date.desc())
+            .first()
+        )
+        assert user.weight == latest.weight
+
+
+def test_generated_users_can_sign_in(client):
+    with app.app_context():
+        generate_data(users=2, days=3, end=END)
+        username = User.query.first().username
+
+    response = client.post(
+        "/login", data={"email": username, "password": "password"}
+    )
+    assert response.status_code == 302
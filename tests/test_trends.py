@@ -0,0 +1,131 @@
+import math
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app import app, db, trends
+from app.models import User, WeightLog
+from app.trends import (
+    ewma,
+    fetch_weight_columns,
+    last_rolling_rates,
+    summarize_trends,
+    weight_trends,
+)
+from app.utils import analyze_weight_trend
+
+
+def reference_ewma(days, weights, halflife=7):
+    tau = halflife / math.log(2)
+    out = []
+    for k in range(len(days)):
+        w = [math.exp((days[i] - days[k]) / tau) for i in range(k + 1)]
+        out.append(sum(wi * y for wi, y in zip(w, weights)) / sum(w))
+    return out
+
+
+def random_series(rng, n):
+    days = np.cumsum([rng.uniform(0.2, 5) for _ in range(n)]) + 19000
+    weights = np.array([180 + rng.gauss(0, 2) - 0.1 * i for i in range(n)])
+    return days, weights
+
+
+def test_ewma_matches_direct_definition():
+    rng = random.Random(1)
+    days, weights = random_series(rng, 60)
+    assert ewma(days, weights) == pytest.approx(reference_ewma(days, weights))
+
+
+def test_ewma_survives_very_long_histories():
+    days = np.arange(0, 40 * 365, 1.0)  # far beyond exp() range in one pass
+    weights = 200 - days / 1000
+    smoothed = ewma(days, weights)
+    assert np.isfinite(smoothed).all()
+    # Once warmed up, a daily linear series leads its EWMA by slope * r / (1 - r)
+    r = math.exp(-math.log(2) / 7)
+    lag = (1 / 1000) * r / (1 - r)
+    assert smoothed[-1] == pytest.approx(weights[-1] + lag, rel=1e-6)
+
+
+def test_rolling_rate_matches_brute_force():
+    rng = random.Random(2)
+    days, weights = random_series(rng, 80)
+    for k in range(len(days)):
+        rate = last_rolling_rates(np.array([0]), days[: k + 1], weights[: k + 1])[0]
+        j = min(i for i in range(k + 1) if days[i] >= days[k] - 7)
+        if days[k] > days[j]:
+            assert rate == pytest.approx((weights[k] - weights[j]) / (days[k] - days[j]) * 7)
+        else:
+            assert math.isnan(rate)
+
+
+def test_batch_summaries_match_single_user_math():
+    rng = random.Random(3)
+    users, days, weights = [], [], []
+    for user_id in range(1, 40):
+        n = rng.choice([0, 1, 2, 5, 30])
+        d, w = random_series(rng, n)
+        users += [user_id] * n
+        days += list(d)
+        weights += list(w)
+    users, days, weights = np.array(users), np.array(days), np.array(weights)
+
+    trends = summarize_trends(users, days, weights)
+    for user_id in set(users.tolist()):
+        mask = users == user_id
+        if mask.sum() < 2 or np.ptp(days[mask]) < 1:
+            assert user_id not in trends
+            continue
+        slope = np.polyfit(days[mask], weights[mask], 1)[0]
+        trend = trends[user_id]
+        assert trend["rate_per_week"] == pytest.approx(round(slope * 7, 2), abs=0.011)
+        assert trend["ewma"] == pytest.approx(reference_ewma(days[mask], weights[mask])[-1], abs=0.051)
+        single = summarize_trends(users[mask], days[mask], weights[mask])
+        assert single[user_id] == trend
+
+
+def test_analyze_weight_trend_reads_one_columnar_query(client):
+    start = datetime(2024, 3, 1)
+    with app.app_context():
+        user = User(username="trendy", name="T")
+        same_day = User(username="sameday", name="S")
+        db.session.add_all([user, same_day])
+        db.session.commit()
+        for i, weight in enumerate([200, 199, 199.5, 198, 197.5]):
+            db.session.add(WeightLog(user_id=user.id, weight=weight, date=start + timedelta(days=3 * i)))
+        for hour in (1, 5):
+            db.session.add(WeightLog(user_id=same_day.id, weight=150, date=start + timedelta(hours=hour)))
+        db.session.commit()
+
+        trend = analyze_weight_trend(user.id)
+        assert trend["since"] == "Mar 01"
+        assert trend["change"] == -2.5
+        assert trend["rate_per_week"] == pytest.approx(-1.4)
+        assert analyze_weight_trend(same_day.id) is None
+
+        users, days, weights = fetch_weight_columns()
+        assert weight_trends()[user.id] == trend
+        assert len(users) == len(days) == len(weights) == 7
+        assert days[0] == (start - datetime(1970, 1, 1)).days
+        assert days[1] - days[0] == pytest.approx(3)
+
+
+def test_days_are_computed_in_numpy_without_a_sql_expression(client, monkeypatch):
+    start = datetime(2024, 3, 1, 7, 30)
+    with app.app_context():
+        user = User(username="portable", name="P")
+        db.session.add(user)
+        db.session.commit()
+        for i in range(4):
+            date = start + timedelta(days=2 * i, hours=i)
+            db.session.add(WeightLog(user_id=user.id, weight=180 - i, date=date))
+        db.session.commit()
+
+        in_sql = fetch_weight_columns()
+        # As on a database without a day expression (not SQLite or PostgreSQL)
+        monkeypatch.setattr(trends, "_sql_days", lambda dialect: None)
+        in_numpy = fetch_weight_columns()
+    for sql_column, numpy_column in zip(in_sql, in_numpy):
+        assert numpy_column == pytest.approx(sql_column, abs=1e-6)
@@ -0,0 +1,115 @@
+import threading
+
+import pytest
+
+from app import app
+from app import utils
+from app.cache import LRUCache, SQLiteCache, TieredCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def usda_calls(monkeypatch, tmp_path):
+    calls = []
+
+    def fake_fetch(query, max_results=5):
+        calls.append((query, max_results))
+        return [
+            {"name": f"{query.title()} {i}", "calories": 100 + i, "protein": 10,
+             "carbs": 5, "fat": 2}
+            for i in range(max_results)
+        ]
+
+    monkeypatch.setattr(utils, "fetch_usda_food", fake_fetch)
+    monkeypatch.setitem(app.config, "USDA_CACHE_PATH", str(tmp_path / "usda.db"))
+    app.extensions.pop("usda_cache", None)
+    app.extensions.pop("food_index", None)
+    yield calls
+    app.extensions.pop("usda_cache", None)
+    app.extensions.pop("food_index", None)
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lru_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = LRUCache(maxsize=10, ttl=30, clock=clock)
+    cache.set("chick", ["chicken"])
+    clock.now += 29
+    assert cache.get("chick") == ["chicken"]
+    clock.now += 2
+    assert cache.get("chick") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_sqlite_tier_survives_new_instance(tmp_path):
+    path = str(tmp_path / "shared.db")
+    SQLiteCache(path, ttl=60).set("search:5:egg", [{"name": "Egg"}])
+
+    other = TieredCache(LRUCache(), SQLiteCache(path, ttl=60))
+    assert other.get("search:5:egg") == [{"name": "Egg"}]
+    # Promoted to memory, so the second read never touches disk
+    assert other.get("search:5:egg") == [{"name": "Egg"}]
+    assert other.stats()["memory"]["hits"] == 1
+    assert other.stats()["disk"]["hits"] == 1
+
+
+def test_search_is_cached_on_normalized_query(usda_calls):
+    with app.app_context():
+        first = utils.search_usda_food("Chick", max_results=10)
+        second = utils.search_usda_food("  chick ", max_results=10)
+        utils.search_usda_food("chick", max_results=5)
+
+        assert first == second
+        assert usda_calls == [("chick", 10), ("chick", 5)]
+        stats = utils.get_food_cache().stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 2
+
+
+def test_search_food_reuses_autocomplete_results(client, usda_calls):
+    response = client.get("/autocomplete_food?q=chick")
+    picked = response.get_json()[3]["label"]
+
+    response = client.post("/search_food", json={"query": picked})
+
+    assert response.status_code == 200
+    assert response.get_json()["name"] == picked
+    assert usda_calls == [("chick", 10)]
+
+
+def test_sqlite_counters_are_exact_under_threads(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "threads.db"), ttl=60)
+    cache.set("hit", 1)
+
+    def worker():
+        for _ in range(200):
+            cache.get("hit")
+            cache.get("miss")
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert cache.stats()["hits"] == 1600
+    assert cache.stats()["misses"] == 1600
@@ -0,0 +1,144 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.usda import CircuitBreaker, UpstreamUnavailable, USDAClient
+
+
+class StubUSDA(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.ports.add(self.client_address[1])
+            status = server.statuses.pop(0) if server.statuses else 200
+        time.sleep(server.delay)
+
+        body = server.body or json.dumps(
+            {"foods": [{"description": "Egg, whole, raw", "foodNutrients": []}]}
+        ).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if server.retry_after:
+            self.send_header("Retry-After", server.retry_after)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubUSDA)
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.ports = set()
+    server.statuses = []
+    server.delay = 0
+    server.body = None
+    server.retry_after = None
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_client(stub, **kwargs):
+    kwargs.setdefault("backoff_factor", 0)
+    return USDAClient(stub.url, api_key="test", **kwargs)
+
+
+def test_reuses_one_keep_alive_connection(stub):
+    client = make_client(stub)
+    for query in ("egg", "rice", "oats"):
+        assert client.search(query)["foods"][0]["description"] == "Egg, whole, raw"
+
+    assert stub.requests == 3
+    assert len(stub.ports) == 1
+
+
+def test_read_timeout_bounds_a_hung_upstream(stub):
+    stub.delay = 1
+    client = make_client(stub, read_timeout=0.1, retries=0)
+
+    start = time.monotonic()
+    with pytest.raises(UpstreamUnavailable):
+        client.search("egg")
+    assert time.monotonic() - start < 0.9
+
+
+def test_retries_transient_server_errors(stub):
+    stub.statuses = [503, 502]
+    client = make_client(stub, retries=2)
+
+    assert client.search("egg")["foods"]
+    assert stub.requests == 3
+
+
+def test_breaker_opens_after_repeated_failures(stub):
+    stub.statuses = [500] * 10
+    clock = [0.0]
+    client = make_client(
+        stub,
+        retries=0,
+        breaker=CircuitBreaker(threshold=2, reset_after=30, clock=lambda: clock[0]),
+    )
+
+    for _ in range(2):
+        with pytest.raises(UpstreamUnavailable):
+            client.search("egg")
+    with pytest.raises(UpstreamUnavailable, match="breaker is open"):
+        client.search("egg")
+    assert stub.requests == 2
+
+    # After the reset window one trial call goes through and closes the breaker
+    stub.statuses = []
+    clock[0] = 31
+    assert client.search("egg")["foods"]
+    assert client.breaker.state == "closed"
+
+
+def test_concurrent_identical_queries_are_coalesced(stub):
+    stub.delay = 0.3
+    client = make_client(stub)
+    results = []
+
+    def search():
+        results.append(client.search("chicken", page_size=10))
+
+    threads = [threading.Thread(target=search) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(results) == 8
+    assert stub.requests == 1
+
+
+def test_retry_after_header_does_not_park_the_worker(stub):
+    stub.statuses = [503]
+    stub.retry_after = "3600"
+    client = make_client(stub, retries=1)
+
+    start = time.monotonic()
+    assert client.search("egg")["foods"]
+    assert time.monotonic() - start < 1
+    assert stub.requests == 2
+
+
+def test_non_json_body_is_reported_as_unavailable(stub):
+    stub.body = b"<html>maintenance</html>"
+    client = make_client(stub)
+
+    with pytest.raises(UpstreamUnavailable, match="non-JSON"):
+        client.search("egg")
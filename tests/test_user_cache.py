@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import create_app, db
+from app.models import User, WeightLog
+
+SETTINGS = {"TESTING": True, "WTF_CSRF_ENABLED": False}
+
+
+@pytest.fixture
+def workers(tmp_path):
+    """Two apps on one database, as two worker processes, and one browser's
+    session cookie logged in to both."""
+    url = f"sqlite:///{tmp_path / 'app.db'}"
+    apps = [create_app({**SETTINGS, "SQLALCHEMY_DATABASE_URI": url}) for _ in "ab"]
+    with apps[0].app_context():
+        db.create_all()
+        user = User(
+            username="cached", name="Before", email="cached@example.com",
+            age=30, weight=182.0, height=70.0, fitness_goal="cutting",
+        )
+        db.session.add(user)
+        db.session.flush()
+        earlier = datetime.now(timezone.utc) - timedelta(days=1)
+        db.session.add(WeightLog(user_id=user.id, weight=180.0, date=earlier))
+        db.session.commit()
+        user_id = user.id
+
+    client = apps[0].test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user_id)
+    browser = {"session": client.get_cookie("session").value}
+    return apps, browser
+
+
+def visit(app, browser, url, **kwargs):
+    """One request from the browser to `app`, keeping its session cookie."""
+    client = app.test_client()
+    client.set_cookie("session", browser["session"])
+    response = client.open(url, **kwargs)
+    cookie = client.get_cookie("session")
+    browser["session"] = cookie.value if cookie else ""
+    return response
+
+
+def profile_page(app, browser):
+    return visit(app, browser, "/profile").get_data(as_text=True)
+
+
+def test_repeat_requests_skip_the_user_select(workers):
+    apps, browser = workers
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        profile_page(apps[0], browser)
+        assert any("FROM users" in s for s in statements)
+        del statements[:]
+        assert 'value="Before"' in profile_page(apps[0], browser)
+        assert not any("FROM users" in s for s in statements)
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+
+
+def edit_name(app, browser):
+    visit(
+        app, browser, "/profile", method="POST",
+        data={
+            "name": "After", "username": "cached", "email": "cached@example.com",
+            "age": 30, "weight": 180.0, "height": 70.0, "fitness_goal": "cutting",
+        },
+    )
+    return 'value="After"'
+
+
+def log_weight(app, browser):
+    visit(app, browser, "/log_weight", method="POST", data={"weight": 175.5})
+    return 'value="175.5"'
+
+
+def delete_weight(app, browser):
+    log_weight(app, browser)
+    with app.app_context():
+        latest = db.session.query(WeightLog).order_by(WeightLog.id.desc()).first()
+    visit(app, browser, f"/delete_weight/{latest.id}", method="POST")
+    return 'value="180.0"'
+
+
+@pytest.mark.parametrize("update", [edit_name, log_weight, delete_weight])
+def test_updates_are_never_served_stale(workers, update):
+    apps, browser = workers
+    # Both workers hold the user before the update
+    for app in apps:
+        assert 'value="Before"' in profile_page(app, browser)
+
+    expected = update(apps[0], browser)
+
+    for app in (apps[1], apps[0], apps[1]):
+        assert expected in profile_page(app, browser)
+
+
+def test_other_sessions_on_the_writing_worker_see_updates(workers):
+    apps, browser = workers
+    other = dict(browser)
+    assert 'value="Before"' in profile_page(apps[0], other)
+
+    edit_name(apps[0], browser)
+    assert 'value="After"' in profile_page(apps[0], other)